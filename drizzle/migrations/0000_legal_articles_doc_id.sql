@@ -0,0 +1,23 @@
+-- Stable scraper document IDs (scrapers/document_identity.py) and the
+-- article / chunk spans embedded separately (scrapers/span_fingerprints.py).
+-- Ingestion upserts legal_articles ON CONFLICT (doc_id); titles stop being
+-- unique, so documents that share a title no longer overwrite each other.
+ALTER TABLE "legal_articles" ADD COLUMN IF NOT EXISTS "doc_id" text;
+--> statement-breakpoint
+ALTER TABLE "legal_articles" ADD CONSTRAINT "legal_articles_doc_id_unique" UNIQUE("doc_id");
+--> statement-breakpoint
+ALTER TABLE "legal_articles" DROP CONSTRAINT IF EXISTS "legal_articles_title_key";
+--> statement-breakpoint
+CREATE TABLE IF NOT EXISTS "legal_article_spans" (
+	"doc_id" text NOT NULL,
+	"span_key" text NOT NULL,
+	"fingerprint" text NOT NULL,
+	"kind" text,
+	"article_number" text,
+	"content" text NOT NULL,
+	"embedding" vector(768),
+	"start_offset" integer,
+	"end_offset" integer,
+	"updated_at" timestamp with time zone DEFAULT now(),
+	CONSTRAINT "legal_article_spans_doc_id_span_key_pk" PRIMARY KEY("doc_id","span_key")
+);
@@ -1,4 +1,4 @@
-import { pgTable, text, timestamp, serial, integer, real, jsonb, index } from "drizzle-orm/pg-core";
+import { pgTable, text, timestamp, serial, integer, real, jsonb, index, primaryKey } from "drizzle-orm/pg-core";
 
 /**
  * Core user table backing auth flow (PostgreSQL/Supabase version)
@@ -91,6 +91,7 @@ export type InsertContractReview = typeof contract_reviews.$inferInsert;
  */
 export const legal_articles = pgTable("legal_articles", {
   id: serial("id").primaryKey(),
+  doc_id: text("doc_id").unique(), // stable scraper ID (scrapers/document_identity.py)
   title: text("title").notNull(),
   content: text("content").notNull(),
   source_url: text("source_url"),
@@ -107,6 +108,28 @@ export const legal_articles = pgTable("legal_articles", {
 export type LegalArticle = typeof legal_articles.$inferSelect;
 export type InsertLegalArticle = typeof legal_articles.$inferInsert;
 
+/**
+ * Article / chunk spans of legal articles with their own embeddings,
+ * re-embedded only when their fingerprint changes (scrapers/span_fingerprints.py)
+ */
+export const legal_article_spans = pgTable("legal_article_spans", {
+  doc_id: text("doc_id").notNull(),
+  span_key: text("span_key").notNull(),
+  fingerprint: text("fingerprint").notNull(),
+  kind: text("kind"),
+  article_number: text("article_number"),
+  content: text("content").notNull(),
+  embedding: text("embedding"), // vector type will be handled by pgvector extension
+  start_offset: integer("start_offset"),
+  end_offset: integer("end_offset"),
+  updated_at: timestamp("updated_at", { withTimezone: true }).defaultNow(),
+}, (table) => ({
+  pk: primaryKey({ columns: [table.doc_id, table.span_key] }),
+}));
+
+export type LegalArticleSpan = typeof legal_article_spans.$inferSelect;
+export type InsertLegalArticleSpan = typeof legal_article_spans.$inferInsert;
+
 /**
  * Audit logs for system actions
  */
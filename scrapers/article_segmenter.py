@@ -0,0 +1,307 @@
+"""
+Article Segmenter
+Splits a law's full text into complete article spans in a single pass, so
+every scraper cuts articles the same way and in linear time. English and
+Arabic headings (Article / المادة, Chapter / الفصل, Part / الباب) are
+recognized, and text can be fed in chunks (e.g. PDF pages) as it arrives
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern
+
+# Article numbers as they appear in headings: digits, Roman numerals and
+# number words ("Article 12", "Article (12)", "Article XII", "Article One")
+_NUMBER_WORDS = (
+    'Twenty', 'Nineteen', 'Eighteen', 'Seventeen', 'Sixteen', 'Fifteen', 'Fourteen',
+    'Thirteen', 'Twelve', 'Eleven', 'Ten', 'Nine', 'Eight', 'Seven', 'Six', 'Five',
+    'Four', 'Three', 'Two', 'One',
+    'First', 'Second', 'Third', 'Fourth', 'Fifth', 'Sixth', 'Seventh', 'Eighth',
+    'Ninth', 'Tenth'
+)
+_NUMBER_WORD_VALUES = {
+    word.lower(): value for value, word in enumerate(reversed(_NUMBER_WORDS[:20]), 1)
+}
+_NUMBER_WORD_VALUES.update(
+    (word.lower(), value) for value, word in enumerate(_NUMBER_WORDS[20:], 1)
+)
+_ROMAN_VALUES = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100}
+
+# Roman numerals up to CCCXCIX, matched case-sensitively and only in valid
+# form, so words such as "civil" or "CIVIL" are never read as numbers
+_ROMAN_NUMERAL = r'(?-i:(?=[IVXLC])C{0,3}(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})(?<=[IVXLC]))'
+
+_EN_NUMBER = r'\(?(?:\d+|' + _ROMAN_NUMERAL + '|' + '|'.join(_NUMBER_WORDS) + r')\b'
+
+# Arabic ordinals, masculine (الباب / الفصل) and feminine (المادة):
+# الأولى, الحادي عشر, الثانية والعشرون, الثالثة بعد المائة ...
+_AR_UNITS = (
+    ('ال[أاإ]ول[ىي]?', 1), ('الحادي[ةه]?', 1), ('الثاني[ةه]?', 2), ('الثالث[ةه]?', 3),
+    ('الرابع[ةه]?', 4), ('الخامس[ةه]?', 5), ('السادس[ةه]?', 6), ('السابع[ةه]?', 7),
+    ('الثامن[ةه]?', 8), ('التاسع[ةه]?', 9), ('العاشر[ةه]?', 10), ('عشر[ةه]?', 10),
+    ('العشرون', 20), ('الثلاثون', 30), ('ال[أاإ]ربعون', 40), ('الخمسون', 50),
+    ('الستون', 60), ('السبعون', 70), ('الثمانون', 80), ('التسعون', 90),
+    ('الما[ئي]ة', 100), ('المئة', 100)
+)
+_AR_ORDINAL_TOKENS = [(re.compile(rf'^{stem}$'), value) for stem, value in _AR_UNITS]
+_AR_ORDINAL_WORD = '(?:' + '|'.join(stem for stem, _ in _AR_UNITS) + ')'
+_AR_DIGITS = '[0-9٠-٩۰-۹]+'
+_AR_NUMBER = (
+    rf'[(\[]?\s*(?:{_AR_DIGITS}|{_AR_ORDINAL_WORD}(?:\s+(?:و\s*|بعد\s+)?{_AR_ORDINAL_WORD})*)'
+    r'(?!\w)[ \t]*[)\]]?'
+)
+
+# Arabic-Indic and extended Arabic-Indic digits -> ASCII
+_DIGIT_TABLE = str.maketrans('٠١٢٣٤٥٦٧٨٩'
+                             '۰۱۲۳۴۵۶۷۸۹',
+                             '01234567890123456789')
+
+# Headings of every kind. English articles match anywhere (page text often
+# runs headings into the previous line); the others must start a line, since
+# Arabic law text constantly refers to "المادة (5)" mid-sentence. The line
+# start is matched as a literal newline rather than '^', which lets the
+# regex engine skip ahead on its first character (several times faster).
+LEGAL_HEADING_PATTERN = re.compile(
+    r'\n[ \t]*(?:'
+    r'(?P<part>Part\s+' + _EN_NUMBER + r'|(?:ال)?باب\s+' + _AR_NUMBER + r')'
+    r'|(?P<chapter>Chapter\s+' + _EN_NUMBER + r'|(?:ال)?فصل\s+' + _AR_NUMBER + r')'
+    r'|(?P<article_ar>(?:ال)?ماد[ةه]\s*(?:رقم\s*)?' + _AR_NUMBER + r'))'
+    r'|(?P<article>Article\s+' + _EN_NUMBER + r')',
+    re.IGNORECASE
+)
+
+# Markdown page dumps: every "## ... Article ..." heading line starts an article
+MARKDOWN_ARTICLE_PATTERN = re.compile(r'^##(?P<heading>[^\n]*Article[^\n]*)$', re.MULTILINE)
+
+# Pattern group -> span kind
+_KINDS = (('part', 'part'), ('chapter', 'chapter'), ('article', 'article'), ('article_ar', 'article'))
+_NUMBER_IN_HEADING = re.compile(
+    rf'{_AR_DIGITS}|\b{_ROMAN_NUMERAL}\b|\b(?:' + '|'.join(_NUMBER_WORDS) + r')\b'
+    rf'|{_AR_ORDINAL_WORD}(?:\s+(?:و\s*|بعد\s+)?{_AR_ORDINAL_WORD})*',
+    re.IGNORECASE
+)
+
+# Characters held back at the end of a fed chunk, so a heading split across
+# two chunks is only matched once it is complete
+_HOLDBACK = 80
+
+
+def heading_number(heading: str) -> Optional[str]:
+    """
+    Number of a heading as a decimal string
+
+    "Article 12", "Article XII", "Article Twelve", "المادة (١٢)" and
+    "المادة الثانية عشرة" all give '12'; None if there is no number.
+
+    >>> heading_number('Article XII'), heading_number('Article Civil')
+    ('12', None)
+    """
+    # Skip the keyword so "Article" / "المادة" never count as a number
+    words = heading.split(None, 1)
+    match = _NUMBER_IN_HEADING.search(words[1] if len(words) > 1 else '')
+    if not match:
+        return None
+    raw = match.group(0)
+
+    digits = raw.translate(_DIGIT_TABLE)
+    if digits.isdigit():
+        return str(int(digits))
+    if raw.lower() in _NUMBER_WORD_VALUES:
+        return str(_NUMBER_WORD_VALUES[raw.lower()])
+    if raw.strip('IVXLC') == '':
+        return str(_roman_value(raw))
+
+    total = 0
+    for token in re.split(r'\s+', raw):
+        token = token[1:] if token.startswith('و') and len(token) > 1 else token
+        for token_re, value in _AR_ORDINAL_TOKENS:
+            if token_re.match(token):
+                total += value
+                break
+    return str(total) if total else raw
+
+
+def _roman_value(numeral: str) -> int:
+    total = 0
+    for i, char in enumerate(numeral):
+        value = _ROMAN_VALUES[char]
+        if i + 1 < len(numeral) and _ROMAN_VALUES[numeral[i + 1]] > value:
+            total -= value
+        else:
+            total += value
+    return total
+
+
+class LegalTextSegmenter:
+    """
+    Streaming segmenter for part / chapter / article headings
+
+    Text is fed in chunks; each span is yielded as soon as the next heading
+    is seen, so memory holds one open span rather than the whole document.
+    Offsets are relative to the start of the stream.
+
+    Usage:
+        segmenter = LegalTextSegmenter()
+        for page in pages:
+            for span in segmenter.feed(page):
+                ...
+        spans.extend(segmenter.close())
+
+    Span records have kind ('part', 'chapter' or 'article'), article_number
+    (the heading label), number (decimal string), text, start and end
+    (offsets of the whole span, heading included), plus the part and
+    chapter headings the span belongs to.
+    """
+
+    def __init__(self, pattern: Pattern = LEGAL_HEADING_PATTERN, min_length: Optional[int] = 10):
+        self.pattern = pattern
+        self.min_length = min_length
+        self.part = None
+        self.chapter = None
+        # The buffer always starts at a newline; the stream gets a virtual
+        # one so a heading on the very first line is found too
+        self._buffer = '\n'
+        self._offset = -1     # stream offset of _buffer[0]
+        self._scan_from = 0   # buffer index where the next heading search starts
+        self._open = None     # (kind, heading, buffer index of span start, buffer index of body start)
+
+    def feed(self, chunk: str) -> Iterator[Dict]:
+        """Add text; yields the spans it completes"""
+        self._buffer += chunk
+        yield from self._drain(final=False)
+
+    def close(self) -> Iterator[Dict]:
+        """End of text; yields the remaining spans"""
+        yield from self._drain(final=True)
+        if self._open:
+            record = self._emit(len(self._buffer))
+            if record:
+                yield record
+        self._open = None
+
+    def _drain(self, final: bool) -> Iterator[Dict]:
+        # Only headings ending before `limit` are certain to be complete; no
+        # heading is longer than _HOLDBACK, so none can start before it
+        limit = len(self._buffer) if final else len(self._buffer) - _HOLDBACK
+        while True:
+            match = self.pattern.search(self._buffer, self._scan_from)
+            if not match:
+                self._scan_from = max(self._scan_from, limit)
+                break
+            if match.end() > limit:
+                self._scan_from = match.start()
+                break
+            heading = self._heading(match)
+            if self._open:
+                record = self._emit(heading[2])
+                if record:
+                    yield record
+            self._open = heading
+            self._enter(heading)
+            self._scan_from = match.end()
+
+        # Drop text nobody needs any more: everything before the open span,
+        # or before the first heading everything not yet searched. The cut
+        # is made at a newline so line-start headings still match.
+        anchor = self._open[2] if self._open else self._scan_from
+        keep = max(0, self._buffer.rfind('\n', 0, anchor))
+        if keep:
+            self._buffer = self._buffer[keep:]
+            self._offset += keep
+            self._scan_from -= keep
+            if self._open:
+                kind, heading, start, body_start = self._open
+                self._open = (kind, heading, start - keep, body_start - keep)
+
+    def _heading(self, match) -> tuple:
+        groups = match.groupdict()
+        group = next((g for g, _ in _KINDS if groups.get(g) is not None), None)
+        kind = dict(_KINDS)[group] if group else 'article'
+        heading = (groups.get('heading') or match.group(group or 0)).strip()
+        return kind, heading, match.start(group or 0), match.end()
+
+    def _enter(self, heading: tuple):
+        """Track the part / chapter the following spans belong to"""
+        kind, label = heading[0], heading[1]
+        if kind == 'part':
+            self.part, self.chapter = label, None
+        elif kind == 'chapter':
+            self.chapter = label
+
+    def _emit(self, end: int) -> Optional[Dict]:
+        kind, heading, start, body_start = self._open
+        body = self._buffer[body_start:end].strip()
+        if self.min_length is not None and len(body) <= self.min_length:
+            return None
+
+        return {
+            'kind': kind,
+            'article_number': heading,
+            'number': heading_number(heading),
+            'text': body,
+            'start': self._offset + start,
+            'end': self._offset + end,
+            'part': self.part if kind != 'part' else None,
+            'chapter': self.chapter if kind == 'article' else None
+        }
+
+
+def iter_spans(chunks: Iterable[str], pattern: Pattern = LEGAL_HEADING_PATTERN,
+               min_length: Optional[int] = 10) -> Iterator[Dict]:
+    """Spans of every kind from a stream of text chunks"""
+    segmenter = LegalTextSegmenter(pattern, min_length)
+    for chunk in chunks:
+        yield from segmenter.feed(chunk)
+    yield from segmenter.close()
+
+
+def iter_article_spans(text: str, pattern: Pattern = LEGAL_HEADING_PATTERN,
+                       min_length: Optional[int] = 10) -> Iterator[Dict]:
+    """
+    Yield one record per article found in `text`
+
+    Each article runs from its heading to the next heading of any kind (or
+    the end of the text). Headings are found in one pass.
+
+    Args:
+        text: Full law text
+        pattern: Compiled heading pattern (LEGAL_HEADING_PATTERN by default;
+            MARKDOWN_ARTICLE_PATTERN for markdown dumps)
+        min_length: Skip articles whose stripped text is not longer than
+            this (None keeps every heading)
+
+    Yields:
+        Span records of kind 'article' (see LegalTextSegmenter)
+    """
+    for span in iter_spans([text], pattern, min_length):
+        if span['kind'] == 'article':
+            yield span
+
+
+def add_page_anchors(spans: List[Dict], text: str, page_break: str = '\f') -> List[Dict]:
+    """
+    Add the 1-based 'page' and 'last_page' each span sits on, for citations
+
+    Pages are counted from the page breaks (form feeds) in the text the
+    spans were cut from, as PDFTextExtractor leaves one after every page.
+    """
+    breaks = [match.start() for match in re.finditer(re.escape(page_break), text)]
+    for span in spans:
+        span['page'] = bisect_left(breaks, span['start']) + 1
+        span['last_page'] = bisect_left(breaks, max(span['start'], span['end'] - 1)) + 1
+    return spans
+
+
+def segment_articles(text: str, pattern: Pattern = LEGAL_HEADING_PATTERN,
+                     min_length: Optional[int] = 10) -> List[Dict]:
+    r"""
+    All article spans of a text (see iter_article_spans)
+
+    An article on the line right after a chapter heading is its own span:
+
+    >>> [span['article_number'] for span in segment_articles(
+    ...     'الفصل الأول\nالمادة 1\nتسري أحكام هذا القانون على العقارات\n'
+    ...     'المادة 2\nيلغى كل حكم يخالف أحكام هذا القانون')]
+    ['المادة 1', 'المادة 2']
+    """
+    return list(iter_article_spans(text, pattern, min_length))
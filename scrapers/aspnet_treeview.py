@@ -0,0 +1,264 @@
+"""
+ASP.NET TreeView Postback Client
+Expands server-side ASP.NET TreeView controls over plain HTTP by replaying
+the __doPostBack form posts (__VIEWSTATE / __EVENTVALIDATION) a browser
+would send, so no browser is needed to walk the tree
+"""
+
+import re
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from html_parsing import parse_html
+
+logger = logging.getLogger(__name__)
+
+_POSTBACK_RE = re.compile(r"__doPostBack\(\s*'([^']*)'\s*,\s*'((?:[^'\\]|\\.)*)'\s*\)")
+
+
+def parse_postback(href: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Split a javascript:__doPostBack('target','argument') link
+
+    Returns:
+        (event target, event argument) with JS string escapes removed, or None
+    """
+    match = _POSTBACK_RE.search(href or '')
+    if not match:
+        return None
+    argument = re.sub(r'\\(.)', r'\1', match.group(2))
+    return match.group(1), argument
+
+
+def form_state(soup: BeautifulSoup) -> Dict[str, str]:
+    """
+    Hidden form fields that must be posted back with every event
+    (__VIEWSTATE, __EVENTVALIDATION, the TreeView's ExpandState, ...)
+    """
+    form = soup.find('form') or soup
+    return {
+        field['name']: field.get('value', '')
+        for field in form.find_all('input', type='hidden')
+        if field.get('name')
+    }
+
+
+class TreeNode:
+    """One rendered TreeView node"""
+
+    def __init__(self, text: str, value_path: str, href: Optional[str] = None,
+                 toggle: Optional[Tuple[str, str]] = None, select: Optional[Tuple[str, str]] = None,
+                 expanded: bool = False, anchor_id: str = ''):
+        self.text = text
+        self.value_path = value_path
+        self.href = href
+        self.toggle = toggle
+        self.select = select
+        self.expanded = expanded
+        self.anchor_id = anchor_id
+
+    @property
+    def depth(self) -> int:
+        return self.value_path.count('\\')
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.toggle is None
+
+    def is_under(self, parent_path: str) -> bool:
+        return self.value_path.startswith(parent_path + '\\')
+
+
+class TreeViewClient:
+    """
+    Walks an ASP.NET TreeView by replaying its postbacks
+
+    Nodes are identified by their value path (the argument of the 't' toggle
+    and 's' select postbacks), which stays stable across postbacks while the
+    TreeView1t<N> element ids are renumbered on every render.
+
+    All children of one parent are expanded from the same parent page state:
+    each sibling expansion reuses that page's __VIEWSTATE / __EVENTVALIDATION
+    instead of chaining postbacks, so the state posted stays small and no
+    extra GETs are needed.
+    """
+
+    def __init__(self, session: requests.Session, page_url: str, tree_id: str = 'TreeView1',
+                 timeout: float = 30):
+        self.session = session
+        self.page_url = page_url
+        self.tree_id = tree_id
+        self.timeout = timeout
+        self.postbacks = 0
+
+    def load(self) -> Tuple[BeautifulSoup, Dict[str, str]]:
+        """GET the page holding the tree; returns the soup and its form state"""
+        # Always from the server: a cached copy's __VIEWSTATE /
+        # __EVENTVALIDATION would not match this session's ASP.NET cookie
+        response = self.session.get(self.page_url, headers={'Cache-Control': 'no-cache'},
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        soup = parse_html(response.content)
+        return soup, form_state(soup)
+
+    def postback(self, state: Dict[str, str], event: Tuple[str, str]) -> requests.Response:
+        """POST one __doPostBack event with the given page state"""
+        target, argument = event
+        data = dict(state)
+        data['__EVENTTARGET'] = target
+        data['__EVENTARGUMENT'] = argument
+        self.postbacks += 1
+
+        response = self.session.post(self.page_url, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def expand(self, state: Dict[str, str], node: TreeNode) -> Tuple[BeautifulSoup, Dict[str, str]]:
+        """Expand a collapsed node; returns the re-rendered page and its state"""
+        response = self.postback(state, node.toggle)
+        soup = parse_html(response.content)
+        return soup, form_state(soup)
+
+    def parse_nodes(self, soup: BeautifulSoup) -> List[TreeNode]:
+        """All nodes rendered in the page, in document order"""
+        id_re = re.compile(rf'^{re.escape(self.tree_id)}t(\d+)$')
+        container_re = re.compile(rf'^{re.escape(self.tree_id)}n(\d+)Nodes$')
+        by_index: Dict[str, TreeNode] = {}
+        nodes = []
+
+        for anchor in soup.find_all('a', id=id_re):
+            text = anchor.get_text(strip=True)
+            if not text:
+                continue
+            index = id_re.match(anchor['id']).group(1)
+            href = anchor.get('href', '')
+
+            select = parse_postback(href)
+            toggle_anchor = soup.find('a', id=f"{self.tree_id}n{index}")
+            toggle = parse_postback(toggle_anchor.get('href')) if toggle_anchor else None
+            if toggle and not toggle[1].startswith('t'):
+                toggle = None
+
+            # Children are rendered inside the parent's <div id="TreeView1n<N>Nodes">
+            container = anchor.find_parent(id=container_re)
+            parent = by_index.get(container_re.match(container['id']).group(1)) if container else None
+
+            if toggle:
+                value_path = toggle[1][1:]
+            elif select and select[1].startswith('s'):
+                value_path = select[1][1:]
+            else:
+                # Plain-link leaves carry no value path; derive it from the parent
+                value_path = f"{parent.value_path}\\{text}" if parent else text
+
+            # An expanded node renders a "Collapse ..." image and its
+            # children container
+            expanded = False
+            if toggle_anchor:
+                img = toggle_anchor.find('img')
+                alt = (img.get('alt', '') if img else '').lower()
+                expanded = alt.startswith('collapse') or bool(
+                    alt == '' and soup.find(id=f"{self.tree_id}n{index}Nodes")
+                )
+
+            node = TreeNode(
+                text=text,
+                value_path=value_path,
+                href=None if href.startswith('javascript:') or not href else urljoin(self.page_url, href),
+                toggle=toggle,
+                select=select,
+                expanded=expanded,
+                anchor_id=anchor['id']
+            )
+            by_index[index] = node
+            nodes.append(node)
+
+        return nodes
+
+    def resolve_leaf_url(self, state: Dict[str, str], node: TreeNode) -> Optional[str]:
+        """
+        URL of a leaf that only has a select postback: selecting it makes the
+        server redirect to the document
+        """
+        if node.href:
+            return node.href
+        if not node.select:
+            return None
+        response = self.postback(state, node.select)
+        return response.url if response.url != self.page_url else None
+
+    def walk(self, root_path: Optional[str] = None, max_depth: Optional[int] = None,
+             resolve_leaves: bool = True) -> List[Dict]:
+        """
+        Expand the tree (or the subtree under `root_path`) breadth-first
+
+        Args:
+            root_path: Value path of the node to start from (None for the whole tree)
+            max_depth: Stop expanding below this depth (None for no limit)
+            resolve_leaves: Post the select event for leaves without a plain link
+
+        Returns:
+            Leaf dicts with title, url, value_path and path (list of ancestor texts)
+        """
+        soup, state = self.load()
+        texts: Dict[str, str] = {}
+        leaves: Dict[str, Dict] = {}
+        expanded = set()
+
+        # Each queue entry is a page state plus the parent whose children
+        # should be taken from that page; the first entry starts from the
+        # root node itself
+        pending = deque([(soup, state, root_path, True)])
+
+        while pending:
+            soup, state, parent_path, is_start = pending.popleft()
+            nodes = self.parse_nodes(soup)
+            for node in nodes:
+                texts.setdefault(node.value_path, node.text)
+
+            if parent_path is None:
+                scope = [n for n in nodes if n.depth == 0]
+            elif is_start:
+                scope = [n for n in nodes if n.value_path == parent_path]
+            else:
+                scope = [n for n in nodes if n.is_under(parent_path)]
+
+            for node in scope:
+                if node.value_path in expanded or node.value_path in leaves:
+                    continue
+
+                if node.is_leaf:
+                    url = self.resolve_leaf_url(state, node) if resolve_leaves else node.href
+                    ancestors = node.value_path.split('\\')[:-1]
+                    leaves[node.value_path] = {
+                        'title': node.text,
+                        'url': url,
+                        'value_path': node.value_path,
+                        'path': [texts.get('\\'.join(ancestors[:i + 1]), part) for i, part in enumerate(ancestors)]
+                    }
+                    continue
+
+                if max_depth is not None and node.depth >= max_depth:
+                    continue
+
+                expanded.add(node.value_path)
+                if node.expanded:
+                    # Children are already on this page
+                    pending.append((soup, state, node.value_path, False))
+                    continue
+
+                try:
+                    child_soup, child_state = self.expand(state, node)
+                except requests.RequestException as e:
+                    logger.warning(f"Could not expand '{node.text}': {e}")
+                    continue
+                pending.append((child_soup, child_state, node.value_path, False))
+
+        logger.info(f"TreeView walk: {len(leaves)} leaves from {len(expanded)} expanded nodes "
+                    f"({self.postbacks} postbacks)")
+        return list(leaves.values())
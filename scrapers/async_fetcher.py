@@ -0,0 +1,270 @@
+"""
+Async Fetch Engine
+Concurrent HTTP fetching with a per-host concurrency cap and a token-bucket
+rate limiter, shared by the scrapers that walk large lists of pages
+"""
+
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from rate_controller import parse_retry_after
+from resilience import RETRYABLE_STATUSES, CircuitOpenError
+
+try:
+    import httpx
+except ImportError:  # Optional dependency - callers fall back to the sync path
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+def async_fetch_available() -> bool:
+    """Return True if the async HTTP client (httpx) is installed"""
+    return httpx is not None
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter
+
+    Tokens are refilled at `rate` per second up to `burst`. Each request
+    consumes one token, so the long-run request rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        """Wait until a token is available and consume it"""
+        if self.rate == float('inf'):
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncFetchEngine:
+    """
+    Asyncio fetch engine built on httpx
+
+    Every host gets its own semaphore (at most `max_per_host` requests in
+    flight) and its own token bucket (at most `rate_per_host` request starts
+    per second). The rate limit keeps us polite; the concurrency cap lets the
+    network latency of several requests overlap.
+
+    If a RateControllerRegistry is given, request starts are paced by the
+    adaptive per-domain controller instead of the fixed token bucket.
+
+    If a RequestResilience is given, transient failures are retried with
+    jittered backoff and hosts with an open circuit fail fast.
+
+    If an HttpCache is given, GETs are answered from it and revalidated with
+    conditional requests, and concurrent fetches of one URL are merged.
+
+    Usage:
+        async with AsyncFetchEngine(headers=session.headers) as engine:
+            response = await engine.fetch(url)
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_per_host: int = 4,
+                 rate_per_host: float = 0.5, burst: int = 1, timeout: float = 30,
+                 cache=None, rate_controllers=None, resilience=None):
+        if httpx is None:
+            raise ImportError("httpx is required for the async fetch engine (pip install httpx)")
+
+        self.headers = dict(headers or {})
+        self.max_per_host = max(1, max_per_host)
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_controllers = rate_controllers
+        self.resilience = resilience
+
+        self.client = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._url_locks: Dict[str, asyncio.Lock] = {}
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_per_host * 4,
+                                max_keepalive_connections=self.max_per_host * 4)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    def _host_limits(self, url: str):
+        """Get (or create) the semaphore and token bucket for a URL's host"""
+        host = urlparse(url).netloc.lower()
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+            self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return self._semaphores[host], self._buckets[host]
+
+    async def fetch(self, url: str, **kwargs) -> "httpx.Response":
+        """
+        Fetch a URL under the host's concurrency cap and rate limit
+
+        Args:
+            url: URL to fetch
+            **kwargs: Extra arguments passed to httpx.AsyncClient.get
+
+        Returns:
+            httpx.Response (raises httpx.HTTPStatusError on 4xx/5xx)
+        """
+        if self.client is None:
+            raise RuntimeError("AsyncFetchEngine must be used as an async context manager")
+
+        if self.cache is None:
+            response = await self._get(url, **kwargs)
+            response.raise_for_status()
+            return response
+
+        return await self._fetch_cached(url, **kwargs)
+
+    async def _get(self, url: str, **kwargs) -> "httpx.Response":
+        """Issue a GET, retrying transient failures if resilience is enabled"""
+        if self.resilience is None:
+            return await self._get_once(url, **kwargs)
+
+        policy = self.resilience.policy
+        breaker = self.resilience.breaker_for(url)
+        self.resilience.count('requests')
+        attempt = 0
+
+        while True:
+            if not breaker.allow_request():
+                self.resilience.count('failed_fast')
+                raise CircuitOpenError(f"Circuit open for {breaker.host}")
+
+            response = None
+            error = None
+            try:
+                response = await self._get_once(url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # Anything else (a redirect loop, an invalid URL, a cancel)
+                # still settles a half-open probe, or the circuit would
+                # stay shut for good
+                breaker.record_failure()
+                raise
+
+            if response is not None and response.status_code not in RETRYABLE_STATUSES:
+                breaker.record_success()
+                return response
+
+            breaker.record_failure()
+
+            if attempt >= policy.max_retries:
+                if error is not None:
+                    self.resilience.count('gave_up')
+                    raise error
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            delay = policy.backoff(attempt, retry_after)
+            logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{policy.max_retries})")
+
+            self.resilience.count('retries')
+            self.resilience.count('backoff_seconds', delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _get_once(self, url: str, **kwargs) -> "httpx.Response":
+        """Issue one GET under the host's concurrency cap and rate limit"""
+        semaphore, bucket = self._host_limits(url)
+        async with semaphore:
+            if self.rate_controllers is None:
+                await bucket.acquire()
+                return await self.client.get(url, **kwargs)
+
+            controller = self.rate_controllers.get(url)
+            await asyncio.sleep(controller.reserve())
+
+            started = time.monotonic()
+            try:
+                response = await self.client.get(url, **kwargs)
+            except Exception:
+                controller.record(latency=time.monotonic() - started, error=True)
+                raise
+
+            controller.record(
+                response.status_code,
+                time.monotonic() - started,
+                parse_retry_after(response.headers.get('Retry-After'))
+            )
+            return response
+
+    async def _fetch_cached(self, url: str, **kwargs) -> "httpx.Response":
+        """Serve from the HttpCache, revalidating stale entries"""
+        lock = self._url_locks.setdefault(url, asyncio.Lock())
+        waited_since = time.time()
+
+        async with lock:
+            entry = self.cache.get(url)
+
+            # Fresh on disk, or just fetched by a concurrent caller we waited on
+            if entry and (self.cache.is_fresh(entry) or entry.get('stored_at', 0) >= waited_since):
+                self.cache.record('hits')
+                return self._cached_response(url, entry)
+
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.cache.conditional_headers(entry))
+            response = await self._get(url, headers=headers, **kwargs)
+
+            if response.status_code == 304 and entry:
+                self.cache.refresh(entry, response.headers)
+                self.cache.record('revalidated')
+                return self._cached_response(url, entry)
+
+            self.cache.record('misses', len(response.content))
+            if self.cache.is_storable(response.status_code, response.headers):
+                self.cache.put(url, response.status_code, response.headers, response.content)
+
+            response.raise_for_status()
+            return response
+
+    @staticmethod
+    def _cached_response(url: str, entry: Dict) -> "httpx.Response":
+        return httpx.Response(
+            entry.get('status', 200),
+            headers=entry['headers'],
+            content=entry['body'],
+            request=httpx.Request('GET', url)
+        )
+
+    async def map(self, items: Iterable[Any], worker: Callable[[Any], Awaitable[Any]]) -> List[Any]:
+        """
+        Run `worker` over all items concurrently
+
+        Results are returned in input order. Concurrency and rate are bounded
+        by the per-host limits applied inside `fetch`.
+        """
+        return await asyncio.gather(*(worker(item) for item in items))
@@ -6,9 +6,8 @@ No manual intervention required!
 """
 
 import requests
-from bs4 import BeautifulSoup
+import asyncio
 import json
-import time
 from datetime import datetime
 from typing import List, Dict, Optional
 import logging
@@ -16,6 +15,17 @@ import re
 import os
 from urllib.parse import urljoin, parse_qs, urlparse
 
+from async_fetcher import AsyncFetchEngine, async_fetch_available
+from article_segmenter import segment_articles
+from crawl_frontier import CrawlFrontier
+from document_identity import DocumentRegistry, document_id
+from html_parsing import link_elements, parse_page
+from http_cache import install_http_cache
+from listing_snapshot import ListingSnapshotStore
+from parse_pool import ParsePool
+from rate_controller import install_rate_controller
+from resilience import install_resilience
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,14 +34,115 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def parse_law_page(law_url: str, content: bytes, title: str = "") -> Dict:
+    """
+    Parse a fetched law page into a law record
+    
+    Module-level (and free of scraper state) so it can run in a ParsePool
+    worker process.
+    
+    Args:
+        law_url: URL the page was fetched from
+        content: Raw HTML bytes
+        title: Pre-extracted title (optional)
+        
+    Returns:
+        Dictionary with complete law data
+    """
+    page = parse_page(content)
+    
+    # Extract title if not provided
+    if not title:
+        title = page.first_text(['h1', 'h2', 'title'])
+    
+    # Extract metadata
+    metadata = {}
+    
+    # Look for issue date (page text is computed once for all patterns)
+    text_content = page.text
+    date_patterns = [
+        r'Issued on (\d{1,2}/\d{1,2}/\d{4})',
+        r'Issued Date[:\s]+(\d{1,2}/\d{1,2}/\d{4})',
+        r'Date[:\s]+(\d{1,2}/\d{1,2}/\d{4})'
+    ]
+    
+    for pattern in date_patterns:
+        match = re.search(pattern, text_content, re.IGNORECASE)
+        if match:
+            metadata['issue_date'] = match.group(1)
+            break
+    
+    # Look for Hijri date
+    hijri_match = re.search(r'Corresponding to (\d+ \w+ \d+ H\.?)', text_content)
+    if hijri_match:
+        metadata['hijri_date'] = hijri_match.group(1)
+    
+    # Look for law number
+    law_num_match = re.search(r'(Federal (?:Law|Decree-Law) No\.?\s*\d+)', title or text_content, re.IGNORECASE)
+    if law_num_match:
+        metadata['law_number'] = law_num_match.group(1)
+    
+    # Extract full text content
+    full_text = ""
+    
+    # Try to find main content area
+    content_selectors = [
+        ('div', {'class': re.compile(r'article|content|law-text|main-content', re.I)}),
+        ('div', {'id': re.compile(r'MainContent|article|content', re.I)}),
+        ('article', {}),
+    ]
+    
+    # One walk over the tree, first selector in priority order wins;
+    # falls back to the body text. Script, style and navigation
+    # elements are left out.
+    full_text = page.content_text(content_selectors)
+    
+    # Clean up the text
+    full_text = re.sub(r'\n\s*\n', '\n\n', full_text)  # Remove excessive newlines
+    full_text = re.sub(r' +', ' ', full_text)  # Remove excessive spaces
+    
+    # Extract articles (complete spans, one pass over the text)
+    articles = segment_articles(full_text)
+    
+    # Determine category from URL or content
+    category = "UAE Federal Law"
+    if 'traffic' in full_text.lower()[:500]:
+        category = "Traffic and Transportation"
+    elif 'personal status' in full_text.lower()[:500] or 'marriage' in full_text.lower()[:500]:
+        category = "Family and Personal Status"
+    elif 'labor' in full_text.lower()[:500] or 'employment' in full_text.lower()[:500]:
+        category = "Labor and Employment"
+    elif 'commercial' in full_text.lower()[:500] or 'business' in full_text.lower()[:500]:
+        category = "Commercial Law"
+    
+    return {
+        'id': document_id(law_url, 'moj'),
+        'title': title,
+        'url': law_url,
+        'category': category,
+        'full_text': full_text,
+        'metadata': metadata,
+        'articles': articles,
+        'word_count': len(full_text.split()),
+        'scraped_at': datetime.now().isoformat(),
+        'source': 'MOJ Legal Portal'
+    }
+
+
+
 class AutomatedMOJScraper:
     """Fully automated scraper for MOJ Legal Portal"""
     
-    def __init__(self, output_dir="/home/ubuntu/paris_group_legal_ai/data"):
+    def __init__(self, output_dir="/home/ubuntu/paris_group_legal_ai/data",
+                 concurrency: int = 4, parse_workers: Optional[int] = None):
         self.base_url = "https://elaws.moj.gov.ae"
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
+        # Up to `concurrency` requests in flight on the async path; the
+        # request rate itself is set by the per-domain rate controller
+        self.concurrency = max(1, concurrency)
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -40,54 +151,80 @@ class AutomatedMOJScraper:
             'Connection': 'keep-alive',
         })
         
+        # Adaptive per-domain pacing, retries with a per-host circuit breaker,
+        # then the conditional-GET cache on top (cache hits never wait)
+        self.rate_controllers = install_rate_controller(self.session)
+        self.resilience = install_resilience(self.session)
+        self.http_cache = install_http_cache(self.session)
+        
+        # Persistent frontier: index pages and law links survive between runs
+        self.frontier = CrawlFrontier('moj_laws')
+        
+        # Previous listing, for incremental runs (laws are keyed by URL)
+        self.snapshots = ListingSnapshotStore('moj_laws', id_key='url')
+        
+        # Law pages are parsed in worker processes (one per core by default)
+        # while the fetchers keep the network busy
+        self.parse_pool = ParsePool(workers=parse_workers)
+        
+        # Stable document IDs; a law whose page moved keeps its ID
+        self.registry = DocumentRegistry()
+        
         self.laws_scraped = []
     
     def get_all_law_links(self) -> List[Dict]:
         """
         Extract all law links from the main federal laws page
         
+        Links are kept in the persistent crawl frontier, so an index page
+        fetched by an earlier (or interrupted) run within the revisit window
+        is not fetched again.
+        
         Returns:
             List of dictionaries with law metadata and URLs
         """
-        try:
-            url = f"{self.base_url}/English.aspx?val=UAE-KaitEL1"
-            logger.info(f"Fetching law links from: {url}")
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find all links that contain law references
-            law_links = []
-            seen_urls = set()
-            
-            # Look for links with specific patterns
-            for link in soup.find_all('a', href=True):
-                href = link.get('href', '')
-                text = link.get_text(strip=True)
+        self.frontier.add(f"{self.base_url}/English.aspx?val=UAE-KaitEL1", kind='index', priority=10)
+        
+        for index_page in self.frontier.claim(kind='index'):
+            url = index_page['url']
+            try:
+                logger.info(f"Fetching law links from: {url}")
                 
-                # Check if this looks like a law link
-                if ('English.aspx' in href or 'LEGISLATIONS' in href.upper()) and text:
-                    # Skip navigation and category links
-                    if any(skip in text.upper() for skip in ['HOME', 'ABOUT', 'SERVICES', 'MEDIA', 'LOGIN']):
-                        continue
-                    
-                    full_url = urljoin(self.base_url, href)
+                response = self.session.get(url, timeout=30)
+                response.raise_for_status()
+                
+                # Find all links that contain law references
+                found = []
+                
+                # Look for links with specific patterns (only <a href> is parsed)
+                for link in link_elements(response.content):
+                    href = link.get('href', '')
+                    text = link.get_text(strip=True)
                     
-                    if full_url not in seen_urls and len(text) > 10:
-                        seen_urls.add(full_url)
-                        law_links.append({
-                            'title': text,
-                            'url': full_url
-                        })
-            
-            logger.info(f"Found {len(law_links)} potential law links")
-            return law_links
-            
-        except Exception as e:
-            logger.error(f"Error fetching law links: {e}")
-            return []
+                    # Check if this looks like a law link
+                    if ('English.aspx' in href or 'LEGISLATIONS' in href.upper()) and text:
+                        # Skip navigation and category links
+                        if any(skip in text.upper() for skip in ['HOME', 'ABOUT', 'SERVICES', 'MEDIA', 'LOGIN']):
+                            continue
+                        
+                        if len(text) > 10:
+                            found.append((urljoin(self.base_url, href), {'title': text}))
+                
+                # Equivalent URLs (parameter order, fragments) collapse to one entry
+                added = self.frontier.add_many(found, kind='law')
+                self.frontier.mark_done(url)
+                logger.info(f"{len(found)} law links on page, {added} new")
+                
+            except Exception as e:
+                logger.error(f"Error fetching law links: {e}")
+                self.frontier.mark_failed(url)
+        
+        law_links = [
+            {'title': entry['data'].get('title', ''), 'url': entry['url'], 'crawl_state': entry['state']}
+            for entry in self.frontier.entries(kind='law')
+        ]
+        logger.info(f"Found {len(law_links)} potential law links")
+        return law_links
     
     def scrape_law_detail(self, law_url: str, title: str = "") -> Optional[Dict]:
         """
@@ -106,129 +243,52 @@ class AutomatedMOJScraper:
             response = self.session.get(law_url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract title if not provided
-            if not title:
-                title_elem = soup.find('h1') or soup.find('h2') or soup.find('title')
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-            
-            # Extract metadata
-            metadata = {}
-            
-            # Look for issue date
-            text_content = soup.get_text()
-            date_patterns = [
-                r'Issued on (\d{1,2}/\d{1,2}/\d{4})',
-                r'Issued Date[:\s]+(\d{1,2}/\d{1,2}/\d{4})',
-                r'Date[:\s]+(\d{1,2}/\d{1,2}/\d{4})'
-            ]
-            
-            for pattern in date_patterns:
-                match = re.search(pattern, text_content, re.IGNORECASE)
-                if match:
-                    metadata['issue_date'] = match.group(1)
-                    break
+            return self.parse_law_detail(law_url, response.content, title)
             
-            # Look for Hijri date
-            hijri_match = re.search(r'Corresponding to (\d+ \w+ \d+ H\.?)', text_content)
-            if hijri_match:
-                metadata['hijri_date'] = hijri_match.group(1)
-            
-            # Look for law number
-            law_num_match = re.search(r'(Federal (?:Law|Decree-Law) No\.?\s*\d+)', title or text_content, re.IGNORECASE)
-            if law_num_match:
-                metadata['law_number'] = law_num_match.group(1)
-            
-            # Extract full text content
-            full_text = ""
-            
-            # Try to find main content area
-            content_selectors = [
-                ('div', {'class': re.compile(r'article|content|law-text|main-content', re.I)}),
-                ('div', {'id': re.compile(r'MainContent|article|content', re.I)}),
-                ('article', {}),
-            ]
-            
-            content_elem = None
-            for tag, attrs in content_selectors:
-                content_elem = soup.find(tag, attrs)
-                if content_elem:
-                    break
-            
-            if content_elem:
-                # Remove script and style elements
-                for script in content_elem(['script', 'style', 'nav', 'header', 'footer']):
-                    script.decompose()
-                
-                full_text = content_elem.get_text(separator='\n', strip=True)
-            else:
-                # Fallback: get body text
-                body = soup.find('body')
-                if body:
-                    for script in body(['script', 'style', 'nav', 'header', 'footer']):
-                        script.decompose()
-                    full_text = body.get_text(separator='\n', strip=True)
-            
-            # Clean up the text
-            full_text = re.sub(r'\n\s*\n', '\n\n', full_text)  # Remove excessive newlines
-            full_text = re.sub(r' +', ' ', full_text)  # Remove excessive spaces
-            
-            # Extract articles
-            articles = []
-            article_pattern = r'Article\s+(\d+|One|Two|Three|Four|Five|[IVX]+)'
+        except Exception as e:
+            logger.error(f"Error scraping {law_url}: {e}")
+            return None
+    
+    async def scrape_law_detail_async(self, engine: AsyncFetchEngine, law_url: str,
+                                      title: str = "") -> Optional[Dict]:
+        """
+        Async variant of scrape_law_detail that fetches through an AsyncFetchEngine
+        
+        Args:
+            engine: Open AsyncFetchEngine (handles concurrency and rate limits)
+            law_url: URL of the law page
+            title: Pre-extracted title (optional)
             
-            for match in re.finditer(article_pattern, full_text, re.IGNORECASE):
-                article_num = match.group(0)
-                start_pos = match.end()
-                
-                # Find the next article or end of text
-                next_match = re.search(article_pattern, full_text[start_pos:], re.IGNORECASE)
-                end_pos = start_pos + next_match.start() if next_match else len(full_text)
-                
-                article_text = full_text[start_pos:end_pos].strip()
-                
-                if article_text and len(article_text) > 10:  # Meaningful content
-                    articles.append({
-                        'article_number': article_num,
-                        'text': article_text[:500]  # First 500 chars
-                    })
+        Returns:
+            Dictionary with complete law data
+        """
+        try:
+            logger.info(f"Scraping: {title or law_url}")
             
-            # Determine category from URL or content
-            category = "UAE Federal Law"
-            if 'traffic' in full_text.lower()[:500]:
-                category = "Traffic and Transportation"
-            elif 'personal status' in full_text.lower()[:500] or 'marriage' in full_text.lower()[:500]:
-                category = "Family and Personal Status"
-            elif 'labor' in full_text.lower()[:500] or 'employment' in full_text.lower()[:500]:
-                category = "Labor and Employment"
-            elif 'commercial' in full_text.lower()[:500] or 'business' in full_text.lower()[:500]:
-                category = "Commercial Law"
+            response = await engine.fetch(law_url)
             
-            return {
-                'id': f"moj_{hash(law_url) % 1000000}",
-                'title': title,
-                'url': law_url,
-                'category': category,
-                'full_text': full_text,
-                'metadata': metadata,
-                'articles': articles,
-                'word_count': len(full_text.split()),
-                'scraped_at': datetime.now().isoformat(),
-                'source': 'MOJ Legal Portal'
-            }
+            # Parse off the event loop; waits here while the pool is full
+            return await self.parse_pool.parse(parse_law_page, law_url, response.content, title)
             
         except Exception as e:
             logger.error(f"Error scraping {law_url}: {e}")
             return None
     
-    def scrape_all_laws(self, max_laws: Optional[int] = None) -> List[Dict]:
+    def parse_law_detail(self, law_url: str, content: bytes, title: str = "") -> Dict:
+        """Parse a fetched law page in this process (see parse_law_page)"""
+        return parse_law_page(law_url, content, title)
+    
+    def scrape_all_laws(self, max_laws: Optional[int] = None, resume: bool = False,
+                        incremental: bool = False, sample: int = 5) -> List[Dict]:
         """
         Automatically scrape all laws from the portal
         
         Args:
             max_laws: Maximum number of laws to scrape (None for all)
+            resume: Skip laws already scraped by an earlier, interrupted run
+            incremental: Only scrape laws that are new or changed since the
+                last incremental run (plus `sample` unchanged ones)
+            sample: Unchanged laws to re-check per incremental run
             
         Returns:
             List of scraped law dictionaries
@@ -242,31 +302,124 @@ class AutomatedMOJScraper:
             logger.warning("No law links found")
             return []
         
+        if resume:
+            law_links = [link for link in law_links if link['crawl_state'] != 'done']
+            logger.info(f"Resuming: {len(law_links)} laws left to scrape")
+        
         if max_laws:
             law_links = law_links[:max_laws]
         
+        listing = law_links
+        if incremental:
+            law_links = self.snapshots.diff(listing, sample=sample).to_scrape
+        
         logger.info(f"Will scrape {len(law_links)} laws")
         
-        # Scrape each law
+        if self.concurrency > 1 and async_fetch_available():
+            results = asyncio.run(self._scrape_laws_async(law_links))
+        else:
+            if self.concurrency > 1:
+                logger.warning("httpx not installed - falling back to sequential scraping")
+            results = self._scrape_laws_sync(law_links)
+        
         laws = []
-        for idx, law_info in enumerate(law_links, 1):
-            logger.info(f"Progress: {idx}/{len(law_links)}")
-            
-            law_data = self.scrape_law_detail(law_info['url'], law_info['title'])
-            
+        for law_info, law_data in zip(law_links, results):
             if law_data and law_data.get('word_count', 0) > 100:  # Meaningful content
+                law_data['id'] = self.registry.resolve(law_data['url'], 'moj', title=law_data['title'])
                 laws.append(law_data)
                 self.laws_scraped.append(law_data)
                 logger.info(f"✓ Scraped: {law_data['title'][:60]}... ({law_data['word_count']} words)")
             else:
                 logger.warning(f"✗ Skipped: {law_info['title'][:60]}... (insufficient content)")
-            
-            # Be respectful - wait between requests
-            time.sleep(2)
+        
+        if incremental:
+            self.snapshots.commit(listing, [info['url'] for info, data in zip(law_links, results) if data])
         
         logger.info(f"Scraping complete! Successfully scraped {len(laws)} laws")
+        self.parse_pool.log_stats()
+        self.parse_pool.close()
+        self.frontier.log_stats()
+        self.registry.log_stats()
+        self.http_cache.log_stats()
+        self.rate_controllers.log_stats()
+        self.resilience.log_stats()
         return laws
     
+    def _scrape_laws_sync(self, law_links: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Fetch laws one at a time through the shared requests session
+        
+        Each page is handed to the parse pool, so it is parsed while the next
+        one downloads.
+        """
+        futures = []
+        for idx, law_info in enumerate(law_links, 1):
+            logger.info(f"Progress: {idx}/{len(law_links)}")
+            
+            # Pacing between requests is handled by the session's rate controller
+            content = self._fetch_law_page(law_info)
+            if content is None:
+                futures.append(None)
+                continue
+            futures.append(self.parse_pool.submit(parse_law_page, law_info['url'], content, law_info['title']))
+        
+        results = []
+        for law_info, future in zip(law_links, futures):
+            law_data = None
+            if future is not None:
+                try:
+                    law_data = future.result()
+                except Exception as e:
+                    logger.error(f"Error parsing {law_info['url']}: {e}")
+            self._record_progress(law_info, law_data)
+            results.append(law_data)
+        
+        return results
+    
+    def _fetch_law_page(self, law_info: Dict) -> Optional[bytes]:
+        """Raw HTML of a law page, or None if the request failed"""
+        try:
+            logger.info(f"Scraping: {law_info['title'] or law_info['url']}")
+            response = self.session.get(law_info['url'], timeout=30)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            logger.error(f"Error scraping {law_info['url']}: {e}")
+            return None
+    
+    async def _scrape_laws_async(self, law_links: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Scrape laws concurrently
+        
+        Request starts are paced by the same per-domain rate controller as the
+        sequential path, but up to `concurrency` requests may be in flight so
+        their latency overlaps.
+        """
+        completed = 0
+        
+        async with AsyncFetchEngine(headers=dict(self.session.headers),
+                                    max_per_host=self.concurrency,
+                                    cache=self.http_cache,
+                                    rate_controllers=self.rate_controllers,
+                                    resilience=self.resilience) as engine:
+            
+            async def worker(law_info: Dict) -> Optional[Dict]:
+                nonlocal completed
+                law_data = await self.scrape_law_detail_async(engine, law_info['url'], law_info['title'])
+                self._record_progress(law_info, law_data)
+                completed += 1
+                logger.info(f"Progress: {completed}/{len(law_links)}")
+                return law_data
+            
+            return await engine.map(law_links, worker)
+    
+    def _record_progress(self, law_info: Dict, law_data: Optional[Dict]):
+        """Mark a law done/failed in the frontier as soon as it finishes"""
+        if law_data:
+            self.frontier.mark_done(law_info['url'])
+        else:
+            self.frontier.mark_failed(law_info['url'])
+    
     def save_to_json(self, laws: List[Dict], filename: str = "moj_laws_automated.json"):
         """Save scraped laws to JSON file"""
         filepath = os.path.join(self.output_dir, filename)
@@ -297,7 +450,9 @@ class AutomatedMOJScraper:
             'total_words': total_words,
             'total_articles': total_articles,
             'average_words_per_law': total_words // len(self.laws_scraped) if self.laws_scraped else 0,
-            'categories': categories
+            'categories': categories,
+            'http_cache': self.http_cache.get_stats(),
+            'requests': self.resilience.get_stats()
         }
 
 
@@ -312,13 +467,18 @@ def main():
     
     # Parse command line arguments
     max_laws = None
-    if len(sys.argv) > 1:
+    concurrency = 4
+    incremental = '--incremental' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--incremental']
+    if args:
         try:
-            max_laws = int(sys.argv[1])
+            max_laws = int(args[0])
+            if len(args) > 1:
+                concurrency = int(args[1])
             print(f"Will scrape maximum {max_laws} laws")
         except:
-            print("Usage: python3 automated_moj_scraper.py [max_laws]")
-            print("Example: python3 automated_moj_scraper.py 50")
+            print("Usage: python3 automated_moj_scraper.py [max_laws] [concurrency] [--incremental]")
+            print("Example: python3 automated_moj_scraper.py 50 4")
             return
     else:
         print("Will scrape ALL available laws (this may take a while)")
@@ -327,10 +487,10 @@ def main():
     print()
     
     # Create scraper
-    scraper = AutomatedMOJScraper()
+    scraper = AutomatedMOJScraper(concurrency=concurrency)
     
     # Scrape all laws
-    laws = scraper.scrape_all_laws(max_laws=max_laws)
+    laws = scraper.scrape_all_laws(max_laws=max_laws, incremental=incremental)
     
     if laws:
         # Save to JSON
@@ -352,6 +512,12 @@ def main():
         for cat, count in summary['categories'].items():
             print(f"  - {cat}: {count}")
         print()
+        cache_stats = summary['http_cache']
+        print(f"HTTP Cache: {cache_stats['hits']} hits, {cache_stats['revalidated']} revalidated, "
+              f"{cache_stats['misses']} misses")
+        request_stats = summary['requests']
+        print(f"Retries: {request_stats['retries']} ({request_stats['backoff_seconds']}s in backoff)")
+        print()
         print(f"✓ Data saved to: {json_file}")
         print()
         print("Next step: Run the data processor to ingest into Supabase:")
@@ -0,0 +1,219 @@
+"""
+Local Content-Hash Index
+SQLite mirror of the content hashes already in the knowledge base, kept in
+sync incrementally through an updated_at watermark, so duplicate checks are
+local O(1) lookups and keep working (from the last sync) when the database
+cannot be reached
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_INDEX_DB = os.getenv(
+    'SCRAPER_CONTENT_INDEX_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/content_index.db"
+)
+
+
+class RemoteQueryError(Exception):
+    """The knowledge base could not be queried"""
+
+
+def execute_sql(query: str, timeout: float = 60) -> List[Dict]:
+    """
+    Run a query against the Supabase knowledge base through the MCP CLI
+
+    Raises:
+        RemoteQueryError if the CLI fails, times out or returns something
+        other than a list of rows
+    """
+    try:
+        result = subprocess.run(
+            ['manus-mcp-cli', 'tool', 'call', 'execute_sql', '--server', 'supabase',
+             '--input', json.dumps({"query": query})],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise RemoteQueryError(f"execute_sql could not run: {e}")
+
+    if result.returncode != 0:
+        raise RemoteQueryError(f"execute_sql exited with {result.returncode}: {result.stderr.strip()[:200]}")
+    try:
+        rows = json.loads(result.stdout)
+    except ValueError as e:
+        raise RemoteQueryError(f"execute_sql returned invalid JSON: {e}")
+    if not isinstance(rows, list):
+        raise RemoteQueryError(f"execute_sql returned {type(rows).__name__}, not rows")
+    return rows
+
+
+def _sql_literal(value) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class ContentHashIndex:
+    """
+    Local index of content hash -> (document ID, title)
+
+    `sync` pulls only the rows changed since the last sync (keyset paging
+    on updated_at, id), so a run costs one small query instead of reading
+    the whole table. If the database is unreachable the index keeps
+    serving the last synced state and says how old it is, rather than
+    silently disabling deduplication.
+
+    Rows deleted remotely are not seen by an incremental sync, so a full
+    resync replaces the index every `full_sync_every` seconds.
+
+    Works as a mapping of hash -> title for duplicate checks; hashes set
+    with `index[hash] = title` (documents of the current run that are not
+    ingested yet) are kept in memory only.
+
+    Usage:
+        index = ContentHashIndex()
+        index.sync()
+        if content_hash in index:
+            print(f"duplicate of {index[content_hash]}")
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CONTENT_INDEX_DB, table: str = 'legal_articles',
+                 page_size: int = 5000, full_sync_every: float = 7 * 24 * 3600, query=execute_sql):
+        self.table = table
+        self.page_size = page_size
+        self.full_sync_every = full_sync_every
+        self.query = query
+        self.pending: Dict[str, str] = {}
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS content_hash (
+                hash TEXT NOT NULL,
+                doc_id TEXT NOT NULL PRIMARY KEY,
+                title TEXT,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS content_hash_hash ON content_hash (hash);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                source TEXT PRIMARY KEY,
+                watermark TEXT,
+                watermark_id TEXT,
+                last_sync REAL,
+                last_full_sync REAL
+            );
+        """)
+        self._conn.commit()
+
+    def _state(self) -> tuple:
+        row = self._conn.execute(
+            "SELECT watermark, watermark_id, last_sync, last_full_sync FROM sync_state WHERE source = ?",
+            (self.table,)
+        ).fetchone()
+        return row or (None, None, None, None)
+
+    def _fetch_page(self, watermark: Optional[str], watermark_id: Optional[str]) -> List[Dict]:
+        after = ''
+        if watermark is not None:
+            after = (f"AND (updated_at, id) > ({_sql_literal(watermark)}::timestamptz, "
+                     f"{int(watermark_id)}) ")
+        return self.query(
+            f"SELECT id, title, metadata->>'content_hash' AS hash, updated_at FROM {self.table} "
+            f"WHERE metadata->>'content_hash' IS NOT NULL {after}"
+            f"ORDER BY updated_at, id LIMIT {self.page_size}"
+        )
+
+    def sync(self, full: bool = False) -> bool:
+        """
+        Pull rows changed since the last sync
+
+        Args:
+            full: Re-read the whole table (also done automatically every
+                `full_sync_every` seconds, to drop deleted rows)
+
+        Returns:
+            True if the index is up to date, False if the database could
+            not be reached (the index still holds the last synced state)
+        """
+        watermark, watermark_id, last_sync, last_full_sync = self._state()
+        full = full or last_full_sync is None or time.time() - last_full_sync > self.full_sync_every
+        if full:
+            watermark = watermark_id = None
+
+        rows = []
+        try:
+            while True:
+                page = self._fetch_page(watermark, watermark_id)
+                rows.extend(page)
+                if page:
+                    watermark, watermark_id = str(page[-1]['updated_at']), str(page[-1]['id'])
+                if len(page) < self.page_size:
+                    break
+        except RemoteQueryError as e:
+            if last_sync is None:
+                logger.warning(f"Content index: database unreachable and never synced ({e}) - "
+                               f"only duplicates within this run will be caught")
+            else:
+                logger.warning(f"Content index: database unreachable ({e}) - using the index from "
+                               f"{(time.time() - last_sync) / 3600:.1f}h ago ({len(self)} hashes)")
+            return False
+
+        now = time.time()
+        with self._lock:
+            if full:
+                self._conn.execute("DELETE FROM content_hash")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO content_hash (hash, doc_id, title, updated_at) VALUES (?, ?, ?, ?)",
+                [(row['hash'], str(row['id']), row.get('title'), str(row['updated_at'])) for row in rows]
+            )
+            self._conn.execute(
+                "INSERT INTO sync_state (source, watermark, watermark_id, last_sync, last_full_sync) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (source) DO UPDATE SET "
+                "watermark = excluded.watermark, watermark_id = excluded.watermark_id, "
+                "last_sync = excluded.last_sync, last_full_sync = excluded.last_full_sync",
+                (self.table, watermark, watermark_id, now, now if full else last_full_sync)
+            )
+            self._conn.commit()
+
+        logger.info(f"Content index: {'full' if full else 'incremental'} sync, {len(rows)} rows "
+                    f"pulled, {len(self)} hashes indexed")
+        return True
+
+    def lookup(self, content_hash: str) -> Optional[Dict]:
+        """Document with this content hash ({'doc_id', 'title'}), or None"""
+        if content_hash in self.pending:
+            return {'doc_id': None, 'title': self.pending[content_hash]}
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_id, title FROM content_hash WHERE hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return {'doc_id': row[0], 'title': row[1]} if row else None
+
+    def __contains__(self, content_hash: str) -> bool:
+        return self.lookup(content_hash) is not None
+
+    def __getitem__(self, content_hash: str) -> str:
+        match = self.lookup(content_hash)
+        if match is None:
+            raise KeyError(content_hash)
+        return match['title']
+
+    def __setitem__(self, content_hash: str, title: str):
+        self.pending[content_hash] = title
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM content_hash").fetchone()[0] + len(self.pending)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,350 @@
+"""
+Persistent Crawl Frontier
+SQLite-backed URL frontier with canonical URL normalization, a Bloom-filter
+seen-set, priority ordering and crash-safe resume, so a re-run continues
+where the previous one stopped instead of re-walking every index page
+"""
+
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRONTIER_DB = os.getenv(
+    'SCRAPER_FRONTIER_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/crawl_frontier.db"
+)
+
+PENDING = 'pending'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+
+# Query parameters that never change the page content
+_IGNORED_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+                   'fbclid', 'gclid')
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+_PERCENT_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+_UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+
+
+def _normalize_escape(match) -> str:
+    # Unreserved characters mean the same escaped or not; reserved ones
+    # (%2F, %3B, ...) do not, so they stay escaped
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else f"%{match.group(1).upper()}"
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for de-duplication
+
+    Lower-cases the scheme and host, drops default ports, fragments and
+    tracking parameters, sorts the query string and normalizes
+    percent-encoding, so equivalent URLs compare equal. The result is a
+    key only - it is not guaranteed to fetch the same page (blank query
+    values gain an '=', spaces become '+'), so the frontier fetches the URL
+    as it was found.
+    """
+    parts = urlparse(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = quote(_PERCENT_ESCAPE.sub(_normalize_escape, parts.path or '/'), safe="/:@!$&'()*+,;=-._~%")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in _IGNORED_PARAMS
+    )
+    return urlunparse((scheme, host, path, parts.params, urlencode(query), ''))
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter
+
+    Answers "definitely not seen" without touching the database; a positive
+    answer may be a false positive (at roughly `error_rate` once `capacity`
+    items were added) and is confirmed against SQLite.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class CrawlFrontier:
+    """
+    Persistent frontier for one named crawl
+
+    Every URL is stored once, keyed by its normalized form, with a kind
+    ('index', 'law', 'pdf', ...), a priority, a state and optional JSON data
+    such as the link title. Entries carry the URL as first found, which is
+    the one to fetch; mark_done / mark_failed accept either form. Work is handed out highest priority first, then in discovery
+    order. URLs left in progress by a crashed run go back to pending when the
+    frontier is reopened, and finished URLs become pending again after
+    `revisit_after` seconds so index pages are eventually re-checked.
+
+    Usage:
+        frontier = CrawlFrontier('moj')
+        frontier.add(index_url, kind='index', priority=10)
+        for entry in frontier.claim(kind='index'):
+            ...
+            frontier.mark_done(entry['url'])
+    """
+
+    def __init__(self, crawl: str, db_path: str = DEFAULT_FRONTIER_DB,
+                 revisit_after: Optional[float] = 86400, capacity: int = 1_000_000,
+                 error_rate: float = 0.001):
+        self.crawl = crawl
+        self.db_path = db_path
+        self.revisit_after = revisit_after
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                crawl TEXT NOT NULL,
+                url TEXT NOT NULL,
+                original_url TEXT,
+                kind TEXT NOT NULL DEFAULT '',
+                priority INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                data TEXT,
+                seq INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (crawl, url)
+            )
+        """)
+        # Frontiers created before the found URL was kept lack the column;
+        # their entries fall back to the normalized URL
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")]
+        if 'original_url' not in columns:
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN original_url TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (crawl, state, kind, priority DESC, seq)"
+        )
+        self._conn.commit()
+
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._seen = BloomFilter(capacity, error_rate)
+        self._seq = 0
+        self._recover()
+
+    def _recover(self):
+        """Rebuild the seen-set and requeue work from an interrupted or stale run"""
+        with self._lock:
+            now = time.time()
+            requeued = self._conn.execute(
+                "UPDATE frontier SET state = ? WHERE crawl = ? AND state = ?",
+                (PENDING, self.crawl, IN_PROGRESS)
+            ).rowcount
+            if self.revisit_after is not None:
+                self._conn.execute(
+                    "UPDATE frontier SET state = ? WHERE crawl = ? AND state = ? AND updated_at < ?",
+                    (PENDING, self.crawl, DONE, now - self.revisit_after)
+                )
+            self._conn.commit()
+
+            for (url,) in self._conn.execute("SELECT url FROM frontier WHERE crawl = ?", (self.crawl,)):
+                self._seen.add(url)
+            row = self._conn.execute("SELECT MAX(seq) FROM frontier WHERE crawl = ?", (self.crawl,)).fetchone()
+            self._seq = row[0] or 0
+
+        if requeued:
+            logger.info(f"Frontier '{self.crawl}': resuming {requeued} URLs left in progress")
+
+    def seen(self, url: str) -> bool:
+        """True if the (normalized) URL is already in the frontier"""
+        url = normalize_url(url)
+        if url not in self._seen:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM frontier WHERE crawl = ? AND url = ?", (self.crawl, url)
+            ).fetchone()
+        return row is not None
+
+    def add(self, url: str, kind: str = '', priority: int = 0, data: Optional[Dict] = None) -> bool:
+        """
+        Add a URL unless an equivalent one is already known
+
+        Returns:
+            True if the URL was new
+        """
+        return self.add_many([(url, data)], kind=kind, priority=priority) == 1
+
+    def add_many(self, items: Iterable, kind: str = '', priority: int = 0) -> int:
+        """
+        Add (url, data) pairs in one transaction
+
+        Returns:
+            Number of URLs that were new
+        """
+        added = 0
+        with self._lock:
+            now = time.time()
+            for original_url, data in items:
+                url = normalize_url(original_url)
+                if url in self._seen:
+                    # Possibly seen: let the primary key decide
+                    exists = self._conn.execute(
+                        "SELECT 1 FROM frontier WHERE crawl = ? AND url = ?", (self.crawl, url)
+                    ).fetchone()
+                    if exists:
+                        continue
+                self._seq += 1
+                self._conn.execute(
+                    "INSERT INTO frontier (crawl, url, original_url, kind, priority, state, data, seq, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.crawl, url, original_url.strip(), kind, priority, PENDING,
+                     json.dumps(data, ensure_ascii=False) if data is not None else None, self._seq, now)
+                )
+                self._seen.add(url)
+                added += 1
+            self._conn.commit()
+        return added
+
+    def claim(self, kind: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Take pending URLs for processing (highest priority first)
+
+        Claimed URLs are marked in progress until mark_done / mark_failed;
+        if the process dies first they are handed out again on the next run.
+        """
+        with self._lock:
+            query = ("SELECT url, kind, priority, data, attempts, COALESCE(original_url, url) FROM frontier "
+                     "WHERE crawl = ? AND state = ?")
+            params: list = [self.crawl, PENDING]
+            if kind is not None:
+                query += " AND kind = ?"
+                params.append(kind)
+            query += " ORDER BY priority DESC, seq"
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit)
+
+            rows = self._conn.execute(query, params).fetchall()
+            self._conn.executemany(
+                "UPDATE frontier SET state = ?, attempts = attempts + 1, updated_at = ? WHERE crawl = ? AND url = ?",
+                [(IN_PROGRESS, time.time(), self.crawl, row[0]) for row in rows]
+            )
+            self._conn.commit()
+
+        return [self._entry(row) for row in rows]
+
+    def entries(self, kind: Optional[str] = None, state: Optional[str] = None) -> List[Dict]:
+        """All URLs of a kind / state, in priority and discovery order"""
+        query = ("SELECT url, kind, priority, data, attempts, COALESCE(original_url, url), state FROM frontier "
+                 "WHERE crawl = ?")
+        params: list = [self.crawl]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        if state is not None:
+            query += " AND state = ?"
+            params.append(state)
+        query += " ORDER BY priority DESC, seq"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _entry(row) -> Dict:
+        entry = {
+            'url': row[5],
+            'key': row[0],
+            'kind': row[1],
+            'priority': row[2],
+            'data': json.loads(row[3]) if row[3] else {},
+            'attempts': row[4]
+        }
+        if len(row) > 6:
+            entry['state'] = row[6]
+        return entry
+
+    def _set_state(self, url: str, state: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE frontier SET state = ?, updated_at = ? WHERE crawl = ? AND url = ?",
+                (state, time.time(), self.crawl, normalize_url(url))
+            )
+            self._conn.commit()
+
+    def mark_done(self, url: str):
+        self._set_state(url, DONE)
+
+    def mark_failed(self, url: str):
+        self._set_state(url, FAILED)
+
+    def retry_failed(self, max_attempts: int = 3) -> int:
+        """Requeue failed URLs that have been tried fewer than `max_attempts` times"""
+        with self._lock:
+            count = self._conn.execute(
+                "UPDATE frontier SET state = ? WHERE crawl = ? AND state = ? AND attempts < ?",
+                (PENDING, self.crawl, FAILED, max_attempts)
+            ).rowcount
+            self._conn.commit()
+        return count
+
+    def reset(self):
+        """Forget this crawl entirely"""
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier WHERE crawl = ?", (self.crawl,))
+            self._conn.commit()
+            self._seen = BloomFilter(self._capacity, self._error_rate)
+            self._seq = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """URL counts per state"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM frontier WHERE crawl = ? GROUP BY state", (self.crawl,)
+            ).fetchall()
+        stats = {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0}
+        stats.update(dict(rows))
+        stats['total'] = sum(count for _, count in rows)
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Frontier '{self.crawl}': {stats['total']} URLs, {stats[DONE]} done, "
+            f"{stats[PENDING]} pending, {stats[FAILED]} failed"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
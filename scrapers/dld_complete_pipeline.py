@@ -7,12 +7,22 @@ Downloads PDFs, extracts content, checks duplicates, and ingests to Supabase
 import json
 import os
 import requests
-import subprocess
 import hashlib
 import re
 from datetime import datetime
 import logging
 
+from article_segmenter import add_page_anchors, segment_articles
+from content_index import ContentHashIndex
+from document_identity import DocumentRegistry
+from extraction_cache import ExtractionCache
+from near_duplicates import NearDuplicateIndex
+from pdf_download import download_pdf_stream, is_valid_pdf
+from pdf_extract import PAGE_BREAK, PDFTextExtractor
+from pdf_ocr import PageOCR
+from rate_controller import install_rate_controller
+from resilience import install_resilience
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -32,6 +42,28 @@ class DLDCompletePipeline:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        
+        # Adaptive per-domain pacing plus retries / circuit breaking (only
+        # network requests wait, so PDFs already on disk are processed
+        # without delay)
+        self.rate_controllers = install_rate_controller(self.session)
+        self.resilience = install_resilience(self.session)
+        
+        # Extraction runs on every core while the next PDFs download; the
+        # cache is keyed by PDF content, so a replaced PDF is re-extracted.
+        # Scanned pages (no text layer) go through OCR.
+        extraction_cache = ExtractionCache()
+        self.pdf_extractor = PDFTextExtractor(cache=extraction_cache, ocr=PageOCR(cache=extraction_cache))
+        
+        # Stable document IDs (the same URL gets the same ID on every run)
+        self.registry = DocumentRegistry()
+        
+        # Local mirror of the knowledge base's content hashes
+        self.content_index = ContentHashIndex()
+        
+        # Persistent MinHash/LSH index shared with the other ingesters, so
+        # republished or cross-source copies are caught before ingestion
+        self.near_duplicates = NearDuplicateIndex()
     
     def load_pdf_list(self, json_file):
         """Load the list of PDFs to download"""
@@ -48,52 +80,30 @@ class DLDCompletePipeline:
             
             filepath = os.path.join(self.pdf_dir, filename)
             
-            # Skip if exists
-            if os.path.exists(filepath):
+            # Skip if a complete PDF is already on disk
+            if is_valid_pdf(filepath):
                 logger.info(f"Already downloaded: {filename}")
                 return filepath
             
             logger.info(f"Downloading: {filename}")
-            response = self.session.get(pdf_info['url'], timeout=60)
-            response.raise_for_status()
+            size = download_pdf_stream(self.session, pdf_info['url'], filepath, timeout=60)
             
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            logger.info(f"✓ Downloaded: {filename} ({len(response.content)/1024:.1f} KB)")
+            logger.info(f"✓ Downloaded: {filename} ({size/1024:.1f} KB)")
             return filepath
             
         except Exception as e:
             logger.error(f"Error downloading {pdf_info['url']}: {e}")
             return None
     
+    def text_path(self, pdf_path):
+        """Where a copy of the extracted text of a PDF is written"""
+        text_filename = os.path.basename(pdf_path).replace('.pdf', '.txt')
+        return os.path.join(self.text_dir, text_filename)
+    
     def extract_text(self, pdf_path):
-        """Extract text from PDF"""
+        """Extract text from PDF (cached by content; a copy is written to the text directory)"""
         try:
-            text_filename = os.path.basename(pdf_path).replace('.pdf', '.txt')
-            text_path = os.path.join(self.text_dir, text_filename)
-            
-            # Skip if exists
-            if os.path.exists(text_path):
-                with open(text_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            
-            # Extract using pdftotext
-            result = subprocess.run(
-                ['pdftotext', '-enc', 'UTF-8', pdf_path, text_path],
-                capture_output=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0 and os.path.exists(text_path):
-                with open(text_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
-                logger.info(f"✓ Extracted: {text_filename} ({len(text)} chars)")
-                return text
-            else:
-                logger.warning(f"Failed to extract: {pdf_path}")
-                return None
-                
+            return self.pdf_extractor.extract(pdf_path, self.text_path(pdf_path))
         except Exception as e:
             logger.error(f"Error extracting {pdf_path}: {e}")
             return None
@@ -104,30 +114,12 @@ class DLDCompletePipeline:
         return hashlib.md5(normalized.encode('utf-8')).hexdigest()
     
     def check_existing_hashes(self):
-        """Get hashes of existing documents in knowledge base"""
-        try:
-            # Try to query Supabase for existing hashes
-            import subprocess
-            result = subprocess.run(
-                ['manus-mcp-cli', 'tool', 'call', 'execute_sql', '--server', 'supabase',
-                 '--input', json.dumps({"query": "SELECT title, metadata->>'content_hash' as hash FROM legal_articles WHERE metadata->>'content_hash' IS NOT NULL"})],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
-                output = json.loads(result.stdout)
-                hashes = {item.get('hash'): item.get('title') for item in output if item.get('hash')}
-                logger.info(f"Found {len(hashes)} existing document hashes")
-                return hashes
-            else:
-                logger.warning("Could not fetch existing hashes")
-                return {}
-                
-        except Exception as e:
-            logger.warning(f"Error checking existing hashes: {e}")
-            return {}
+        """
+        Hashes of existing documents in knowledge base, from the local
+        index (synced incrementally; the last synced state if offline)
+        """
+        self.content_index.sync()
+        return self.content_index
     
     def process_all_pdfs(self, pdf_list_file):
         """Download and process all PDFs"""
@@ -137,6 +129,10 @@ class DLDCompletePipeline:
         pdf_list = self.load_pdf_list(pdf_list_file)
         logger.info(f"Found {len(pdf_list)} PDFs to process")
         
+        # Everything listed this run is live, so a PDF whose bytes also sit
+        # at another listed URL is not mistaken for that one moving
+        self.registry.mark_seen(pdf_info['url'] for pdf_info in pdf_list)
+        
         # Get existing hashes
         existing_hashes = self.check_existing_hashes()
         
@@ -144,6 +140,14 @@ class DLDCompletePipeline:
         documents = []
         duplicates = []
         
+        # Near-duplicates within this batch are caught in memory; the shared
+        # index only learns a document once the ingester has stored it, so a
+        # document that never makes it into Supabase cannot block its copies
+        batch_index = NearDuplicateIndex(':memory:')
+        
+        # Download one PDF at a time and queue its extraction right away, so
+        # earlier PDFs are extracted while later ones download
+        extractions = []
         for idx, pdf_info in enumerate(pdf_list, 1):
             logger.info(f"Progress: {idx}/{len(pdf_list)}")
             
@@ -152,8 +156,15 @@ class DLDCompletePipeline:
             if not pdf_path:
                 continue
             
-            # Extract text
-            text = self.extract_text(pdf_path)
+            extractions.append((pdf_info, pdf_path, self.pdf_extractor.submit(pdf_path, self.text_path(pdf_path))))
+        
+        for pdf_info, pdf_path, extraction in extractions:
+            try:
+                text = extraction.result()
+            except Exception as e:
+                logger.error(f"Error extracting {pdf_path}: {e}")
+                text = None
+            
             if not text or len(text) < 100:
                 logger.warning(f"Insufficient content: {pdf_info['url']}")
                 continue
@@ -162,12 +173,30 @@ class DLDCompletePipeline:
             content_hash = self.calculate_hash(text)
             if content_hash in existing_hashes:
                 logger.info(f"Duplicate found: {pdf_info['title']} (matches: {existing_hashes[content_hash]})")
-                duplicates.append(pdf_info)
+                duplicates.append(dict(pdf_info, duplicate_of={'title': existing_hashes[content_hash],
+                                                               'similarity': 1.0}))
+                continue
+            
+            # Near-duplicates: the same regulation republished with another
+            # header, or already ingested from another source
+            signature = self.near_duplicates.signature(text)
+            match = (self.near_duplicates.find_duplicate(signature, exclude=pdf_info['url'])
+                     or batch_index.find_duplicate(signature, exclude=pdf_info['url']))
+            if match:
+                logger.info(f"Near-duplicate found: {pdf_info['title']} (matches: {match['title']}, "
+                            f"similarity {match['similarity']})")
+                duplicates.append(dict(pdf_info, duplicate_of=match))
                 continue
             
+            # Split into articles (Arabic and English headings) so the text
+            # can be chunked and indexed per article, each with the PDF
+            # pages it came from for citations
+            articles = add_page_anchors(segment_articles(text), text)
+            
             # Create document record
             doc = {
-                'id': f"dld_{abs(hash(pdf_info['url'])) % 1000000}",
+                'id': self.registry.resolve(pdf_info['url'], 'dld', title=pdf_info.get('title'),
+                                            content_hash=content_hash),
                 'title': pdf_info.get('title', os.path.basename(pdf_path)),
                 'url': pdf_info['url'],
                 'category': 'Dubai Real Estate Law',
@@ -176,21 +205,26 @@ class DLDCompletePipeline:
                     'source': 'Dubai Land Department',
                     'pdf_file': os.path.basename(pdf_path),
                     'content_hash': content_hash,
+                    'page_count': text.count(PAGE_BREAK),
                     'extracted_at': datetime.now().isoformat()
                 },
+                'articles': articles,
                 'word_count': len(text.split()),
                 'scraped_at': datetime.now().isoformat(),
                 'source': 'DLD Rules and Regulations'
             }
             
             documents.append(doc)
+            logger.info(f"Segmented {doc['title']}: {len(articles)} articles")
             existing_hashes[content_hash] = doc['title']  # Add to prevent duplicates in this batch
-            
-            # Be respectful
-            import time
-            time.sleep(1)
+            batch_index.add(pdf_info['url'], signature, title=doc['title'], source='dld')
         
         logger.info(f"Processing complete! {len(documents)} new documents, {len(duplicates)} duplicates")
+        self.pdf_extractor.log_stats()
+        self.near_duplicates.log_stats()
+        self.registry.log_stats()
+        self.rate_controllers.log_stats()
+        self.resilience.log_stats()
         
         return documents, duplicates
     
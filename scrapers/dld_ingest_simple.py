@@ -7,10 +7,23 @@ import json
 import subprocess
 import logging
 
+from document_identity import ADOPT_LEGACY_ROW_SQL, ensure_document_id
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+def run_sql(sql, timeout=30):
+    """Execute SQL via MCP"""
+    return subprocess.run(
+        ['manus-mcp-cli', 'tool', 'call', 'execute_sql', '--server', 'supabase',
+         '--input', json.dumps({"query": sql})],
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+
+
 def ingest_via_mcp(documents):
     """Ingest documents using Supabase MCP"""
     success_count = 0
@@ -23,27 +36,25 @@ def ingest_via_mcp(documents):
             title = doc['title'].replace("'", "''")
             text = doc['full_text'].replace("'", "''")
             category = doc['category'].replace("'", "''")
+            url = doc.get('url', '').replace("'", "''")
+            doc_id = ensure_document_id(doc, 'dld')
             
-            sql = f"""
-            INSERT INTO legal_articles (title, content, category, source, created_at)
+            sql = ADOPT_LEGACY_ROW_SQL % {'doc_id': f"'{doc_id}'", 'url': f"'{url}'", 'title': f"'{title}'"}
+            sql += f"""
+            INSERT INTO legal_articles (doc_id, title, content, category, source, created_at)
             VALUES (
+                '{doc_id}',
                 '{title}',
                 '{text}',
                 '{category}',
                 'Dubai Land Department',
                 NOW()
             )
-            ON CONFLICT (title) DO NOTHING;
+            ON CONFLICT (doc_id) DO NOTHING;
             """
             
             # Execute via MCP
-            result = subprocess.run(
-                ['manus-mcp-cli', 'tool', 'call', 'execute_sql', '--server', 'supabase',
-                 '--input', json.dumps({"query": sql})],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = run_sql(sql)
             
             if result.returncode == 0:
                 logger.info(f"✓ Ingested: {doc['title'][:60]}")
@@ -6,16 +6,23 @@ extracts content, checks for duplicates, and ingests into Supabase
 """
 
 import requests
-from bs4 import BeautifulSoup
 import json
 import os
-import time
 from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 import re
 import hashlib
-import subprocess
+
+from html_parsing import parse_html
+from crawl_frontier import CrawlFrontier
+from document_identity import DocumentRegistry
+from extraction_cache import ExtractionCache
+from pdf_download import download_pdf_stream, is_valid_pdf
+from pdf_extract import PDFTextExtractor
+from pdf_ocr import PageOCR
+from rate_controller import install_rate_controller
+from resilience import install_resilience
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -40,37 +47,58 @@ class DLDPDFDownloader:
             'Accept': 'application/pdf,*/*',
         })
         
+        # Adaptive per-domain pacing plus retries / circuit breaking (only
+        # network requests wait)
+        self.rate_controllers = install_rate_controller(self.session)
+        self.resilience = install_resilience(self.session)
+        
+        # Persistent frontier: the rules page and PDF links survive between runs
+        self.frontier = CrawlFrontier('dld_pdfs')
+        
+        # Extraction runs on every core while the next PDFs download; the
+        # cache is keyed by PDF content, so a replaced PDF is re-extracted.
+        # Scanned pages (no text layer) go through OCR.
+        extraction_cache = ExtractionCache()
+        self.pdf_extractor = PDFTextExtractor(cache=extraction_cache, ocr=PageOCR(cache=extraction_cache))
+        
+        # Stable document IDs (the same URL gets the same ID on every run)
+        self.registry = DocumentRegistry()
+        
         self.downloaded_pdfs = []
     
     def get_pdf_links(self) -> List[Dict]:
-        """Extract all PDF download links from the page"""
-        try:
-            logger.info(f"Fetching PDF links from: {self.page_url}")
-            
-            response = self.session.get(self.page_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            pdf_links = []
-            seen_urls = set()
-            
-            # Find all download links
-            for link in soup.find_all('a', href=True):
-                href = link.get('href', '')
+        """
+        Extract all PDF download links from the page
+        
+        Links are kept in the persistent crawl frontier; the page itself is
+        only fetched again once its revisit window has passed.
+        """
+        self.frontier.add(self.page_url, kind='index', priority=10)
+        
+        for index_page in self.frontier.claim(kind='index'):
+            try:
+                logger.info(f"Fetching PDF links from: {self.page_url}")
                 
-                # Look for PDF links or download buttons
-                if '.pdf' in href.lower() or 'download' in link.get_text().lower():
-                    # Get the full URL
-                    if href.startswith('http'):
-                        pdf_url = href
-                    elif href.startswith('/'):
-                        pdf_url = f"{self.base_url}{href}"
-                    else:
-                        pdf_url = f"{self.base_url}/{href}"
+                response = self.session.get(self.page_url, timeout=30)
+                response.raise_for_status()
+                
+                soup = parse_html(response.content)
+                
+                found = []
+                
+                # Find all download links
+                for link in soup.find_all('a', href=True):
+                    href = link.get('href', '')
                     
-                    if pdf_url not in seen_urls:
-                        seen_urls.add(pdf_url)
+                    # Look for PDF links or download buttons
+                    if '.pdf' in href.lower() or 'download' in link.get_text().lower():
+                        # Get the full URL
+                        if href.startswith('http'):
+                            pdf_url = href
+                        elif href.startswith('/'):
+                            pdf_url = f"{self.base_url}{href}"
+                        else:
+                            pdf_url = f"{self.base_url}/{href}"
                         
                         # Try to extract title from nearby text
                         title = ""
@@ -84,17 +112,23 @@ class DLDPDFDownloader:
                         if not title:
                             title = link.get_text(strip=True) or os.path.basename(pdf_url)
                         
-                        pdf_links.append({
-                            'title': title[:200],  # Limit title length
-                            'url': pdf_url
-                        })
-            
-            logger.info(f"Found {len(pdf_links)} PDF links")
-            return pdf_links
-            
-        except Exception as e:
-            logger.error(f"Error fetching PDF links: {e}")
-            return []
+                        found.append((pdf_url, {'title': title[:200]}))  # Limit title length
+                
+                # Equivalent URLs (parameter order, fragments) collapse to one entry
+                added = self.frontier.add_many(found, kind='pdf')
+                self.frontier.mark_done(index_page['url'])
+                logger.info(f"{len(found)} PDF links on page, {added} new")
+                
+            except Exception as e:
+                logger.error(f"Error fetching PDF links: {e}")
+                self.frontier.mark_failed(index_page['url'])
+        
+        pdf_links = [
+            {'title': entry['data'].get('title', ''), 'url': entry['url']}
+            for entry in self.frontier.entries(kind='pdf')
+        ]
+        logger.info(f"Found {len(pdf_links)} PDF links")
+        return pdf_links
     
     def download_pdf(self, pdf_info: Dict) -> Optional[str]:
         """Download a single PDF file"""
@@ -105,55 +139,31 @@ class DLDPDFDownloader:
             filename = f"{safe_title[:100]}.pdf"
             filepath = os.path.join(self.pdf_dir, filename)
             
-            # Skip if already downloaded
-            if os.path.exists(filepath):
+            # Skip if a complete PDF is already on disk
+            if is_valid_pdf(filepath):
                 logger.info(f"Already downloaded: {filename}")
                 return filepath
             
             logger.info(f"Downloading: {pdf_info['title'][:60]}...")
             
-            response = self.session.get(pdf_info['url'], timeout=60)
-            response.raise_for_status()
+            # Stream to a partial file (resumable), renamed once verified
+            size = download_pdf_stream(self.session, pdf_info['url'], filepath, timeout=60)
             
-            # Save PDF
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            logger.info(f"✓ Downloaded: {filename} ({len(response.content) / 1024:.1f} KB)")
+            logger.info(f"✓ Downloaded: {filename} ({size / 1024:.1f} KB)")
             return filepath
             
         except Exception as e:
             logger.error(f"Error downloading {pdf_info['url']}: {e}")
             return None
     
+    def _text_path(self, pdf_path: str) -> str:
+        text_filename = os.path.basename(pdf_path).replace('.pdf', '.txt')
+        return os.path.join(self.text_dir, text_filename)
+    
     def extract_text_from_pdf(self, pdf_path: str) -> Optional[str]:
-        """Extract text from PDF using pdftotext"""
+        """Extract text from PDF (cached by content; a copy is written to the text directory)"""
         try:
-            text_filename = os.path.basename(pdf_path).replace('.pdf', '.txt')
-            text_path = os.path.join(self.text_dir, text_filename)
-            
-            # Skip if already extracted
-            if os.path.exists(text_path):
-                with open(text_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            
-            # Extract text using pdftotext
-            result = subprocess.run(
-                ['pdftotext', '-enc', 'UTF-8', pdf_path, text_path],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0 and os.path.exists(text_path):
-                with open(text_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
-                logger.info(f"✓ Extracted text: {text_filename} ({len(text)} chars)")
-                return text
-            else:
-                logger.warning(f"Failed to extract text from {pdf_path}")
-                return None
-                
+            return self.pdf_extractor.extract(pdf_path, self._text_path(pdf_path))
         except Exception as e:
             logger.error(f"Error extracting text from {pdf_path}: {e}")
             return None
@@ -174,8 +184,13 @@ class DLDPDFDownloader:
             logger.warning("No PDF links found")
             return []
         
-        documents = []
+        # Everything listed this run is live, so a PDF whose bytes also sit
+        # at another listed URL is not mistaken for that one moving
+        self.registry.mark_seen(pdf_info['url'] for pdf_info in pdf_links)
         
+        # Download one PDF at a time and queue its extraction right away, so
+        # earlier PDFs are extracted while later ones download
+        extractions = []
         for idx, pdf_info in enumerate(pdf_links, 1):
             logger.info(f"Progress: {idx}/{len(pdf_links)}")
             
@@ -183,18 +198,30 @@ class DLDPDFDownloader:
             pdf_path = self.download_pdf(pdf_info)
             
             if not pdf_path:
+                self.frontier.mark_failed(pdf_info['url'])
                 continue
+            self.frontier.mark_done(pdf_info['url'])
             
-            # Extract text
-            text_content = self.extract_text_from_pdf(pdf_path)
+            extractions.append((pdf_info, pdf_path,
+                                self.pdf_extractor.submit(pdf_path, self._text_path(pdf_path))))
+        
+        documents = []
+        for pdf_info, pdf_path, extraction in extractions:
+            try:
+                text_content = extraction.result()
+            except Exception as e:
+                logger.error(f"Error extracting text from {pdf_path}: {e}")
+                text_content = None
             
             if not text_content or len(text_content) < 100:
                 logger.warning(f"Insufficient content extracted from {pdf_info['title']}")
                 continue
             
             # Create document record
+            content_hash = self.calculate_content_hash(text_content)
             doc = {
-                'id': f"dld_{abs(hash(pdf_info['url'])) % 1000000}",
+                'id': self.registry.resolve(pdf_info['url'], 'dld', title=pdf_info['title'],
+                                            content_hash=content_hash),
                 'title': pdf_info['title'],
                 'url': pdf_info['url'],
                 'category': 'Dubai Real Estate Law',
@@ -205,18 +232,20 @@ class DLDPDFDownloader:
                     'extracted_at': datetime.now().isoformat()
                 },
                 'word_count': len(text_content.split()),
-                'content_hash': self.calculate_content_hash(text_content),
+                'content_hash': content_hash,
                 'scraped_at': datetime.now().isoformat(),
                 'source': 'DLD Rules and Regulations'
             }
             
             documents.append(doc)
             self.downloaded_pdfs.append(doc)
-            
-            # Be respectful
-            time.sleep(1)
         
         logger.info(f"Download complete! Processed {len(documents)} documents")
+        self.pdf_extractor.log_stats()
+        self.frontier.log_stats()
+        self.registry.log_stats()
+        self.rate_controllers.log_stats()
+        self.resilience.log_stats()
         return documents
     
     def save_to_json(self, documents: List[Dict], filename: str = "dld_documents.json"):
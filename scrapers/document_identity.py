@@ -0,0 +1,270 @@
+"""
+Document Identity
+Stable document IDs (keyed BLAKE2b of source + canonical URL) and a
+persistent registry mapping URLs, titles and content hashes to them, so the
+same document gets the same ID on every run and ingestion can upsert by ID
+instead of by title (legal_articles.doc_id, added by
+drizzle/migrations/0000_legal_articles_doc_id.sql)
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_DB = os.getenv(
+    'SCRAPER_DOCUMENT_REGISTRY_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/document_registry.db"
+)
+
+# Changing the key changes every document ID - only do it together with a
+# full re-ingestion
+ID_KEY = os.getenv('SCRAPER_ID_KEY', 'paris-group-legal-ai/document-id/v1').encode('utf-8')
+
+_ID_FORMAT = re.compile(r'^[a-z0-9_]+_[0-9a-f]{16}$')
+
+# Query parameters that never identify a document
+_TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid)$', re.IGNORECASE)
+
+# Gives a row written by the old title-keyed ingestion its document ID, so
+# the first ID-keyed run updates that row instead of adding a second one
+# (psycopg2-style named parameters: doc_id, url, title)
+ADOPT_LEGACY_ROW_SQL = """
+UPDATE legal_articles SET doc_id = %(doc_id)s
+WHERE id = (
+    SELECT id FROM legal_articles
+    WHERE doc_id IS NULL AND (source_url = %(url)s OR title = %(title)s)
+    ORDER BY (source_url = %(url)s) IS TRUE DESC
+    LIMIT 1
+)
+AND NOT EXISTS (SELECT 1 FROM legal_articles WHERE doc_id = %(doc_id)s);
+"""
+
+
+def canonical_url(url: str) -> str:
+    """
+    One spelling per document URL: https, lowercase host without 'www.'
+    or default port, normalized percent-encoding, no fragment, no tracking
+    parameters, sorted query, no trailing slash
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme in ('', 'http', 'https'):
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host if parts.port in (None, 80, 443) else f"{host}:{parts.port}"
+
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    path = re.sub(r'/{2,}', '/', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(key)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def document_id(url: str, source: str) -> str:
+    """
+    Stable ID of the document at `url` from `source` ('dld', 'moj', ...)
+
+    Deterministic across runs and processes (unlike hash()), and 64 bits
+    wide, so collisions are not a concern at corpus scale.
+    """
+    material = f"{source}\x1f{canonical_url(url)}".encode('utf-8')
+    return f"{source}_{hashlib.blake2b(material, digest_size=8, key=ID_KEY).hexdigest()}"
+
+
+def is_document_id(value) -> bool:
+    """True if `value` is an ID made by document_id()"""
+    return isinstance(value, str) and bool(_ID_FORMAT.match(value))
+
+
+def ensure_document_id(doc: Dict, source: str) -> str:
+    """
+    ID of a document record: its own if it has a stable one, otherwise
+    derived from its URL (older JSON files carry per-run hash() IDs)
+    """
+    if is_document_id(doc.get('id')):
+        return doc['id']
+    if not doc.get('url'):
+        raise ValueError(f"Document '{doc.get('title')}' has neither a stable ID nor a URL")
+    return document_id(doc['url'], source)
+
+
+class DocumentRegistry:
+    """
+    Persistent map of canonical URLs, titles and content hashes to IDs
+
+    `resolve` returns the ID already assigned to a URL; anything new gets
+    the deterministic document_id(). A new URL serving the same content
+    as a registered document of the same source is only treated as that
+    document moving (and keeps its ID) if none of the old URLs was seen in
+    this run and, given a `url_alive` probe, none still resolves. Two live
+    URLs with the same bytes - an English and an Arabic page linking one
+    PDF, a re-published annex - keep separate IDs and the duplicate is
+    logged. Titles are recorded but never used as identity, so a retitled
+    document keeps its ID and two documents with the same title stay apart.
+
+    Pass the run's whole listing to `mark_seen` before resolving, so an old
+    URL listed later in the run still counts as seen.
+
+    Usage:
+        registry = DocumentRegistry()
+        registry.mark_seen(link['url'] for link in links)
+        doc_id = registry.resolve(url, 'dld', title=title, content_hash=content_hash)
+    """
+
+    def __init__(self, db_path: str = DEFAULT_REGISTRY_DB,
+                 url_alive: Optional[Callable[[str], bool]] = None):
+        self.url_alive = url_alive
+        self._run_started = time.time()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS document (
+                doc_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                content_hash TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS document_content_hash ON document (source, content_hash);
+            CREATE INDEX IF NOT EXISTS document_title ON document (title);
+            CREATE TABLE IF NOT EXISTS document_url (
+                canonical_url TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL
+            );
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(document_url)")]
+        if 'last_seen' not in columns:
+            self._conn.execute("ALTER TABLE document_url ADD COLUMN last_seen REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS document_url_doc_id ON document_url (doc_id)")
+        self._conn.commit()
+        self.stats = {'known': 0, 'moved': 0, 'new': 0, 'same_content': 0}
+
+    def mark_seen(self, urls: Iterable[str]):
+        """Record that these URLs are listed in this run"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE document_url SET last_seen = ? WHERE canonical_url = ?",
+                [(now, canonical_url(url)) for url in urls]
+            )
+            self._conn.commit()
+
+    def _moved_from(self, source: str, content_hash: str) -> tuple:
+        """
+        (ID of a document with this content whose URLs are all gone, or
+        None; ID of a live document with this content, or None) - lock held
+        """
+        live = None
+        candidates = self._conn.execute(
+            "SELECT doc_id FROM document WHERE source = ? AND content_hash = ?", (source, content_hash)
+        ).fetchall()
+        for (doc_id,) in candidates:
+            urls = self._conn.execute(
+                "SELECT canonical_url, last_seen FROM document_url WHERE doc_id = ?", (doc_id,)
+            ).fetchall()
+            seen = any(last_seen is not None and last_seen >= self._run_started for _, last_seen in urls)
+            if seen or (self.url_alive and any(self.url_alive(url) for url, _ in urls)):
+                live = live or doc_id
+                continue
+            return doc_id, live
+        return None, live
+
+    def resolve(self, url: str, source: str, title: Optional[str] = None,
+                content_hash: Optional[str] = None) -> str:
+        """ID of a document, registering the URL / title / hash seen now"""
+        canonical = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_id FROM document_url WHERE canonical_url = ?", (canonical,)
+            ).fetchone()
+            same_content = None
+            if row:
+                doc_id, outcome = row[0], 'known'
+                self._conn.execute(
+                    "UPDATE document_url SET last_seen = ? WHERE canonical_url = ?", (now, canonical)
+                )
+            else:
+                moved_from, same_content = self._moved_from(source, content_hash) if content_hash else (None, None)
+                doc_id, outcome = (moved_from, 'moved') if moved_from else (document_id(url, source), 'new')
+                self._conn.execute(
+                    "INSERT INTO document_url (canonical_url, doc_id, last_seen) VALUES (?, ?, ?)",
+                    (canonical, doc_id, now)
+                )
+                if same_content and outcome == 'new':
+                    self.stats['same_content'] += 1
+
+            self._conn.execute(
+                "INSERT INTO document (doc_id, source, url, title, content_hash, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (doc_id) DO UPDATE SET "
+                "url = excluded.url, title = COALESCE(excluded.title, title), "
+                "content_hash = COALESCE(excluded.content_hash, content_hash), last_seen = excluded.last_seen",
+                (doc_id, source, canonical, title, content_hash, now, now)
+            )
+            self._conn.commit()
+            self.stats[outcome] += 1
+
+        if outcome == 'moved':
+            logger.info(f"Document moved to {canonical} - keeping ID {doc_id}")
+        elif same_content and outcome == 'new':
+            logger.info(f"{canonical} has the same content as live document {same_content} - "
+                        f"keeping a separate ID {doc_id}")
+        return doc_id
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        """ID registered for a URL, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_id FROM document_url WHERE canonical_url = ?", (canonical_url(url),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def lookup_hash(self, content_hash: str) -> List[str]:
+        """IDs of documents whose latest content has this hash"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id FROM document WHERE content_hash = ?", (content_hash,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def lookup_title(self, title: str) -> List[str]:
+        """IDs of documents with this title (titles are not unique)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT doc_id FROM document WHERE title = ?", (title,)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['documents'] = self._conn.execute("SELECT COUNT(*) FROM document").fetchone()[0]
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Document registry: {stats['known']} known, {stats['new']} new ({stats['same_content']} "
+            f"sharing content with a live document), {stats['moved']} moved ({stats['documents']} registered)"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
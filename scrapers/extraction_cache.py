@@ -0,0 +1,230 @@
+"""
+PDF Extraction Cache
+Content-addressed store of extracted page texts, keyed by the SHA-256 of
+the PDF bytes plus the extractor version and options, so re-runs skip
+unchanged PDFs and a PDF replaced at the same URL (or two PDFs that
+happen to share a filename) is never served someone else's text
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTRACTION_CACHE_DB = os.getenv(
+    'SCRAPER_EXTRACTION_CACHE_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/extraction_cache.db"
+)
+DEFAULT_EXTRACTION_CACHE_MB = float(os.getenv('SCRAPER_EXTRACTION_CACHE_MB', '1024'))
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    SQLite cache of extracted PDF pages
+
+    Entries are per page, so a document whose extraction left some pages
+    failed keeps the good ones and only the missing pages are extracted
+    again. OCR results of page images are kept alongside. When the stored
+    text (documents and OCR pages together) grows past `max_mb`, the least
+    recently used entries are evicted.
+
+    Usage:
+        cache = ExtractionCache()
+        key = cache.key(file_digest(pdf_path), 'pdftotext:v3')
+        entry = cache.get(key)           # (page count, {page: text}) or None
+        ...
+        cache.put(key, digest, page_count, page_texts)
+        cache.log_stats()
+    """
+
+    def __init__(self, db_path: str = DEFAULT_EXTRACTION_CACHE_DB,
+                 max_mb: float = DEFAULT_EXTRACTION_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS extraction_document (
+                cache_key TEXT PRIMARY KEY,
+                pdf_sha256 TEXT NOT NULL,
+                page_count INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS extraction_page (
+                cache_key TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (cache_key, page)
+            );
+            CREATE INDEX IF NOT EXISTS extraction_document_last_used
+                ON extraction_document (last_used);
+            CREATE TABLE IF NOT EXISTS ocr_page (
+                cache_key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+        """)
+        # Caches created before OCR pages were size-accounted lack these
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(ocr_page)")]
+        if 'bytes' not in columns:
+            self._conn.execute("ALTER TABLE ocr_page ADD COLUMN bytes INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE ocr_page ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE ocr_page SET bytes = LENGTH(CAST(text AS BLOB)), last_used = created")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_page_last_used ON ocr_page (last_used)")
+        self._conn.commit()
+
+        self.stats = {'hits': 0, 'partial_hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0,
+                      'ocr_evicted': 0}
+
+    @staticmethod
+    def key(pdf_sha256: str, options: str) -> str:
+        """Cache key of a PDF digest under one extractor version / option set"""
+        return hashlib.sha256(f"{pdf_sha256}\x1f{options}".encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Tuple[int, Dict[int, str]]]:
+        """
+        Cached pages of a document
+
+        Returns:
+            (page count, {page number: text}) - pages that failed last time
+            are missing from the dict - or None if the document is unknown
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM extraction_document WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            pages = dict(self._conn.execute(
+                "SELECT page, text FROM extraction_page WHERE cache_key = ?", (cache_key,)
+            ).fetchall())
+            self._conn.execute(
+                "UPDATE extraction_document SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key)
+            )
+            self._conn.commit()
+            self.stats['hits' if len(pages) >= row[0] else 'partial_hits'] += 1
+        return row[0], pages
+
+    def put(self, cache_key: str, pdf_sha256: str, page_count: int, pages: Dict[int, str]):
+        """Store (or complete) a document's pages, then evict down to the size limit"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO extraction_page (cache_key, page, text) VALUES (?, ?, ?)",
+                [(cache_key, page, text) for page, text in pages.items()]
+            )
+            size = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM extraction_page WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO extraction_document "
+                "(cache_key, pdf_sha256, page_count, bytes, created, last_used) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (cache_key) DO UPDATE SET "
+                "page_count = excluded.page_count, bytes = excluded.bytes, last_used = excluded.last_used",
+                (cache_key, pdf_sha256, page_count, size, now, now)
+            )
+            self.stats['stored'] += 1
+            self._evict(keep=('document', cache_key))
+            self._conn.commit()
+
+    def get_ocr(self, cache_key: str) -> Optional[str]:
+        """OCR text stored under a page-image key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_page WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE ocr_page SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key)
+                )
+                self._conn.commit()
+        return row[0] if row else None
+
+    def put_ocr(self, cache_key: str, text: str):
+        """Store the OCR text of a page image, then evict down to the size limit"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_page (cache_key, text, created, bytes, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, text, now, len(text.encode('utf-8')), now)
+            )
+            self._evict(keep=('ocr', cache_key))
+            self._conn.commit()
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(bytes), 0) FROM extraction_document) + "
+            "(SELECT COALESCE(SUM(bytes), 0) FROM ocr_page)"
+        ).fetchone()[0]
+
+    def _evict(self, keep: Tuple[str, str]):
+        """
+        Drop least recently used documents and OCR pages until the cache
+        fits, never the entry `keep` ((kind, key)) just stored (lock held)
+        """
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT 'document', cache_key, bytes, last_used FROM extraction_document "
+            "UNION ALL SELECT 'ocr', cache_key, bytes, last_used FROM ocr_page ORDER BY 4"
+        ).fetchall()
+        for kind, cache_key, size, _ in rows:
+            if (kind, cache_key) == keep:
+                continue
+            if kind == 'document':
+                self._conn.execute("DELETE FROM extraction_page WHERE cache_key = ?", (cache_key,))
+                self._conn.execute("DELETE FROM extraction_document WHERE cache_key = ?", (cache_key,))
+                self.stats['evicted'] += 1
+            else:
+                self._conn.execute("DELETE FROM ocr_page WHERE cache_key = ?", (cache_key,))
+                self.stats['ocr_evicted'] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            documents = self._conn.execute("SELECT COUNT(*) FROM extraction_document").fetchone()[0]
+            ocr_pages = self._conn.execute("SELECT COUNT(*) FROM ocr_page").fetchone()[0]
+            size = self._total_bytes()
+        lookups = stats['hits'] + stats['partial_hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['documents'] = documents
+        stats['ocr_pages'] = ocr_pages
+        stats['size_mb'] = round(size / (1024 * 1024), 1)
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Extraction cache: {stats['hits']} hits, {stats['partial_hits']} partial, "
+            f"{stats['misses']} misses (hit rate {stats['hit_rate']:.0%}), {stats['documents']} documents "
+            f"and {stats['ocr_pages']} OCR pages in {stats['size_mb']} MB, {stats['evicted']} documents "
+            f"and {stats['ocr_evicted']} OCR pages evicted"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,254 @@
+"""
+HTML Parsing Backend
+One place that decides how the scrapers parse HTML: the fastest installed
+BeautifulSoup tree builder, optional scoped parsing, single-pass helpers for
+the lookups every detail page repeats, and a native lxml page reader for the
+hot detail-page path
+"""
+
+import os
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from bs4.dammit import EncodingDetector, UnicodeDammit
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # Optional dependency - fall back to the stdlib parser
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# 'lxml' parses several times faster than the pure-Python 'html.parser';
+# SCRAPER_HTML_PARSER overrides the choice (e.g. to compare outputs)
+HTML_PARSER = os.getenv('SCRAPER_HTML_PARSER') or ('lxml' if lxml is not None else 'html.parser')
+
+# Elements whose text never belongs to a document body
+NON_CONTENT_TAGS = ['script', 'style', 'nav', 'header', 'footer']
+
+# Elements BeautifulSoup never includes in get_text() (their strings are
+# Script / Stylesheet / TemplateString / ruby annotation objects)
+_NON_TEXT_TAGS = ('script', 'style', 'template', 'rt', 'rp')
+
+# Scoped parse for link-harvesting pages: only <a href> elements are built
+LINKS_ONLY = SoupStrainer('a', href=True)
+
+
+def parse_html(content, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """
+    Parse a page with the configured backend
+
+    Args:
+        content: HTML bytes or text
+        parse_only: SoupStrainer limiting which elements are built (e.g.
+            LINKS_ONLY); everything else is skipped during parsing
+
+    Returns:
+        BeautifulSoup tree
+    """
+    return BeautifulSoup(content, HTML_PARSER, parse_only=parse_only)
+
+
+def find_first_of(soup, selectors: Sequence[Tuple[str, Dict]]):
+    """
+    First element matching the highest-priority selector
+
+    Equivalent to calling soup.find(tag, attrs) for each selector in turn
+    and keeping the first hit, but walks the tree once instead of once per
+    selector.
+    """
+    # bs4 >= 4.13 renamed SoupStrainer.search_tag to matches_tag
+    probes = []
+    for tag, attrs in selectors:
+        strainer = SoupStrainer(tag, attrs)
+        probes.append(getattr(strainer, 'matches_tag', None) or strainer.search_tag)
+    best_rank = len(probes)
+    best = None
+
+    for element in soup.descendants:
+        if not isinstance(element, Tag):
+            continue
+        for rank in range(best_rank):
+            if probes[rank](element):
+                best_rank, best = rank, element
+                break
+        if best_rank == 0:
+            break
+
+    return best
+
+
+def element_text(element, strip_tags: Iterable[str] = NON_CONTENT_TAGS) -> str:
+    """
+    Newline-separated text of an element with non-content tags removed
+
+    Note: the removed tags are decomposed, i.e. taken out of the tree.
+    """
+    for unwanted in element(list(strip_tags)):
+        unwanted.decompose()
+    return element.get_text(separator='\n', strip=True)
+
+
+def link_elements(content) -> List:
+    """All <a href> elements of a page, parsed with the links-only strainer"""
+    return parse_html(content, parse_only=LINKS_ONLY).find_all('a', href=True)
+
+
+def _decode(content) -> str:
+    """
+    Decode page bytes the way BeautifulSoup would
+
+    The declared charset and UTF-8 are tried first; only pages that are
+    neither fall through to UnicodeDammit's (slow) detection.
+    """
+    if isinstance(content, str):
+        return content
+    declared = EncodingDetector.find_declared_encoding(content, is_html=True)
+    for encoding in (declared, 'utf-8'):
+        if not encoding:
+            continue
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return UnicodeDammit(content, is_html=True).unicode_markup or ''
+
+
+def _attribute_matches(element, name: str, pattern) -> bool:
+    """BeautifulSoup attribute-filter semantics for one lxml element"""
+    value = element.get(name)
+    if pattern is True:
+        return value is not None
+    if value is None:
+        return False
+    # Multi-valued class: any single class or the whole list may match
+    candidates = value.split() if name == 'class' else [value]
+    if name == 'class':
+        candidates.append(' '.join(candidates))
+    if hasattr(pattern, 'search'):
+        return any(pattern.search(candidate) for candidate in candidates)
+    return any(candidate == pattern for candidate in candidates)
+
+
+class SoupPage:
+    """
+    Detail-page reader on a BeautifulSoup tree
+
+    Same interface as LxmlPage; used when lxml is not installed or another
+    parser is forced through SCRAPER_HTML_PARSER.
+    """
+
+    def __init__(self, content):
+        self.soup = parse_html(content)
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        """Whole-page text (computed once)"""
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+    def first_text(self, tags: Sequence[str]) -> str:
+        """Stripped text of the first element of the highest-priority tag"""
+        for tag in tags:
+            element = self.soup.find(tag)
+            if element:
+                return element.get_text(strip=True)
+        return ''
+
+    def content_text(self, selectors: Sequence[Tuple[str, Dict]],
+                     strip_tags: Iterable[str] = NON_CONTENT_TAGS) -> str:
+        """
+        Text of the main content container, falling back to <body>
+
+        Note: call after reading `text` - the stripped tags are removed.
+        """
+        element = find_first_of(self.soup, selectors) or self.soup.find('body')
+        return element_text(element, strip_tags) if element else ''
+
+
+class LxmlPage:
+    """
+    Detail-page reader straight on an lxml tree
+
+    Skips building a BeautifulSoup object (which dominates parse time even
+    with the lxml builder) while returning the same strings as SoupPage.
+    """
+
+    _parser = lxml.html.HTMLParser(encoding='utf-8') if lxml is not None else None
+
+    def __init__(self, content):
+        try:
+            self.root = lxml.html.document_fromstring(_decode(content).encode('utf-8'),
+                                                      parser=self._parser)
+        except lxml.etree.ParserError:  # Empty document
+            self.root = None
+        if self.root is not None:
+            self._clear(self.root, _NON_TEXT_TAGS)
+        self._text = None
+
+    @staticmethod
+    def _clear(element, tags):
+        # Empty the elements but keep them (and their tails) in place, so the
+        # surrounding strings stay separate as in BeautifulSoup
+        for unwanted in list(element.iter(*tags)):
+            unwanted.clear(keep_tail=True)
+
+    @property
+    def text(self) -> str:
+        """Whole-page text (computed once)"""
+        if self._text is None:
+            self._text = ''.join(self.root.itertext()) if self.root is not None else ''
+        return self._text
+
+    def first_text(self, tags: Sequence[str]) -> str:
+        """Stripped text of the first element of the highest-priority tag"""
+        if self.root is None:
+            return ''
+        for tag in tags:
+            element = next(self.root.iter(tag), None)
+            if element is not None:
+                return ''.join(s.strip() for s in element.itertext())
+        return ''
+
+    def _find_first_of(self, selectors: Sequence[Tuple[str, Dict]]):
+        best_rank = len(selectors)
+        best = None
+        for element in self.root.iter(*{tag for tag, _ in selectors}):
+            for rank in range(best_rank):
+                tag, attrs = selectors[rank]
+                if element.tag == tag and all(
+                    _attribute_matches(element, name, pattern) for name, pattern in attrs.items()
+                ):
+                    best_rank, best = rank, element
+                    break
+            if best_rank == 0:
+                break
+        return best
+
+    def content_text(self, selectors: Sequence[Tuple[str, Dict]],
+                     strip_tags: Iterable[str] = NON_CONTENT_TAGS) -> str:
+        """
+        Text of the main content container, falling back to <body>
+
+        Note: call after reading `text` - the stripped tags are removed.
+        """
+        if self.root is None:
+            return ''
+        element = self._find_first_of(selectors)
+        if element is None:
+            element = next(self.root.iter('body'), None)
+            if element is None:
+                return ''
+        self._clear(element, strip_tags)
+        return '\n'.join(s.strip() for s in element.itertext() if s.strip())
+
+
+def parse_page(content):
+    """Detail-page reader for the configured backend"""
+    if HTML_PARSER == 'lxml' and lxml is not None:
+        return LxmlPage(content)
+    return SoupPage(content)
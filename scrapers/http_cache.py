@@ -0,0 +1,272 @@
+"""
+Persistent HTTP Cache for the scrapers
+Disk-backed conditional-GET cache (ETag / If-Modified-Since) that plugs into
+a requests.Session, so re-crawls only download pages that actually changed
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    'SCRAPER_HTTP_CACHE_DIR',
+    "/home/ubuntu/paris_group_legal_ai/data/http_cache"
+)
+
+# Response headers kept with a cached body (bodies are stored decoded, so
+# Content-Encoding is deliberately dropped)
+_STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class HttpCache:
+    """
+    Disk-backed HTTP cache with conditional revalidation
+
+    Entries younger than `fresh_for` seconds are served straight from disk
+    (so a page fetched several times in one run costs one request). Older
+    entries are revalidated with If-None-Match / If-Modified-Since; a 304
+    refreshes the entry without moving the body again.
+
+    Concurrent requests for the same URL are merged: the first caller
+    fetches, the others wait for it and are served from the new entry.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, fresh_for: float = 900):
+        self.cache_dir = cache_dir
+        self.fresh_for = fresh_for
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_downloaded': 0}
+
+    # ------------------------------------------------------------------
+    # Entry storage
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def cache_key(url: str) -> str:
+        """Cache key for a GET request to `url`"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def lock_for(self, url: str) -> threading.Lock:
+        """Per-URL lock used to merge concurrent fetches of the same page"""
+        key = self.cache_key(url)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Load a cache entry
+
+        Returns:
+            Dict with url, status, headers, stored_at and body, or None
+        """
+        meta_path, body_path = self._paths(self.cache_key(url))
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['body'] = f.read()
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, status: int, headers, body: bytes) -> Dict:
+        """Store a response body and its validators"""
+        meta_path, body_path = self._paths(self.cache_key(url))
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        entry = {
+            'url': url,
+            'status': status,
+            'headers': {name: headers[name] for name in _STORED_HEADERS if name in headers},
+            'stored_at': time.time()
+        }
+
+        self._atomic_write(body_path, body)
+        self._atomic_write(meta_path, json.dumps(entry).encode('utf-8'))
+
+        entry['body'] = body
+        return entry
+
+    def refresh(self, entry: Dict, headers=None) -> Dict:
+        """Mark an entry as freshly validated (after a 304)"""
+        if headers:
+            for name in ('ETag', 'Last-Modified', 'Cache-Control'):
+                if name in headers:
+                    entry['headers'][name] = headers[name]
+        entry['stored_at'] = time.time()
+
+        meta_path, _ = self._paths(self.cache_key(entry['url']))
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        self._atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        return entry
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Cache policy
+    # ------------------------------------------------------------------
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """True if the entry can be served without contacting the server"""
+        if 'no-cache' in entry['headers'].get('Cache-Control', '').lower():
+            return False
+        return time.time() - entry.get('stored_at', 0) < self.fresh_for
+
+    @staticmethod
+    def is_storable(status: int, headers) -> bool:
+        """Only complete, successful and cacheable responses are stored"""
+        return status == 200 and 'no-store' not in headers.get('Cache-Control', '').lower()
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Validators to send when revalidating an entry"""
+        headers = {}
+        if entry:
+            if entry['headers'].get('ETag'):
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def record(self, outcome: str, nbytes: int = 0):
+        """Count a hit / revalidated / miss outcome"""
+        with self._stats_lock:
+            self.stats[outcome] += 1
+            self.stats['bytes_downloaded'] += nbytes
+
+    def get_stats(self) -> Dict:
+        """Hit, revalidation and miss counts for this process"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['requests'] = total
+        stats['hit_rate'] = round((stats['hits'] + stats['revalidated']) / total, 3) if total else 0.0
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"HTTP cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+            f"{stats['misses']} misses ({stats['bytes_downloaded'] / 1024:.1f} KB downloaded)"
+        )
+
+
+class CachingAdapter(BaseAdapter):
+    """
+    Transport adapter that answers GET requests from an HttpCache
+
+    Wraps the adapter that was previously mounted on the session, so other
+    adapters (retries, rate limits) keep working underneath the cache.
+    Streaming and Range requests bypass the cache, as do requests sent with
+    Cache-Control: no-cache / no-store (pages whose form state must match
+    the session cookie the same response sets).
+    """
+
+    def __init__(self, cache: HttpCache, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.cache = cache
+        self.inner = inner or HTTPAdapter()
+
+    def send(self, request, stream=False, **kwargs):
+        request_cache_control = request.headers.get('Cache-Control', '').lower()
+        if (request.method != 'GET' or stream or 'Range' in request.headers
+                or 'no-cache' in request_cache_control or 'no-store' in request_cache_control):
+            return self.inner.send(request, stream=stream, **kwargs)
+
+        url = request.url
+        waited_since = time.time()
+
+        with self.cache.lock_for(url):
+            entry = self.cache.get(url)
+
+            # Fresh on disk, or just fetched by a concurrent caller we waited on
+            if entry and (self.cache.is_fresh(entry) or entry.get('stored_at', 0) >= waited_since):
+                self.cache.record('hits')
+                return self._build_response(request, entry, 'HIT')
+
+            request.headers.update(self.cache.conditional_headers(entry))
+            response = self.inner.send(request, stream=False, **kwargs)
+
+            if response.status_code == 304 and entry:
+                self.cache.refresh(entry, response.headers)
+                self.cache.record('revalidated')
+                response.close()
+                return self._build_response(request, entry, 'REVALIDATED')
+
+            self.cache.record('misses', len(response.content))
+            if self.cache.is_storable(response.status_code, response.headers):
+                self.cache.put(url, response.status_code, response.headers, response.content)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+    def _build_response(self, request, entry: Dict, cache_status: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry.get('status', 200)
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.headers['X-Cache'] = cache_status
+        response._content = entry['body']
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+_shared_cache: Optional[HttpCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> HttpCache:
+    """Process-wide cache shared by every scraper"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = HttpCache()
+        return _shared_cache
+
+
+def install_http_cache(session: requests.Session, cache: Optional[HttpCache] = None) -> HttpCache:
+    """
+    Plug an HttpCache into a requests session
+
+    Args:
+        session: Session to wrap
+        cache: Cache to use (defaults to the shared on-disk cache)
+
+    Returns:
+        The cache in use, for reporting stats
+    """
+    cache = cache or get_shared_cache()
+    for prefix in ('https://', 'http://'):
+        session.mount(prefix, CachingAdapter(cache, inner=session.get_adapter(prefix)))
+    return cache
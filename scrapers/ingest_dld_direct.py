@@ -8,6 +8,8 @@ import psycopg2
 from psycopg2.extras import execute_values
 import logging
 
+from document_identity import ADOPT_LEGACY_ROW_SQL, ensure_document_id
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -46,20 +48,26 @@ def main():
                 content = doc.get('full_text', '')
                 category = doc.get('category', 'Dubai Real Estate Law')
                 source_url = doc.get('url', '')
+                doc_id = ensure_document_id(doc, 'dld')
                 
                 # Truncate if needed
                 if len(content) > 50000:
                     content = content[:50000] + '... [truncated]'
                 
-                # Insert
+                # Upsert by document ID; an unchanged document is a no-op
+                cur.execute(ADOPT_LEGACY_ROW_SQL, {'doc_id': doc_id, 'url': source_url, 'title': title})
                 cur.execute("""
-                    INSERT INTO legal_articles (title, content, category, source_url, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, NOW(), NOW())
-                    ON CONFLICT (title) DO UPDATE SET
+                    INSERT INTO legal_articles (doc_id, title, content, category, source_url, created_at, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
+                    ON CONFLICT (doc_id) DO UPDATE SET
+                        title = EXCLUDED.title,
                         content = EXCLUDED.content,
                         source_url = EXCLUDED.source_url,
                         updated_at = NOW()
-                """, (title, content, category, source_url))
+                    WHERE legal_articles.content IS DISTINCT FROM EXCLUDED.content
+                       OR legal_articles.title IS DISTINCT FROM EXCLUDED.title
+                       OR legal_articles.source_url IS DISTINCT FROM EXCLUDED.source_url
+                """, (doc_id, title, content, category, source_url))
                 
                 conn.commit()
                 logger.info(f"✓ Success: {title[:60]}")
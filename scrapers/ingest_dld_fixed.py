@@ -9,6 +9,9 @@ import subprocess
 import logging
 import time
 
+from document_identity import ADOPT_LEGACY_ROW_SQL, ensure_document_id
+from rate_controller import get_rate_controller
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -31,16 +34,20 @@ def ingest_document(doc, index, total):
         content = clean_sql_string(doc.get('full_text', ''))
         category = clean_sql_string(doc.get('category', 'Dubai Real Estate Law'))
         source_url = clean_sql_string(doc.get('url', ''))
+        doc_id = ensure_document_id(doc, 'dld')
         
         # Truncate content if too long (PostgreSQL has limits)
         if len(content) > 40000:
             content = content[:40000] + '... [truncated for database storage]'
             logger.warning(f"Content truncated for: {title[:60]}")
         
-        # Simple SQL with only the essential columns
-        sql = f"""
-INSERT INTO legal_articles (title, content, category, source_url, created_at, updated_at)
+        # Upsert by document ID (adopting the row an old title-keyed run
+        # wrote); an unchanged document is a no-op
+        sql = ADOPT_LEGACY_ROW_SQL % {'doc_id': f"'{doc_id}'", 'url': f"'{source_url}'", 'title': f"'{title}'"}
+        sql += f"""
+INSERT INTO legal_articles (doc_id, title, content, category, source_url, created_at, updated_at)
 VALUES (
+    '{doc_id}',
     '{title}',
     '{content}',
     '{category}',
@@ -48,10 +55,14 @@ VALUES (
     NOW(),
     NOW()
 )
-ON CONFLICT (title) DO UPDATE SET
+ON CONFLICT (doc_id) DO UPDATE SET
+    title = EXCLUDED.title,
     content = EXCLUDED.content,
     source_url = EXCLUDED.source_url,
-    updated_at = NOW();
+    updated_at = NOW()
+WHERE legal_articles.content IS DISTINCT FROM EXCLUDED.content
+   OR legal_articles.title IS DISTINCT FROM EXCLUDED.title
+   OR legal_articles.source_url IS DISTINCT FROM EXCLUDED.source_url;
 """
         
         # Execute via MCP
@@ -95,18 +106,21 @@ def main():
     
     logger.info(f"Loaded {len(documents)} documents")
     
-    # Ingest each document
+    # Ingest each document, paced by the adaptive Supabase rate controller
+    rate = get_rate_controller('supabase.co')
     success_count = 0
     failed_count = 0
     
     for idx, doc in enumerate(documents, 1):
+        rate.wait()
+        started = time.monotonic()
+        
         if ingest_document(doc, idx, len(documents)):
             success_count += 1
+            rate.record(latency=time.monotonic() - started)
         else:
             failed_count += 1
-        
-        # Small delay
-        time.sleep(0.3)
+            rate.record(latency=time.monotonic() - started, error=True)
     
     # Summary
     print("\n" + "="*70)
@@ -9,6 +9,9 @@ import logging
 import requests
 import time
 
+from document_identity import ADOPT_LEGACY_ROW_SQL, ensure_document_id
+from rate_controller import get_rate_controller, parse_retry_after
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -35,7 +38,17 @@ def generate_embedding_gemini(text):
             }
         }
         
-        response = requests.post(url, json=payload, timeout=30)
+        # Paced by the adaptive per-domain controller (honors 429 Retry-After)
+        rate = get_rate_controller(url)
+        rate.wait()
+        started = time.monotonic()
+        try:
+            response = requests.post(url, json=payload, timeout=30)
+        except requests.RequestException:
+            rate.record(latency=time.monotonic() - started, error=True)
+            raise
+        rate.record(response.status_code, time.monotonic() - started,
+                    parse_retry_after(response.headers.get('Retry-After')))
         
         if response.status_code == 200:
             data = response.json()
@@ -60,11 +73,28 @@ def ingest_document(conn, doc, index, total):
         content = doc.get('full_text', '')
         category = doc.get('category', 'Dubai Real Estate Law')
         source_url = doc.get('url', '')
+        doc_id = ensure_document_id(doc, 'dld')
         
         # Truncate content if needed
         if len(content) > 50000:
             content = content[:50000] + '... [truncated]'
         
+        # Adopt the row an old title-keyed run wrote, and skip the embedding
+        # call entirely if that document is already stored unchanged
+        cur = conn.cursor()
+        cur.execute(ADOPT_LEGACY_ROW_SQL, {'doc_id': doc_id, 'url': source_url, 'title': title})
+        cur.execute("""
+            SELECT content = %s AND title = %s AND source_url IS NOT DISTINCT FROM %s
+                   AND embedding IS NOT NULL
+            FROM legal_articles WHERE doc_id = %s
+        """, (content, title, source_url, doc_id))
+        row = cur.fetchone()
+        conn.commit()
+        cur.close()
+        if row and row[0]:
+            logger.info(f"✓ Unchanged, skipped: {title[:60]}")
+            return True
+        
         # Generate embedding
         logger.info("Generating embedding...")
         embedding = generate_embedding_gemini(content)
@@ -76,14 +106,15 @@ def ingest_document(conn, doc, index, total):
         # Insert into database
         cur = conn.cursor()
         cur.execute("""
-            INSERT INTO legal_articles (title, content, category, source_url, embedding, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s::vector, NOW(), NOW())
-            ON CONFLICT (title) DO UPDATE SET
+            INSERT INTO legal_articles (doc_id, title, content, category, source_url, embedding, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s::vector, NOW(), NOW())
+            ON CONFLICT (doc_id) DO UPDATE SET
+                title = EXCLUDED.title,
                 content = EXCLUDED.content,
                 source_url = EXCLUDED.source_url,
                 embedding = EXCLUDED.embedding,
                 updated_at = NOW()
-        """, (title, content, category, source_url, embedding))
+        """, (doc_id, title, content, category, source_url, embedding))
         
         conn.commit()
         cur.close()
@@ -125,9 +156,6 @@ def main():
                 success_count += 1
             else:
                 failed_count += 1
-            
-            # Rate limiting
-            time.sleep(1)
         
         # Close connection
         conn.close()
@@ -0,0 +1,186 @@
+"""
+Listing Snapshot Store
+Remembers what each listing showed on the previous run (keyed by stable
+legislation ID) so a refresh only detail-scrapes entries that are new or
+changed, plus a small rotating sample of unchanged ones
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DB = os.getenv(
+    'SCRAPER_SNAPSHOT_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/listing_snapshots.db"
+)
+
+# Listing fields that identify a change worth re-scraping (top-level listing
+# keys only - details merged into the entry later must not change it).
+# 'state' is the legislation's own state (in force, repealed, ...), never a
+# scraper's bookkeeping
+FINGERPRINT_FIELDS = ('title', 'date', 'state')
+
+
+def listing_fingerprint(entry: Dict, fields=FINGERPRINT_FIELDS) -> str:
+    """Short hash of the listing fields (whitespace and case normalized)"""
+    parts = []
+    for field in fields:
+        value = entry.get(field) or ''
+        parts.append(re.sub(r'\s+', ' ', str(value)).strip().lower())
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ListingDiff:
+    """Result of comparing a listing with the stored snapshot"""
+
+    def __init__(self, added: List[Dict], modified: List[Dict], unchanged: List[Dict],
+                 removed: List[str], sampled: List[Dict]):
+        self.added = added
+        self.modified = modified
+        self.unchanged = unchanged
+        self.removed = removed
+        self.sampled = sampled
+
+    @property
+    def to_scrape(self) -> List[Dict]:
+        """Entries whose detail pages should be fetched this run"""
+        return self.added + self.modified + self.sampled
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'added': len(self.added),
+            'modified': len(self.modified),
+            'unchanged': len(self.unchanged),
+            'removed': len(self.removed),
+            'sampled': len(self.sampled),
+            'to_scrape': len(self.to_scrape)
+        }
+
+
+class ListingSnapshotStore:
+    """
+    SQLite snapshot of one source's listing
+
+    Usage:
+        snapshots = ListingSnapshotStore('uae_legislation')
+        diff = snapshots.diff(listing, sample=5)
+        details = scrape(diff.to_scrape)
+        snapshots.commit(listing, scraped_ids=[...])
+
+    Only entries whose details were actually scraped get their fingerprint
+    stored, so a failed detail scrape is retried on the next run.
+    """
+
+    def __init__(self, source: str, db_path: str = DEFAULT_SNAPSHOT_DB, id_key: str = 'id'):
+        self.source = source
+        self.id_key = id_key
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_snapshot (
+                source TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                title TEXT,
+                fingerprint TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_scraped REAL NOT NULL,
+                PRIMARY KEY (source, item_id)
+            )
+        """)
+        self._conn.commit()
+
+    def _load(self) -> Dict[str, tuple]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, fingerprint, last_scraped FROM listing_snapshot WHERE source = ?",
+                (self.source,)
+            ).fetchall()
+        return {item_id: (fingerprint, last_scraped) for item_id, fingerprint, last_scraped in rows}
+
+    def diff(self, entries: List[Dict], sample: int = 5) -> ListingDiff:
+        """
+        Compare a fresh listing with the snapshot
+
+        Args:
+            entries: Listing entries (dicts with the ID key and listing fields)
+            sample: Number of unchanged entries to re-check anyway, picked
+                from those scraped longest ago, to catch edits the listing
+                does not show
+
+        Returns:
+            ListingDiff with added / modified / unchanged / removed / sampled
+        """
+        known = self._load()
+        added, modified, unchanged = [], [], []
+        listed = set()
+
+        for entry in entries:
+            item_id = str(entry[self.id_key])
+            listed.add(item_id)
+            previous = known.get(item_id)
+            if previous is None:
+                added.append(entry)
+            elif previous[0] != listing_fingerprint(entry):
+                modified.append(entry)
+            else:
+                unchanged.append(entry)
+
+        oldest_first = sorted(unchanged, key=lambda e: known[str(e[self.id_key])][1])
+        sampled = oldest_first[:max(0, sample)]
+        sampled_ids = {id(e) for e in sampled}
+        unchanged = [e for e in unchanged if id(e) not in sampled_ids]
+        removed = [item_id for item_id in known if item_id not in listed]
+
+        result = ListingDiff(added, modified, unchanged, removed, sampled)
+        summary = result.summary()
+        logger.info(
+            f"Listing diff '{self.source}': {summary['added']} new, {summary['modified']} changed, "
+            f"{summary['unchanged']} unchanged, {summary['removed']} removed, "
+            f"{summary['sampled']} sampled -> {summary['to_scrape']} to scrape"
+        )
+        return result
+
+    def commit(self, entries: Iterable[Dict], scraped_ids: Iterable[str]):
+        """
+        Store the listing after a run
+
+        Entries in `scraped_ids` get their new fingerprint; other entries
+        already in the snapshot only have last_seen updated; new entries that
+        were not scraped are left out so they stay "added" next time.
+        """
+        scraped_ids = {str(item_id) for item_id in scraped_ids}
+        now = time.time()
+
+        with self._lock:
+            for entry in entries:
+                item_id = str(entry[self.id_key])
+                if item_id in scraped_ids:
+                    self._conn.execute(
+                        "INSERT INTO listing_snapshot "
+                        "(source, item_id, title, fingerprint, first_seen, last_seen, last_scraped) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (source, item_id) DO UPDATE SET "
+                        "title = excluded.title, fingerprint = excluded.fingerprint, "
+                        "last_seen = excluded.last_seen, last_scraped = excluded.last_scraped",
+                        (self.source, item_id, entry.get('title'), listing_fingerprint(entry), now, now, now)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE listing_snapshot SET last_seen = ? WHERE source = ? AND item_id = ?",
+                        (now, self.source, item_id)
+                    )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -5,14 +5,19 @@ Scrapes UAE federal laws from https://elaws.moj.gov.ae
 """
 
 import requests
-from bs4 import BeautifulSoup
 import json
-import time
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 import re
 
+from article_segmenter import segment_articles
+from aspnet_treeview import TreeViewClient
+from html_parsing import parse_html
+from http_cache import install_http_cache
+from rate_controller import install_rate_controller
+from resilience import install_resilience
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +40,16 @@ class MOJPortalScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         })
+        
+        # Adaptive per-domain pacing, retries with a per-host circuit breaker,
+        # then the conditional-GET cache on top; the cache also makes the
+        # repeated landing-page fetches within one run a single request
+        self.rate_controllers = install_rate_controller(self.session)
+        self.resilience = install_resilience(self.session)
+        self.http_cache = install_http_cache(self.session)
+        
+        self.laws_page_url = f"{self.base_url}/English.aspx?val=UAE-KaitEL1"
+        self.tree = TreeViewClient(self.session, self.laws_page_url)
     
     def get_law_categories(self) -> List[Dict]:
         """
@@ -44,25 +59,18 @@ class MOJPortalScraper:
             List of category dictionaries with name and URL
         """
         try:
-            url = f"{self.base_url}/English.aspx?val=UAE-KaitEL1"
-            logger.info(f"Fetching categories from: {url}")
+            logger.info(f"Fetching categories from: {self.laws_page_url}")
             
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup, _ = self.tree.load()
             
             # Find all category links in the tree view
             categories = []
-            tree_links = soup.find_all('a', id=re.compile(r'TreeView1t\d+'))
-            
-            for link in tree_links:
-                category_name = link.get_text(strip=True)
-                if category_name and category_name not in ['', ' ']:
-                    categories.append({
-                        'name': category_name,
-                        'id': link.get('id', '')
-                    })
+            for node in self.tree.parse_nodes(soup):
+                categories.append({
+                    'name': node.text,
+                    'id': node.anchor_id,
+                    'value_path': node.value_path
+                })
             
             logger.info(f"Found {len(categories)} categories")
             return categories
@@ -75,22 +83,63 @@ class MOJPortalScraper:
         """
         Get all laws within a specific category
         
+        The category is expanded over plain HTTP by replaying the TreeView
+        postbacks, down to the individual laws.
+        
         Args:
-            category_id: The tree view ID of the category
+            category_id: The tree view ID of the category (TreeView1t<N>), or
+                its value path as returned by get_law_categories
             
         Returns:
             List of law dictionaries with title and URL
         """
         try:
-            # This would require simulating the tree view expansion
-            # For now, return empty list - would need more complex interaction
-            logger.warning("Category expansion not yet implemented")
-            return []
+            soup, state = self.tree.load()
+            nodes = self.tree.parse_nodes(soup)
+            node = next((n for n in nodes if category_id in (n.anchor_id, n.value_path)), None)
+            if node is None:
+                logger.error(f"Unknown category: {category_id}")
+                return []
+            
+            if node.is_leaf:
+                leaves = [{'title': node.text, 'url': self.tree.resolve_leaf_url(state, node),
+                           'value_path': node.value_path, 'path': []}]
+            else:
+                leaves = self.tree.walk(root_path=node.value_path)
+            
+            return [self._law_from_leaf(leaf, node.text) for leaf in leaves if leaf['url']]
             
         except Exception as e:
             logger.error(f"Error fetching laws in category: {e}")
             return []
     
+    def get_all_laws(self, max_depth: Optional[int] = None) -> List[Dict]:
+        """
+        Expand the whole federal-law tree and list every law in it
+        
+        Args:
+            max_depth: Stop expanding below this tree depth (None for no limit)
+            
+        Returns:
+            List of law dictionaries with title, URL and category
+        """
+        try:
+            leaves = self.tree.walk(max_depth=max_depth)
+            return [self._law_from_leaf(leaf) for leaf in leaves if leaf['url']]
+        except Exception as e:
+            logger.error(f"Error walking the law tree: {e}")
+            return []
+    
+    @staticmethod
+    def _law_from_leaf(leaf: Dict, category: Optional[str] = None) -> Dict:
+        return {
+            'title': leaf['title'],
+            'url': leaf['url'],
+            'category': category or (leaf['path'][0] if leaf['path'] else 'general'),
+            'tree_path': leaf['path'],
+            'source': 'MOJ Legal Portal'
+        }
+    
     def scrape_law_detail(self, law_url: str) -> Dict:
         """
         Scrape the full details of a specific law
@@ -107,7 +156,7 @@ class MOJPortalScraper:
             response = self.session.get(law_url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content)
             
             # Extract title
             title = ""
@@ -135,17 +184,8 @@ class MOJPortalScraper:
                 if main_content:
                     full_text = main_content.get_text(separator='\n', strip=True)
             
-            # Extract articles
-            articles = []
-            article_pattern = r'Article\s+(\d+|One|Two|Three|[A-Z]+)'
-            article_matches = re.finditer(article_pattern, full_text, re.IGNORECASE)
-            
-            for match in article_matches:
-                article_num = match.group(0)
-                articles.append({
-                    'article_number': article_num,
-                    'position': match.start()
-                })
+            # Extract articles (spans with offsets into full_text)
+            articles = segment_articles(full_text)
             
             return {
                 'title': title,
@@ -182,7 +222,6 @@ class MOJPortalScraper:
             law = self.scrape_law_detail(url)
             if law:
                 laws.append(law)
-            time.sleep(2)  # Be respectful
         
         return laws
     
@@ -213,10 +252,14 @@ def main():
             print(f"{idx}. {cat['name']}")
         print("="*60)
     
-    # For now, just demonstrate the structure
-    print("\nNote: Full scraping requires browser automation due to")
-    print("the dynamic tree structure. Use the browser-based workflow")
-    print("described in the documentation for best results.")
+        # Expand the first category over HTTP postbacks
+        laws = scraper.get_laws_in_category(categories[0]['id'])
+        print(f"\n{len(laws)} laws in '{categories[0]['name']}' ({scraper.tree.postbacks} postbacks)")
+        for law in laws[:10]:
+            print(f"  - {law['title']}: {law['url']}")
+    
+    scraper.http_cache.log_stats()
+    scraper.resilience.log_stats()
 
 
 if __name__ == "__main__":
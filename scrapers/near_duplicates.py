@@ -0,0 +1,305 @@
+"""
+Near-Duplicate Detection
+MinHash signatures over word shingles, with an LSH band index persisted in
+SQLite, so a regulation republished with a different header (or the same
+law scraped from two sources) is recognized before it is ingested and
+embedded a second time
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEAR_DUP_DB = os.getenv(
+    'SCRAPER_NEAR_DUP_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/near_duplicates.db"
+)
+
+_EMPTY_BIN = (1 << 64) - 1
+
+# A signature value is the bin minimum in the low _VALUE_BITS bits; a
+# borrowed value carries its borrowing distance in the bits above, so
+# num_perm must stay below 1 << (64 - _VALUE_BITS) to fit in 64 bits
+_VALUE_BITS = 48
+_MAX_PERM = (1 << (64 - _VALUE_BITS)) - 1
+
+# Bumped whenever signature() changes; stored signatures of another
+# format never match new ones, so they are dropped
+_SIGNATURE_FORMAT = '2'
+
+# Arabic spelling variants that should not make two copies differ:
+# diacritics and tatweel are dropped, alef / yeh / teh marbuta forms unified
+_AR_DIACRITICS = re.compile('[\u064B-\u0652\u0670\u0640]')
+_AR_LETTERS = str.maketrans('أإآٱىة', 'اااايه')
+_TOKEN = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Set of word `size`-grams of the normalized text"""
+    text = _AR_DIACRITICS.sub('', text.lower()).translate(_AR_LETTERS)
+    tokens = _TOKEN.findall(text)
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) whose S-curve best separates pairs above and below the
+    Jaccard threshold (least false positive plus false negative area)
+    """
+    def area(rows: int, bands: int, low: float, high: float, steps: int = 50) -> Tuple[List[float], float]:
+        width = (high - low) / steps
+        points = [low + width * (i + 0.5) for i in range(steps)]
+        return [1 - (1 - s ** rows) ** bands for s in points], width
+
+    best, best_error = (num_perm, 1), float('inf')
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        below, width_below = area(rows, bands, 0.0, threshold)
+        above, width_above = area(rows, bands, threshold, 1.0)
+        error = sum(below) * width_below + sum(1 - p for p in above) * width_above
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash / LSH index of document texts
+
+    Each document gets a `num_perm`-value MinHash signature of its word
+    shingles, computed as a densified one-permutation MinHash: every
+    shingle is hashed once and falls into one of `num_perm` bins, whose
+    minimum is the signature value (empty bins borrow from the next
+    filled one). That keeps signatures linear in the text length while
+    estimating Jaccard similarity like classic k-permutation MinHash.
+
+    The signature is cut into bands; documents sharing any band
+    bucket are candidates, and candidates whose estimated Jaccard
+    similarity reaches `threshold` are reported. A lookup reads only the
+    matching buckets, so its cost does not grow with the corpus.
+
+    Documents are keyed by a stable key (their URL, or their document ID).
+    Changing `threshold` re-bands the stored signatures; changing
+    `num_perm`, `shingle_size` or `seed` needs a new database.
+
+    Usage:
+        index = NearDuplicateIndex(threshold=0.8)
+        signature = index.signature(text)
+        match = index.find_duplicate(signature, exclude=url)
+        if match is None:
+            index.add(url, signature, title=title)
+    """
+
+    def __init__(self, db_path: str = DEFAULT_NEAR_DUP_DB, threshold: float = 0.8,
+                 num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        if not 0 < num_perm <= _MAX_PERM:
+            raise ValueError(f"num_perm must be in [1, {_MAX_PERM}], got {num_perm}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+
+        self._hash_key = seed.to_bytes(8, 'little')
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS minhash_meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS minhash_document (
+                doc_key TEXT PRIMARY KEY,
+                title TEXT,
+                source TEXT,
+                signature BLOB NOT NULL,
+                added REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS minhash_bucket (
+                bucket TEXT NOT NULL,
+                doc_key TEXT NOT NULL,
+                PRIMARY KEY (bucket, doc_key)
+            );
+        """)
+        self._check_params(f"{num_perm}:{shingle_size}:{seed}")
+        self._conn.commit()
+
+        self.stats = {'lookups': 0, 'candidates': 0, 'duplicates': 0, 'added': 0}
+
+    def _check_params(self, signature_params: str):
+        """Refuse signatures made with other settings; re-band on a new threshold"""
+        meta = dict(self._conn.execute("SELECT name, value FROM minhash_meta").fetchall())
+        if meta.get('signature_format', _SIGNATURE_FORMAT) != _SIGNATURE_FORMAT or (
+                'signature_params' in meta and 'signature_format' not in meta):
+            logger.warning("Near-duplicate index: signatures are from an older format, clearing the index")
+            self._conn.execute("DELETE FROM minhash_bucket")
+            self._conn.execute("DELETE FROM minhash_document")
+            meta.pop('banding', None)
+
+        if meta.get('signature_params', signature_params) != signature_params:
+            raise ValueError(
+                f"Near-duplicate index was built with num_perm:shingle_size:seed = "
+                f"{meta['signature_params']}, not {signature_params}"
+            )
+
+        banding = f"{self.bands}x{self.rows}"
+        if meta.get('banding') not in (None, banding):
+            logger.info(f"Near-duplicate index: re-banding {meta['banding']} -> {banding} "
+                        f"for threshold {self.threshold}")
+            self._conn.execute("DELETE FROM minhash_bucket")
+            for doc_key, blob in self._conn.execute("SELECT doc_key, signature FROM minhash_document").fetchall():
+                self._insert_buckets(doc_key, self._unpack(blob))
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO minhash_meta (name, value) VALUES (?, ?)",
+            [('signature_params', signature_params), ('signature_format', _SIGNATURE_FORMAT),
+             ('banding', banding)]
+        )
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """MinHash signature of a text"""
+        bins = [_EMPTY_BIN] * self.num_perm
+        for shingle in shingles(text, self.shingle_size):
+            digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=16, key=self._hash_key).digest()
+            # Bin and value come from independent halves of the hash
+            index = int.from_bytes(digest[:8], 'little') % self.num_perm
+            value = int.from_bytes(digest[8:], 'little') >> (64 - _VALUE_BITS)
+            if value < bins[index]:
+                bins[index] = value
+
+        filled = [i for i, value in enumerate(bins) if value != _EMPTY_BIN]
+        if not filled or len(filled) == self.num_perm:
+            return tuple(bins)
+
+        # Densify: an empty bin takes the next filled bin's value, offset by
+        # the distance so borrowed values only match equally borrowed ones
+        signature = list(bins)
+        for i in range(self.num_perm):
+            if bins[i] == _EMPTY_BIN:
+                distance = next(d for d in range(1, self.num_perm) if bins[(i + d) % self.num_perm] != _EMPTY_BIN)
+                signature[i] = bins[(i + distance) % self.num_perm] | (distance << _VALUE_BITS)
+        return tuple(signature)
+
+    @staticmethod
+    def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+    def _buckets(self, signature: Sequence[int]) -> List[str]:
+        buckets = []
+        for band in range(self.bands):
+            values = array('Q', signature[band * self.rows:(band + 1) * self.rows]).tobytes()
+            buckets.append(f"{band}:{hashlib.blake2b(values, digest_size=8).hexdigest()}")
+        return buckets
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Tuple[int, ...]:
+        values = array('Q')
+        values.frombytes(blob)
+        return tuple(values)
+
+    def _insert_buckets(self, doc_key: str, signature: Sequence[int]):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO minhash_bucket (bucket, doc_key) VALUES (?, ?)",
+            [(bucket, doc_key) for bucket in self._buckets(signature)]
+        )
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def query(self, signature: Sequence[int], exclude: Optional[str] = None) -> List[Dict]:
+        """
+        Indexed documents similar to a signature
+
+        Args:
+            signature: From `signature(text)`
+            exclude: Key to leave out (the document itself, on a re-run)
+
+        Returns:
+            Dicts with doc_key, title, source and similarity, most similar
+            first, for every match at or above the threshold
+        """
+        if all(value == _EMPTY_BIN for value in signature):
+            return []  # No text, nothing to compare
+
+        buckets = self._buckets(signature)
+        with self._lock:
+            placeholders = ','.join('?' * len(buckets))
+            rows = self._conn.execute(
+                f"SELECT doc_key, title, source, signature FROM minhash_document WHERE doc_key IN "
+                f"(SELECT DISTINCT doc_key FROM minhash_bucket WHERE bucket IN ({placeholders}))",
+                buckets
+            ).fetchall()
+            self.stats['lookups'] += 1
+            self.stats['candidates'] += len(rows)
+
+        matches = []
+        for doc_key, title, source, blob in rows:
+            if doc_key == exclude:
+                continue
+            similarity = self.similarity(signature, self._unpack(blob))
+            if similarity >= self.threshold:
+                matches.append({'doc_key': doc_key, 'title': title, 'source': source,
+                                'similarity': round(similarity, 3)})
+        matches.sort(key=lambda match: -match['similarity'])
+        return matches
+
+    def find_duplicate(self, signature: Sequence[int], exclude: Optional[str] = None) -> Optional[Dict]:
+        """The most similar indexed document at or above the threshold, or None"""
+        matches = self.query(signature, exclude)
+        if matches:
+            with self._lock:
+                self.stats['duplicates'] += 1
+            return matches[0]
+        return None
+
+    def add(self, doc_key: str, signature: Sequence[int], title: Optional[str] = None,
+            source: Optional[str] = None):
+        """Index (or re-index) a document under its key"""
+        with self._lock:
+            self._conn.execute("DELETE FROM minhash_bucket WHERE doc_key = ?", (doc_key,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO minhash_document (doc_key, title, source, signature, added) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (doc_key, title, source, array('Q', signature).tobytes(), time.time())
+            )
+            self._insert_buckets(doc_key, signature)
+            self._conn.commit()
+            self.stats['added'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['documents'] = self._conn.execute("SELECT COUNT(*) FROM minhash_document").fetchone()[0]
+        stats['bands'], stats['rows'] = self.bands, self.rows
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Near-duplicate index (threshold {self.threshold}, {self.bands}x{self.rows} bands): "
+            f"{stats['lookups']} lookups, {stats['candidates']} candidates checked, "
+            f"{stats['duplicates']} near-duplicates, {stats['added']} added, {stats['documents']} indexed"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
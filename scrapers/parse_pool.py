@@ -0,0 +1,212 @@
+"""
+Parse Process Pool
+Runs CPU-bound page parsing (HTML tree building, text extraction, regex
+cleanup, article segmentation) in worker processes, so fetch threads and the
+asyncio loop only ever wait on the network and parsing scales with the cores
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(fn: Callable, args: tuple):
+    """Run in the worker: call fn and report how long it took"""
+    started = time.process_time()
+    result = fn(*args)
+    return result, time.process_time() - started
+
+
+class ParsePool:
+    """
+    Bounded process-pool parse stage
+
+    Fetchers hand raw page bytes to `submit` / `parse`; at most
+    `max_pending` pages wait for or are in parsing at once, so fetchers
+    block (or await) instead of piling up bodies in memory when parsing
+    falls behind. Each worker process is replaced after
+    `max_tasks_per_child` pages (before Python 3.11, which cannot replace
+    single workers, the whole pool is after `workers * max_tasks_per_child`),
+    which caps the memory a long crawl can accumulate in parser caches and
+    fragmented heaps.
+
+    The parse function must be a module-level function (it is pickled by
+    reference) that takes picklable arguments and returns a picklable
+    result.
+
+    Usage:
+        pool = ParsePool()
+        law = await pool.parse(parse_law_page, url, content, title)  # asyncio
+        future = pool.submit(parse_law_page, url, content, title)    # threads
+        pool.close()
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_tasks_per_child: int = 100,
+                 max_pending: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_pending = max_pending or self.workers * 2
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._async_slots = None
+        self._async_loop = None
+
+        self.stats = {
+            'parsed': 0,
+            'failed': 0,
+            'parse_seconds': 0.0,
+            'restarts': 0,
+            'recycles': 0
+        }
+        self._started = None
+        self._executor_tasks = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if (sys.version_info < (3, 11) and self._executor is not None
+                    and self._executor_tasks >= self.workers * self.max_tasks_per_child):
+                # Before 3.11 workers cannot be replaced one by one: retire
+                # the whole pool (its queued parses still finish) instead
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                self.stats['recycles'] += 1
+            if self._executor is None:
+                if sys.version_info >= (3, 11):
+                    # Worker recycling needs a non-fork start method
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        max_tasks_per_child=self.max_tasks_per_child
+                    )
+                else:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._executor_tasks = 0
+                self._started = self._started or time.monotonic()
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace a pool whose worker died (e.g. killed for memory)"""
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.stats['restarts'] += 1
+        logger.warning("Parse pool worker died - starting a new pool")
+
+    def kill(self):
+        """
+        Terminate the workers (one stuck in a parse cannot be cancelled) and
+        start a fresh pool on the next parse; parses in flight fail with
+        BrokenProcessPool
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            if executor is None:
+                return
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.stats['restarts'] += 1
+        logger.warning("Parse pool workers killed - starting a new pool")
+
+    def _submit(self, fn: Callable, args: tuple) -> Future:
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_timed_call, fn, args)
+        except BrokenProcessPool:
+            self._restart(executor)
+            future = self._get_executor().submit(_timed_call, fn, args)
+        with self._lock:
+            self._executor_tasks += 1
+        return future
+
+    def _unwrap(self, future: Future):
+        """Result of a finished parse; updates the stats"""
+        try:
+            result, seconds = future.result()
+        except Exception:
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            raise
+        with self._stats_lock:
+            self.stats['parsed'] += 1
+            self.stats['parse_seconds'] += seconds
+        return result
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Queue a parse from a thread; blocks while `max_pending` parses are
+        outstanding
+
+        Returns:
+            Future whose result is fn(*args)
+        """
+        self._slots.acquire()
+        try:
+            inner = self._submit(fn, args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        outer = Future()
+
+        def finished(done: Future):
+            self._slots.release()
+            try:
+                outer.set_result(self._unwrap(done))
+            except Exception as e:
+                outer.set_exception(e)
+
+        inner.add_done_callback(finished)
+        return outer
+
+    async def parse(self, fn: Callable, *args):
+        """Parse from asyncio; waits (without blocking the loop) for a free slot"""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_slots = asyncio.Semaphore(self.max_pending)
+            self._async_loop = loop
+
+        async with self._async_slots:
+            executor = self._get_executor()
+            future = self._submit(fn, args)
+            try:
+                await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                self._restart(executor)
+            except Exception:
+                pass  # Raised again by _unwrap
+            return self._unwrap(future)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['parse_seconds'] = round(stats['parse_seconds'], 2)
+        elapsed = time.monotonic() - self._started if self._started else 0
+        stats['pages_per_second'] = round(stats['parsed'] / elapsed, 1) if elapsed else 0.0
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Parse pool ({self.workers} workers): {stats['parsed']} parsed, {stats['failed']} failed, "
+            f"{stats['parse_seconds']}s CPU, {stats['pages_per_second']} pages/s"
+        )
+
+    def close(self):
+        """Stop the workers; the pool starts again on the next parse"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -0,0 +1,165 @@
+"""
+Streaming PDF Downloads
+Downloads PDFs in chunks to a partial file, resumes interrupted downloads
+with HTTP Range / If-Range requests, and only accepts files that look like
+complete PDFs
+"""
+
+import os
+import logging
+from typing import Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MIN_PDF_SIZE = 1024
+PARTIAL_SUFFIX = '.part'
+VALIDATOR_SUFFIX = '.validator'
+
+
+def is_valid_pdf(path: str, min_size: int = MIN_PDF_SIZE) -> bool:
+    """
+    Check that a file looks like a complete PDF
+
+    The header must contain the %PDF magic bytes and the tail must contain the
+    %%EOF marker, which catches files truncated by an interrupted download.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size < min_size:
+            return False
+
+        with open(path, 'rb') as f:
+            head = f.read(1024)
+            f.seek(max(0, size - 2048))
+            tail = f.read()
+
+        return b'%PDF' in head and b'%%EOF' in tail
+    except OSError:
+        return False
+
+
+def _expected_size(response: requests.Response, offset: int) -> Optional[int]:
+    """Total file size announced by the server, if any"""
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit():
+        return offset + int(content_length)
+    return None
+
+
+def _validator(response: requests.Response) -> Optional[str]:
+    """Strong ETag or Last-Modified of a response - what If-Range accepts"""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def _discard(*paths: str):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def download_pdf_stream(session: requests.Session, url: str, filepath: str,
+                        timeout: float = 60, chunk_size: int = CHUNK_SIZE,
+                        min_size: int = MIN_PDF_SIZE) -> int:
+    """
+    Stream a PDF to disk, resuming a previous partial download if present
+
+    Data is written to `<filepath>.part` and renamed into place only after the
+    %PDF / %%EOF check passes, so `filepath` never holds a truncated file.
+    Memory use is bounded by `chunk_size` regardless of the PDF size.
+
+    The ETag / Last-Modified of the response that started the partial file
+    is kept next to it and sent as If-Range, so if the PDF was replaced in
+    the meantime the server sends the whole new file instead of appending
+    its tail to the old prefix. A partial file without a validator is
+    downloaded again from the start.
+
+    Args:
+        session: requests session to download with
+        url: PDF URL
+        filepath: Final destination path
+        timeout: Connect/read timeout per request
+        chunk_size: Bytes per streamed chunk
+        min_size: Smallest file accepted as a PDF
+
+    Returns:
+        Size of the downloaded file in bytes
+
+    Raises:
+        requests.RequestException on network/HTTP errors,
+        ValueError if the downloaded file is not a valid PDF
+    """
+    partial_path = filepath + PARTIAL_SUFFIX
+    validator_path = partial_path + VALIDATOR_SUFFIX
+
+    # A truncated file left by an older, non-atomic download has no
+    # validator, so it cannot be resumed safely
+    if os.path.exists(filepath) and not is_valid_pdf(filepath, min_size):
+        logger.warning(f"Incomplete PDF found, downloading again: {os.path.basename(filepath)}")
+        os.remove(filepath)
+
+    validator = None
+    if os.path.exists(validator_path):
+        with open(validator_path, encoding='utf-8') as f:
+            validator = f.read().strip() or None
+    if not validator:
+        _discard(partial_path, validator_path)
+
+    offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if offset else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416 and offset:
+            # Nothing left to fetch - the partial file may already be complete
+            expected = offset
+        else:
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                logger.info(f"Resuming {os.path.basename(filepath)} at {offset / 1024:.1f} KB")
+                mode = 'ab'
+            else:
+                # Server ignored the Range header, or the PDF changed since
+                # the partial file was started (If-Range) - start over
+                if offset:
+                    logger.info(f"Restarting {os.path.basename(filepath)} - file changed on the server "
+                                f"or range not supported")
+                offset = 0
+                mode = 'wb'
+                validator = _validator(response)
+                if validator:
+                    with open(validator_path, 'w', encoding='utf-8') as f:
+                        f.write(validator)
+                else:
+                    _discard(validator_path)
+
+            expected = _expected_size(response, offset)
+
+            with open(partial_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+
+    size = os.path.getsize(partial_path)
+    if expected is not None and size < expected:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"Download interrupted at {size} of {expected} bytes"
+        )
+
+    if not is_valid_pdf(partial_path, min_size):
+        _discard(partial_path, validator_path)
+        raise ValueError(f"Downloaded file is not a valid PDF: {url}")
+
+    os.replace(partial_path, filepath)
+    _discard(validator_path)
+    return size
@@ -0,0 +1,463 @@
+"""
+Parallel PDF Text Extraction
+Extracts PDF text page by page, in-process with pypdfium2 or pdfminer when
+installed and with pdftotext page ranges otherwise, in a pool sized to the
+CPU count. Failed pages are retried on their own, so one bad page no longer
+drops a whole document
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from extraction_cache import ExtractionCache, file_digest
+from parse_pool import ParsePool
+from pdf_ocr import PageOCR, needs_ocr
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Optional dependency - pdfminer or pdftotext is used instead
+    pdfium = None
+
+try:
+    from pdfminer.high_level import extract_pages as pdfminer_pages
+    from pdfminer.layout import LTTextContainer
+    from pdfminer.pdfpage import PDFPage
+except ImportError:  # Optional dependency - pdftotext is used instead
+    pdfminer_pages = None
+
+logger = logging.getLogger(__name__)
+
+PDFTOTEXT = os.getenv('PDFTOTEXT', 'pdftotext')
+PDFINFO = os.getenv('PDFINFO', 'pdfinfo')
+
+# In-process engines avoid a subprocess per PDF; pdfium (C, releases the GIL)
+# is preferred over pdfminer (pure Python). SCRAPER_PDF_ENGINE overrides.
+PDF_ENGINE = os.getenv('SCRAPER_PDF_ENGINE') or (
+    'pdfium' if pdfium is not None else 'pdfminer' if pdfminer_pages is not None else 'pdftotext'
+)
+
+# pdftotext ends every page with a form feed
+PAGE_BREAK = '\f'
+
+# Part of every extraction cache key; bump it whenever a change to the
+# extraction code changes its output, so old cache entries stop matching
+EXTRACTOR_VERSION = 3
+
+
+class PDFExtractionError(Exception):
+    """A pdftotext run failed or timed out"""
+
+
+def pdf_page_count(pdf_path: str, timeout: float = 30) -> Optional[int]:
+    """Number of pages according to pdfinfo, or None if it cannot tell"""
+    try:
+        result = subprocess.run([PDFINFO, pdf_path], capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(rb'^Pages:\s+(\d+)', result.stdout, re.MULTILINE)
+    return int(match.group(1)) if result.returncode == 0 and match else None
+
+
+def run_pdftotext(pdf_path: str, first: Optional[int] = None, last: Optional[int] = None,
+                  timeout: float = 30) -> str:
+    """
+    Text of a page range (the whole file if no range is given)
+
+    Raises:
+        PDFExtractionError if pdftotext fails or exceeds the timeout
+    """
+    command = [PDFTOTEXT, '-enc', 'UTF-8']
+    if first is not None:
+        command += ['-f', str(first), '-l', str(last)]
+    command += [pdf_path, '-']
+
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise PDFExtractionError(f"pdftotext timed out after {timeout:.0f}s")
+    except OSError as e:
+        raise PDFExtractionError(f"pdftotext could not run: {e}")
+
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip()[:200]
+        raise PDFExtractionError(f"pdftotext exited with {result.returncode}: {message}")
+    return result.stdout.decode('utf-8', 'replace')
+
+
+def iter_pdf_pages(pdf_path: str, engine: str = PDF_ENGINE, first: int = 1,
+                   last: Optional[int] = None) -> Iterator[Tuple[int, Optional[str]]]:
+    """
+    Yield (page number, text) for each page, one page in memory at a time
+
+    A page the engine cannot read yields None as its text. Raises if the
+    document itself cannot be opened.
+
+    Args:
+        pdf_path: PDF on disk
+        engine: 'pdfium', 'pdfminer' or 'pdftotext'
+        first, last: Page range (1-based, inclusive); all pages by default
+    """
+    if engine == 'pdfium':
+        document = pdfium.PdfDocument(pdf_path)
+        try:
+            for index in range(first - 1, min(last or len(document), len(document))):
+                try:
+                    page = document[index]
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range().replace('\r\n', '\n')
+                    textpage.close()
+                    page.close()
+                except Exception as e:
+                    logger.debug(f"pdfium could not read page {index + 1} of {pdf_path}: {e}")
+                    text = None
+                yield index + 1, text
+        finally:
+            document.close()
+
+    elif engine == 'pdfminer':
+        page_numbers = range(first - 1, last or sys.maxsize) if first > 1 or last else None
+        for number, layout in enumerate(pdfminer_pages(pdf_path, page_numbers=page_numbers), first):
+            yield number, ''.join(
+                element.get_text() for element in layout if isinstance(element, LTTextContainer)
+            )
+
+    else:
+        pages = pdf_page_count(pdf_path)
+        if pages is None:
+            raise PDFExtractionError(f"pdfinfo could not read {pdf_path}")
+        for number in range(first, min(last or pages, pages) + 1):
+            try:
+                yield number, run_pdftotext(pdf_path, number, number).rstrip(PAGE_BREAK)
+            except PDFExtractionError:
+                yield number, None
+
+
+def pdf_page_total(pdf_path: str, engine: str = PDF_ENGINE) -> int:
+    """Number of pages according to an in-process engine (runs in a ParsePool worker)"""
+    if engine == 'pdfium':
+        document = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+    with open(pdf_path, 'rb') as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+
+def read_pdf_pages(pdf_path: str, engine: str = PDF_ENGINE, first: int = 1,
+                   last: Optional[int] = None) -> List[Optional[str]]:
+    """Text of a page range with an in-process engine (runs in a ParsePool worker)"""
+    return [text for _, text in iter_pdf_pages(pdf_path, engine, first, last)]
+
+
+class PDFTextExtractor:
+    """
+    Extraction stage for many PDFs
+
+    `submit` returns immediately, so callers can keep downloading while the
+    pool extracts. Each PDF is split into ranges of `pages_per_job` pages,
+    and a range gets `page_timeout` seconds per page.
+
+    With an in-process engine (pypdfium2 or pdfminer) the ranges are read
+    in a pool of long-lived worker processes, one per core by default. A
+    range that overruns its deadline gets the pool's workers killed and
+    replaced, since a hung parse cannot be cancelled. Pages the engine
+    cannot read or that timed out, and documents it cannot open, fall back
+    to pdftotext.
+
+    With pdftotext up to `workers` pdftotext processes run at a time,
+    across all submitted PDFs. If a range fails, only its pages are retried
+    one by one (up to `retries` more times). Pages that never succeed are
+    left empty and reported in the stats, the rest of the document is
+    kept.
+
+    Either way the text keeps one form feed per page, so page numbers can
+    be recovered from it (see article_segmenter.add_page_anchors).
+
+    With a `cache`, pages are stored under the PDF's content digest:
+    unchanged PDFs are served from it, and a document with failed pages
+    only has those pages extracted again.
+
+    With `ocr`, pages whose text layer is missing or nearly empty (scanned
+    pages) are run through Tesseract; pages that already have text never
+    are.
+
+    Usage:
+        extractor = PDFTextExtractor(cache=ExtractionCache())
+        future = extractor.submit(pdf_path, text_path)
+        ...
+        text = future.result()
+    """
+
+    def __init__(self, workers: Optional[int] = None, pages_per_job: int = 10,
+                 page_timeout: float = 15, retries: int = 2, file_timeout: float = 300,
+                 engine: str = PDF_ENGINE, cache: Optional[ExtractionCache] = None,
+                 ocr: Optional[PageOCR] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.engine = engine
+        self.cache = cache
+        self.ocr = ocr if ocr is not None and ocr.available else None
+        self.pages_per_job = max(1, pages_per_job)
+        self.page_timeout = page_timeout
+        self.retries = retries
+        self.file_timeout = file_timeout
+
+        # pdftotext runs in subprocesses, so threads are enough to keep
+        # every core busy; documents are coordinated in a separate pool so
+        # waiting on ranges never starves the range jobs
+        self._jobs = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdftotext')
+        self._documents = ThreadPoolExecutor(max_workers=self.workers * 2, thread_name_prefix='pdf-doc')
+        # In-process engines are CPU-bound (pdfminer holds the GIL) and
+        # pdfium is not thread-safe, so they get worker processes instead
+        self._readers = ParsePool(workers=self.workers) if engine != 'pdftotext' else None
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'documents': 0,
+            'pages': 0,
+            'failed_pages': 0,
+            'retried_pages': 0,
+            'cached': 0,
+            'fallbacks': 0,
+            'ocr_pages': 0,
+            'seconds': 0.0
+        }
+
+    def _count(self, key: str, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def submit(self, pdf_path: str, text_path: Optional[str] = None) -> Future:
+        """
+        Queue a PDF for extraction
+
+        Args:
+            pdf_path: PDF on disk
+            text_path: Where to write a copy of a complete extraction (it is
+                never read back - the cache is keyed by content, not name)
+
+        Returns:
+            Future resolving to the text (None if nothing could be extracted)
+        """
+        return self._documents.submit(self.extract, pdf_path, text_path)
+
+    @property
+    def options(self) -> str:
+        """Extractor version and the options that shape its output (part of the cache key)"""
+        options = f"v{EXTRACTOR_VERSION}:{self.engine}"
+        return f"{options}:{self.ocr.options}" if self.ocr else options
+
+    def extract(self, pdf_path: str, text_path: Optional[str] = None) -> Optional[str]:
+        """Extract one PDF, blocking until done (see submit)"""
+        started = time.monotonic()
+        digest = cache_key = cached = None
+        if self.cache:
+            digest = file_digest(pdf_path)
+            cache_key = self.cache.key(digest, self.options)
+            cached = self.cache.get(cache_key)
+
+        if cached and len(cached[1]) >= cached[0]:
+            self._count('cached')
+            pages, page_texts, failed = cached[0], cached[1], []
+        else:
+            if cached:
+                # Only the pages that failed last time are extracted again
+                pages, page_texts = cached
+                missing = [page for page in range(1, pages + 1) if page not in page_texts]
+                extracted = self._finish_pages(pdf_path, pages, dict(page_texts), missing)
+            else:
+                extracted = self._extract_in_process(pdf_path) if self._readers else None
+                if extracted is None:
+                    extracted = self._extract_with_pdftotext(pdf_path)
+            if extracted is None:
+                return None
+            pages, page_texts, failed = extracted
+            if self.ocr:
+                self._ocr_scanned_pages(pdf_path, pages, page_texts, failed)
+
+            self._count('documents')
+            self._count('seconds', time.monotonic() - started)
+            if self.cache:
+                self.cache.put(cache_key, digest, pages, page_texts)
+
+        text = ''.join(page_texts.get(page, '') + PAGE_BREAK for page in range(1, pages + 1))
+        if failed:
+            logger.warning(f"{os.path.basename(pdf_path)}: {len(failed)} page(s) could not be "
+                           f"extracted: {failed[:10]}")
+        elif text_path:
+            with open(text_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+        return text if text.strip() else None
+
+    def _ocr_scanned_pages(self, pdf_path: str, pages: int, page_texts: Dict[int, str], failed: List[int]):
+        """Replace the text of pages without a usable text layer by their OCR text"""
+        scanned = [page for page in range(1, pages + 1)
+                   if page not in failed and needs_ocr(page_texts.get(page))]
+        if not scanned:
+            return
+
+        recognized = self.ocr.ocr_pages(pdf_path, scanned)
+        for page, text in recognized.items():
+            if len(text.strip()) > len(page_texts.get(page, '').strip()):
+                page_texts[page] = text
+        self._count('ocr_pages', len(recognized))
+        logger.info(f"{os.path.basename(pdf_path)}: OCR on {len(recognized)}/{len(scanned)} "
+                    f"page(s) without a text layer")
+
+    def _ranges(self, pages: int) -> List[Tuple[int, int]]:
+        return [(first, min(first + self.pages_per_job - 1, pages))
+                for first in range(1, pages + 1, self.pages_per_job)]
+
+    def _extract_with_pdftotext(self, pdf_path: str) -> Optional[Tuple[int, Dict[int, str], List[int]]]:
+        """Page count, page texts and failed pages from pdftotext page ranges"""
+        pages = pdf_page_count(pdf_path)
+        if pages is None:
+            # pdfinfo could not read it - one whole-file run is all we can do
+            try:
+                text = self._jobs.submit(run_pdftotext, pdf_path, None, None, self.file_timeout).result()
+            except PDFExtractionError as e:
+                logger.warning(f"Failed to extract {os.path.basename(pdf_path)}: {e}")
+                return None
+            texts = self._split_pages(text, max(1, text.count(PAGE_BREAK)))
+            return len(texts), dict(enumerate(texts, 1)), []
+
+        self._count('pages', pages)
+        return self._extract_pages(pdf_path, pages)
+
+    def _extract_in_process(self, pdf_path: str) -> Optional[Tuple[int, Dict[int, str], List[int]]]:
+        """
+        Page count, page texts and failed pages from the in-process engine;
+        None if the engine cannot read the document at all
+
+        Ranges are read one at a time, so each one's deadline starts about
+        when it does and a document never holds more than one reader slot.
+        """
+        name = os.path.basename(pdf_path)
+        try:
+            pages = self._readers.submit(pdf_page_total, pdf_path, self.engine).result(timeout=self.page_timeout)
+        except Exception as e:
+            if isinstance(e, FutureTimeoutError):
+                self._readers.kill()
+            logger.info(f"{name}: {self.engine} failed ({e!r}) - falling back to pdftotext")
+            self._count('fallbacks')
+            return None
+
+        page_texts: Dict[int, str] = {}
+        pending_pages = []
+        for first, last in self._ranges(pages):
+            future = self._readers.submit(read_pdf_pages, pdf_path, self.engine, first, last)
+            try:
+                texts = future.result(timeout=self.page_timeout * (last - first + 1))
+            except FutureTimeoutError:
+                logger.warning(f"{name} pages {first}-{last}: {self.engine} timed out - replacing its workers")
+                self._readers.kill()
+                texts = []
+            except Exception as e:
+                logger.info(f"{name} pages {first}-{last}: {self.engine} failed ({e!r})")
+                texts = []
+            for page in range(first, last + 1):
+                text = texts[page - first] if page - first < len(texts) else None
+                if text is None:
+                    pending_pages.append(page)
+                else:
+                    page_texts[page] = text
+
+        self._count('pages', pages)
+        if pending_pages:
+            logger.info(f"{name}: {self.engine} could not read pages "
+                        f"{pending_pages[:10]} - retrying with pdftotext")
+        return self._finish_pages(pdf_path, pages, page_texts, pending_pages)
+
+    def _extract_pages(self, pdf_path: str, pages: int) -> Tuple[int, Dict[int, str], List[int]]:
+        """Page count, page texts and failed pages of a PDF with a known page count"""
+        page_texts: Dict[int, str] = {}
+        ranges = self._ranges(pages)
+        futures = {
+            (first, last): self._jobs.submit(run_pdftotext, pdf_path, first, last,
+                                             self.page_timeout * (last - first + 1))
+            for first, last in ranges
+        }
+
+        pending_pages = []
+        for (first, last), future in futures.items():
+            try:
+                chunk = future.result()
+            except PDFExtractionError as e:
+                logger.info(f"{os.path.basename(pdf_path)} pages {first}-{last}: {e} - retrying per page")
+                pending_pages.extend(range(first, last + 1))
+                continue
+            for page, text in zip(range(first, last + 1), self._split_pages(chunk, last - first + 1)):
+                page_texts[page] = text
+
+        return self._finish_pages(pdf_path, pages, page_texts, pending_pages)
+
+    def _finish_pages(self, pdf_path: str, pages: int, page_texts: Dict[int, str],
+                      pending_pages: List[int]) -> Tuple[int, Dict[int, str], List[int]]:
+        """Retry the failed pages with pdftotext, one by one"""
+        # Retry only the failed pages, each on its own
+        for _ in range(self.retries):
+            if not pending_pages:
+                break
+            self._count('retried_pages', len(pending_pages))
+            futures = {
+                page: self._jobs.submit(run_pdftotext, pdf_path, page, page, self.page_timeout)
+                for page in pending_pages
+            }
+            pending_pages = []
+            for page, future in futures.items():
+                try:
+                    page_texts[page] = self._split_pages(future.result(), 1)[0]
+                except PDFExtractionError:
+                    pending_pages.append(page)
+
+        self._count('failed_pages', len(pending_pages))
+        return pages, page_texts, pending_pages
+
+    @staticmethod
+    def _split_pages(chunk: str, count: int) -> List[str]:
+        """Split a range's output into per-page texts (without the form feeds)"""
+        parts = chunk.split(PAGE_BREAK)
+        texts = parts[:count]
+        if len(texts) < count:
+            texts += [''] * (count - len(texts))
+        else:
+            # Anything after the last expected page break belongs to the last page
+            extra = [part for part in parts[count:] if part.strip()]
+            if extra:
+                texts[-1] += '\n' + '\n'.join(extra)
+        return texts
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['seconds'] = round(stats['seconds'], 1)
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"PDF extraction ({self.workers} workers): {stats['documents']} documents, "
+            f"{stats['pages']} pages, {stats['retried_pages']} pages retried, "
+            f"{stats['failed_pages']} failed, {stats['cached']} from cache, engine {self.engine}"
+            + (f" ({stats['fallbacks']} fell back to pdftotext)" if self._readers else '')
+        )
+        if self.ocr:
+            self.ocr.log_stats()
+        if self.cache:
+            self.cache.log_stats()
+
+    def close(self):
+        self._documents.shutdown(wait=True)
+        self._jobs.shutdown(wait=True)
+        if self._readers:
+            self._readers.close()
+        if self.ocr:
+            self.ocr.close()
@@ -0,0 +1,157 @@
+"""
+Selective PDF OCR
+Finds the pages of a PDF that have no usable text layer (scanned Arabic
+circulars, mostly) and runs Tesseract on only those pages, one process per
+core, caching the result by the hash of the rendered page image
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+TESSERACT = os.getenv('TESSERACT', 'tesseract')
+PDFTOPPM = os.getenv('PDFTOPPM', 'pdftoppm')
+OCR_LANGUAGES = os.getenv('SCRAPER_OCR_LANGUAGES', 'ara+eng')
+
+# A page with fewer letters/digits than this is treated as having no text layer
+_MIN_PAGE_CHARS = 20
+_WORD_CHARS = re.compile(r'\w')
+
+
+def needs_ocr(page_text: Optional[str], min_chars: int = _MIN_PAGE_CHARS) -> bool:
+    """True if a page's extracted text is too thin to be a real text layer"""
+    return len(_WORD_CHARS.findall(page_text or '')) < min_chars
+
+
+def render_page(pdf_path: str, page: int, dpi: int = 300, timeout: float = 60) -> bytes:
+    """One page as a grayscale PNG (pdftoppm writes it to stdout)"""
+    result = subprocess.run(
+        [PDFTOPPM, '-f', str(page), '-l', str(page), '-r', str(dpi), '-gray', '-png', '-singlefile', pdf_path],
+        capture_output=True, timeout=timeout
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"pdftoppm exited with {result.returncode}: "
+                           f"{result.stderr.decode('utf-8', 'replace').strip()[:200]}")
+    return result.stdout
+
+
+def ocr_image(image: bytes, languages: str = OCR_LANGUAGES, timeout: float = 120) -> str:
+    """Tesseract text of an image (passed on stdin, read from stdout)"""
+    # One thread per tesseract process: pages are already spread over the
+    # cores, and OpenMP threads on top of that only oversubscribe them
+    env = dict(os.environ, OMP_THREAD_LIMIT='1')
+    result = subprocess.run(
+        [TESSERACT, 'stdin', 'stdout', '-l', languages],
+        input=image, capture_output=True, timeout=timeout, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"tesseract exited with {result.returncode}: "
+                           f"{result.stderr.decode('utf-8', 'replace').strip()[:200]}")
+    return result.stdout.decode('utf-8', 'replace')
+
+
+class PageOCR:
+    """
+    OCR stage for the pages a text extractor could not read
+
+    Pages are rendered and recognized in parallel, up to `workers`
+    tesseract processes at a time (one per core by default). Results are
+    cached under the SHA-256 of the rendered image, so a scanned page that
+    reappears (a re-published circular, the same annex in two PDFs) is
+    never recognized twice. If tesseract or pdftoppm is not installed the
+    stage is disabled and returns nothing.
+
+    Usage:
+        ocr = PageOCR(cache=ExtractionCache())
+        texts = ocr.ocr_pages(pdf_path, [3, 4])   # {page: text}
+    """
+
+    def __init__(self, workers: Optional[int] = None, languages: str = OCR_LANGUAGES, dpi: int = 300,
+                 cache: Optional[ExtractionCache] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.languages = languages
+        self.dpi = dpi
+        self.cache = cache
+
+        missing = [tool for tool in (TESSERACT, PDFTOPPM) if shutil.which(tool) is None]
+        self.available = not missing
+        if missing:
+            logger.warning(f"OCR disabled - not installed: {', '.join(missing)}")
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr')
+        self._lock = threading.Lock()
+        self.stats = {'pages': 0, 'cached': 0, 'failed': 0, 'seconds': 0.0}
+
+    @property
+    def options(self) -> str:
+        """OCR settings that shape its output (part of every cache key)"""
+        return f"ocr:{self.languages}:{self.dpi}"
+
+    def _count(self, key: str, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def ocr_pages(self, pdf_path: str, pages: Iterable[int]) -> Dict[int, str]:
+        """
+        OCR the given pages of a PDF
+
+        Returns:
+            {page number: text} for the pages that could be recognized
+        """
+        if not self.available:
+            return {}
+
+        futures = {page: self._pool.submit(self._ocr_page, pdf_path, page) for page in pages}
+        texts = {}
+        for page, future in futures.items():
+            try:
+                texts[page] = future.result()
+            except Exception as e:
+                logger.info(f"{os.path.basename(pdf_path)} page {page}: OCR failed: {e}")
+                self._count('failed')
+        return texts
+
+    def _ocr_page(self, pdf_path: str, page: int) -> str:
+        started = time.monotonic()
+        image = render_page(pdf_path, page, self.dpi)
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.key(hashlib.sha256(image).hexdigest(), self.options)
+            text = self.cache.get_ocr(cache_key)
+            if text is not None:
+                self._count('cached')
+                return text
+
+        text = ocr_image(image, self.languages)
+        if self.cache:
+            self.cache.put_ocr(cache_key, text)
+        self._count('pages')
+        self._count('seconds', time.monotonic() - started)
+        return text
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['seconds'] = round(stats['seconds'], 1)
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"OCR ({self.workers} workers, {self.languages}): {stats['pages']} pages recognized "
+            f"in {stats['seconds']}s, {stats['cached']} from cache, {stats['failed']} failed"
+        )
+
+    def close(self):
+        self._pool.shutdown(wait=True)
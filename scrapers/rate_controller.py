@@ -0,0 +1,277 @@
+"""
+Adaptive Per-Domain Rate Controller
+Replaces fixed sleeps with a request rate per domain that follows how the
+server is behaving: it speeds up while responses are fast and clean, backs
+off on slow responses and errors, and honors 429/503 Retry-After
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (min_rate, initial_rate, max_rate) in requests per second
+DOMAIN_LIMITS: Dict[str, Tuple[float, float, float]] = {
+    'elaws.moj.gov.ae': (0.1, 0.5, 4.0),
+    'uaelegislation.gov.ae': (0.1, 0.5, 4.0),
+    'dubailand.gov.ae': (0.1, 1.0, 4.0),
+    'generativelanguage.googleapis.com': (0.2, 1.0, 5.0),
+    'supabase.co': (0.5, 3.0, 10.0),
+}
+DEFAULT_LIMITS = (0.1, 0.5, 2.0)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def domain_of(url_or_domain: str) -> str:
+    """Normalize a URL or host name to the domain key used by the registry"""
+    host = urlparse(url_or_domain).netloc if '://' in url_or_domain else url_or_domain
+    host = host.split(':')[0].lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class DomainRateController:
+    """
+    AIMD rate controller for one domain
+
+    The rate grows additively after a run of fast, successful responses and
+    shrinks multiplicatively on throttling, server errors or rising latency,
+    always staying within [min_rate, max_rate]. A Retry-After header blocks
+    all requests to the domain until it expires.
+    """
+
+    def __init__(self, domain: str, min_rate: float, initial_rate: float, max_rate: float,
+                 increase_step: float = 0.1, increase_after: int = 5, window: int = 20,
+                 max_error_rate: float = 0.1):
+        self.domain = domain
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.increase_step = increase_step
+        self.increase_after = increase_after
+        self.max_error_rate = max_error_rate
+
+        self.latency_ewma: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self._outcomes = deque(maxlen=window)
+        self._success_streak = 0
+        self._next_allowed = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.time_waiting = 0.0
+
+    def reserve(self) -> float:
+        """
+        Book the next request slot
+
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed, self._blocked_until)
+            self._next_allowed = start + 1.0 / self.rate
+            delay = start - now
+            self.time_waiting += delay
+            return delay
+
+    def wait(self):
+        """Block until the next request to this domain may be sent"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, status: Optional[int] = None, latency: float = 0.0,
+               retry_after: Optional[float] = None, error: bool = False):
+        """
+        Feed the outcome of a request back into the controller
+
+        Args:
+            status: HTTP status code (None for transport errors)
+            latency: Seconds the request took
+            retry_after: Parsed Retry-After header, if any
+            error: True for transport errors / failed calls
+        """
+        with self._lock:
+            self.requests += 1
+            is_error = error or status is None or status >= 500 or status in THROTTLE_STATUSES
+            self._outcomes.append(is_error)
+
+            if latency > 0:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+                if self.baseline_latency is None or self.latency_ewma < self.baseline_latency:
+                    self.baseline_latency = self.latency_ewma
+
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._decrease(0.5)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                    logger.warning(f"{self.domain}: throttled ({status}), pausing {retry_after:.0f}s")
+                else:
+                    logger.warning(f"{self.domain}: throttled ({status}), rate now {self.rate:.2f} req/s")
+            elif is_error:
+                self.errors += 1
+                if self.error_rate > self.max_error_rate:
+                    self._decrease(0.75)
+                self._success_streak = 0
+            elif self._is_slow():
+                self._decrease(0.9)
+            else:
+                self._success_streak += 1
+                if self._success_streak >= self.increase_after:
+                    self.rate = min(self.max_rate, self.rate + self.increase_step)
+                    self._success_streak = 0
+
+    def _decrease(self, factor: float):
+        self.rate = max(self.min_rate, self.rate * factor)
+        self._success_streak = 0
+
+    def _is_slow(self) -> bool:
+        """Latency well above the best we have seen means the server is struggling"""
+        if self.latency_ewma is None or self.baseline_latency is None:
+            return False
+        return self.latency_ewma > 1.0 and self.latency_ewma > 2 * self.baseline_latency
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'domain': self.domain,
+                'rate': round(self.rate, 3),
+                'requests': self.requests,
+                'errors': self.errors,
+                'throttled': self.throttled,
+                'error_rate': round(self.error_rate, 3),
+                'latency_ewma': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+                'time_waiting': round(self.time_waiting, 1)
+            }
+
+
+class RateControllerRegistry:
+    """One DomainRateController per domain, created on first use"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float, float]]] = None):
+        self.limits = dict(DOMAIN_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self._controllers: Dict[str, DomainRateController] = {}
+        self._lock = threading.Lock()
+
+    def _limits_for(self, domain: str) -> Tuple[float, float, float]:
+        for suffix, limits in self.limits.items():
+            if domain == suffix or domain.endswith('.' + suffix):
+                return limits
+        return DEFAULT_LIMITS
+
+    def get(self, url_or_domain: str) -> DomainRateController:
+        domain = domain_of(url_or_domain)
+        with self._lock:
+            if domain not in self._controllers:
+                min_rate, initial_rate, max_rate = self._limits_for(domain)
+                self._controllers[domain] = DomainRateController(domain, min_rate, initial_rate, max_rate)
+            return self._controllers[domain]
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            controllers = list(self._controllers.values())
+        return {c.domain: c.get_stats() for c in controllers}
+
+    def log_stats(self):
+        for stats in self.get_stats().values():
+            logger.info(
+                f"Rate {stats['domain']}: {stats['rate']} req/s, {stats['requests']} requests, "
+                f"{stats['errors']} errors, {stats['throttled']} throttled, "
+                f"{stats['time_waiting']}s waiting"
+            )
+
+
+_shared_registry = RateControllerRegistry()
+
+
+def get_rate_controller(url_or_domain: str) -> DomainRateController:
+    """Shared controller for a domain (process-wide)"""
+    return _shared_registry.get(url_or_domain)
+
+
+def get_shared_registry() -> RateControllerRegistry:
+    return _shared_registry
+
+
+class RateLimitedAdapter(BaseAdapter):
+    """
+    Transport adapter that paces requests through the domain's controller
+    and reports status, latency and Retry-After back to it
+    """
+
+    def __init__(self, registry: RateControllerRegistry, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.registry = registry
+        self.inner = inner or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        controller = self.registry.get(request.url)
+        controller.wait()
+
+        started = time.monotonic()
+        try:
+            response = self.inner.send(request, **kwargs)
+        except Exception:
+            controller.record(latency=time.monotonic() - started, error=True)
+            raise
+
+        controller.record(
+            response.status_code,
+            time.monotonic() - started,
+            parse_retry_after(response.headers.get('Retry-After'))
+        )
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def install_rate_controller(session: requests.Session,
+                            registry: Optional[RateControllerRegistry] = None) -> RateControllerRegistry:
+    """
+    Pace every request made through a session with per-domain controllers
+
+    Install this before the HTTP cache so cache hits are not delayed.
+
+    Returns:
+        The registry in use, for reporting stats
+    """
+    registry = registry or _shared_registry
+    for prefix in ('https://', 'http://'):
+        session.mount(prefix, RateLimitedAdapter(registry, inner=session.get_adapter(prefix)))
+    return registry
@@ -0,0 +1,256 @@
+"""
+Resilient Request Layer
+Jittered exponential-backoff retries and a per-host circuit breaker for
+every request made through the scrapers' sessions
+"""
+
+import time
+import random
+import logging
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from rate_controller import domain_of, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker
+
+    closed    -> requests flow; `failure_threshold` consecutive failures open it
+    open      -> requests fail fast for `reset_timeout` seconds
+    half-open -> a single probe request is let through; success closes the
+                 circuit, failure re-opens it (with the timeout doubled, up to
+                 `max_reset_timeout`)
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 30,
+                 max_reset_timeout: float = 600):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True if a request to the host may be sent now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit half-open for {self.host}, probing")
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit closed for {self.host}")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probe_in_flight = False
+        logger.warning(f"Circuit open for {self.host} after {self.failures} failures "
+                       f"(retry in {self.reset_timeout:.0f}s)")
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff ("full jitter")
+
+    The delay before retry n is uniform in [0, min(max_delay, base_delay * 2**n)],
+    or the server's Retry-After when it asks for longer.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay * 4))
+        return delay
+
+
+class RequestResilience:
+    """
+    Shared retry policy, per-host circuit breakers and run statistics
+
+    One instance is shared by the adapters mounted for each URL scheme, so
+    breakers and counters cover all of a session's traffic.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, failure_threshold: int = 5,
+                 reset_timeout: float = 30):
+        self.policy = policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'backoff_seconds': 0.0,
+                      'failed_fast': 0, 'gave_up': 0}
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        host = domain_of(url)
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def count(self, key: str, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self) -> Dict:
+        """Retry counts and time spent in backoff for this run"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['backoff_seconds'] = round(stats['backoff_seconds'], 1)
+            stats['open_circuits'] = [b.host for b in self._breakers.values() if b.state != CircuitBreaker.CLOSED]
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Requests: {stats['requests']}, {stats['retries']} retries "
+            f"({stats['backoff_seconds']}s in backoff), {stats['failed_fast']} failed fast, "
+            f"{stats['gave_up']} gave up"
+            + (f", open circuits: {', '.join(stats['open_circuits'])}" if stats['open_circuits'] else "")
+        )
+
+
+class ResilientAdapter(BaseAdapter):
+    """
+    Transport adapter adding retries and per-host circuit breaking
+
+    Wraps the adapter previously mounted on the session. Only idempotent
+    methods are retried; a host whose circuit is open fails immediately with
+    CircuitOpenError instead of waiting out another timeout.
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, resilience: RequestResilience, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.resilience = resilience
+        self.inner = inner or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        resilience = self.resilience
+        policy = resilience.policy
+        breaker = resilience.breaker_for(request.url)
+        retryable = request.method in self.IDEMPOTENT_METHODS
+        attempt = 0
+        resilience.count('requests')
+
+        while True:
+            if not breaker.allow_request():
+                resilience.count('failed_fast')
+                raise CircuitOpenError(f"Circuit open for {breaker.host}", request=request)
+
+            response = None
+            error = None
+            try:
+                response = self.inner.send(request, **kwargs)
+            except RETRYABLE_EXCEPTIONS as e:
+                error = e
+            except BaseException:
+                # Anything else (a redirect loop, an invalid URL, a cancel)
+                # still settles a half-open probe, or the circuit would
+                # stay shut for good
+                breaker.record_failure()
+                raise
+
+            if response is not None and response.status_code not in RETRYABLE_STATUSES:
+                breaker.record_success()
+                return response
+
+            breaker.record_failure()
+
+            if not retryable or attempt >= policy.max_retries:
+                if error is not None:
+                    resilience.count('gave_up')
+                    raise error
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            delay = policy.backoff(attempt, retry_after)
+            reason = error.__class__.__name__ if error is not None else f"HTTP {response.status_code}"
+            logger.info(f"Retrying {request.url} in {delay:.1f}s ({reason}, attempt {attempt + 1}/{policy.max_retries})")
+
+            if response is not None:
+                response.close()
+
+            resilience.count('retries')
+            resilience.count('backoff_seconds', delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.inner.close()
+
+
+def install_resilience(session: requests.Session, policy: Optional[RetryPolicy] = None,
+                       failure_threshold: int = 5, reset_timeout: float = 30) -> RequestResilience:
+    """
+    Add retries and circuit breaking to every request made through a session
+
+    Install this after the rate controller (so each retry is paced) and
+    before the HTTP cache.
+
+    Returns:
+        The RequestResilience in use, for reporting retry / backoff statistics
+    """
+    resilience = RequestResilience(policy, failure_threshold, reset_timeout)
+    for prefix in ('https://', 'http://'):
+        session.mount(prefix, ResilientAdapter(resilience, inner=session.get_adapter(prefix)))
+    return resilience
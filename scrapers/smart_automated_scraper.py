@@ -5,23 +5,78 @@ Combines multiple strategies to automatically extract UAE federal laws
 """
 
 import requests
-from bs4 import BeautifulSoup
 import json
-import time
 from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 import re
 import os
 
+from article_segmenter import segment_articles
+from document_identity import DocumentRegistry, document_id
+from html_parsing import parse_page
+from http_cache import install_http_cache
+from parse_pool import ParsePool
+from rate_controller import install_rate_controller
+from resilience import install_resilience
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+def parse_law_page(law_info: Dict, content: bytes) -> Dict:
+    """
+    Parse a fetched law page into a law record
+    
+    Module-level so it can run in a ParsePool worker process.
+    """
+    page = parse_page(content)
+    
+    # Extract metadata (page text is computed once for all patterns)
+    metadata = {}
+    text_content = page.text
+    
+    # Issue date
+    date_match = re.search(r'Issued on (\d{1,2}/\d{1,2}/\d{4})', text_content, re.IGNORECASE)
+    if date_match:
+        metadata['issue_date'] = date_match.group(1)
+    
+    # Hijri date
+    hijri_match = re.search(r'Corresponding to (\d+ \w+ \d+ H\.?)', text_content)
+    if hijri_match:
+        metadata['hijri_date'] = hijri_match.group(1)
+    
+    # Extract full text
+    full_text = page.content_text([
+        ('div', {'id': re.compile(r'MainContent|article|content', re.I)})
+    ])
+    
+    # Clean text
+    full_text = re.sub(r'\n\s*\n', '\n\n', full_text)
+    full_text = re.sub(r' +', ' ', full_text)
+    
+    # Extract articles (complete spans, one pass over the text)
+    articles = segment_articles(full_text)
+    
+    return {
+        'id': document_id(law_info['url'], 'moj'),
+        'title': law_info['title'],
+        'url': law_info['url'],
+        'category': law_info.get('category', 'UAE Federal Law'),
+        'full_text': full_text,
+        'metadata': metadata,
+        'articles': articles,
+        'word_count': len(full_text.split()),
+        'scraped_at': datetime.now().isoformat(),
+        'source': 'MOJ Legal Portal'
+    }
+
+
 class SmartAutomatedScraper:
     """Smart automated scraper with multiple strategies"""
     
-    def __init__(self, output_dir="/home/ubuntu/paris_group_legal_ai/data"):
+    def __init__(self, output_dir="/home/ubuntu/paris_group_legal_ai/data",
+                 parse_workers: Optional[int] = None):
         self.base_url = "https://elaws.moj.gov.ae"
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
@@ -32,6 +87,18 @@ class SmartAutomatedScraper:
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
         })
         
+        # Adaptive per-domain pacing, retries with a per-host circuit breaker,
+        # then the conditional-GET cache on top
+        self.rate_controllers = install_rate_controller(self.session)
+        self.resilience = install_resilience(self.session)
+        self.http_cache = install_http_cache(self.session)
+        
+        # Law pages are parsed in worker processes
+        self.parse_pool = ParsePool(workers=parse_workers)
+        
+        # Stable document IDs; a law whose page moved keeps its ID
+        self.registry = DocumentRegistry()
+        
         # Pre-defined law URLs from MOJ portal (discovered through browser)
         self.known_law_urls = self._get_known_law_urls()
     
@@ -120,74 +187,23 @@ class SmartAutomatedScraper:
     
     def scrape_law_detail(self, law_info: Dict) -> Optional[Dict]:
         """Scrape full details of a specific law"""
+        content = self._fetch_law_page(law_info)
+        if content is None:
+            return None
+        try:
+            return parse_law_page(law_info, content)
+        except Exception as e:
+            logger.error(f"Error scraping {law_info['title']}: {e}")
+            return None
+    
+    def _fetch_law_page(self, law_info: Dict) -> Optional[bytes]:
+        """Raw HTML of a law page, or None if the request failed"""
         try:
             logger.info(f"Scraping: {law_info['title']}")
             
             response = self.session.get(law_info['url'], timeout=30)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract metadata
-            metadata = {}
-            text_content = soup.get_text()
-            
-            # Issue date
-            date_match = re.search(r'Issued on (\d{1,2}/\d{1,2}/\d{4})', text_content, re.IGNORECASE)
-            if date_match:
-                metadata['issue_date'] = date_match.group(1)
-            
-            # Hijri date
-            hijri_match = re.search(r'Corresponding to (\d+ \w+ \d+ H\.?)', text_content)
-            if hijri_match:
-                metadata['hijri_date'] = hijri_match.group(1)
-            
-            # Extract full text
-            full_text = ""
-            main_content = soup.find('div', id=re.compile(r'MainContent|article|content', re.I))
-            
-            if main_content:
-                for unwanted in main_content(['script', 'style', 'nav', 'header', 'footer']):
-                    unwanted.decompose()
-                full_text = main_content.get_text(separator='\n', strip=True)
-            else:
-                body = soup.find('body')
-                if body:
-                    for unwanted in body(['script', 'style', 'nav', 'header', 'footer']):
-                        unwanted.decompose()
-                    full_text = body.get_text(separator='\n', strip=True)
-            
-            # Clean text
-            full_text = re.sub(r'\n\s*\n', '\n\n', full_text)
-            full_text = re.sub(r' +', ' ', full_text)
-            
-            # Extract articles
-            articles = []
-            for match in re.finditer(r'Article\s+(\d+|One|Two|[IVX]+)', full_text, re.IGNORECASE):
-                article_num = match.group(0)
-                start = match.end()
-                next_match = re.search(r'Article\s+(\d+|One|Two|[IVX]+)', full_text[start:], re.IGNORECASE)
-                end = start + next_match.start() if next_match else len(full_text)
-                article_text = full_text[start:end].strip()
-                
-                if article_text and len(article_text) > 10:
-                    articles.append({
-                        'article_number': article_num,
-                        'text': article_text[:1000]
-                    })
-            
-            return {
-                'id': f"moj_{abs(hash(law_info['url'])) % 1000000}",
-                'title': law_info['title'],
-                'url': law_info['url'],
-                'category': law_info.get('category', 'UAE Federal Law'),
-                'full_text': full_text,
-                'metadata': metadata,
-                'articles': articles,
-                'word_count': len(full_text.split()),
-                'scraped_at': datetime.now().isoformat(),
-                'source': 'MOJ Legal Portal'
-            }
+            return response.content
             
         except Exception as e:
             logger.error(f"Error scraping {law_info['title']}: {e}")
@@ -197,21 +213,37 @@ class SmartAutomatedScraper:
         """Scrape all known laws"""
         logger.info(f"Starting automated scraping of {len(self.known_law_urls)} laws...")
         
-        laws = []
+        # Pages are parsed in the pool while the next one downloads
+        futures = []
         for idx, law_info in enumerate(self.known_law_urls, 1):
             logger.info(f"Progress: {idx}/{len(self.known_law_urls)}")
             
-            law_data = self.scrape_law_detail(law_info)
+            content = self._fetch_law_page(law_info)
+            futures.append(self.parse_pool.submit(parse_law_page, law_info, content) if content else None)
+        
+        laws = []
+        for law_info, future in zip(self.known_law_urls, futures):
+            law_data = None
+            if future is not None:
+                try:
+                    law_data = future.result()
+                except Exception as e:
+                    logger.error(f"Error scraping {law_info['title']}: {e}")
             
             if law_data and law_data.get('word_count', 0) > 100:
+                law_data['id'] = self.registry.resolve(law_data['url'], 'moj', title=law_data['title'])
                 laws.append(law_data)
                 logger.info(f"✓ Scraped: {law_data['title'][:60]}... ({law_data['word_count']} words)")
             else:
                 logger.warning(f"✗ Skipped: {law_info['title'][:60]}...")
-            
-            time.sleep(2)  # Be respectful
         
         logger.info(f"Scraping complete! Successfully scraped {len(laws)} laws")
+        self.parse_pool.log_stats()
+        self.parse_pool.close()
+        self.registry.log_stats()
+        self.http_cache.log_stats()
+        self.rate_controllers.log_stats()
+        self.resilience.log_stats()
         return laws
     
     def save_to_json(self, laws: List[Dict], filename: str = "uae_laws_automated.json"):
@@ -0,0 +1,271 @@
+"""
+Span Fingerprints
+Per-article and per-chunk BLAKE2b fingerprints of a law's text, persisted
+per document in SQLite with an embedding cache keyed by fingerprint, so an
+amended law re-embeds and re-upserts only the spans whose text changed
+(rows of legal_article_spans, created by
+drizzle/migrations/0000_legal_articles_doc_id.sql)
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from article_segmenter import segment_articles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FINGERPRINT_DB = os.getenv(
+    'SCRAPER_FINGERPRINT_DB',
+    "/home/ubuntu/paris_group_legal_ai/data/span_fingerprints.db"
+)
+
+# Spans longer than this are cut into chunks (well under the embedding
+# input limit)
+DEFAULT_CHUNK_CHARS = 4000
+
+# A chunk may end early (once it is a quarter full) after a paragraph whose
+# hash is 0 mod this, so chunk boundaries follow the text rather than
+# offsets and re-align right after an inserted or deleted passage
+_BOUNDARY_EVERY = 4
+
+_BLANK_LINE = re.compile(r'\n[ \t\r\f]*\n\s*')
+
+
+def fingerprint(text: str) -> str:
+    """128-bit BLAKE2b of a text, insensitive to whitespace and line wrapping"""
+    normalized = ' '.join(text.split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _paragraphs(text: str, start: int, end: int, max_chars: int):
+    """(start, end) of the paragraphs in text[start:end], none longer than max_chars"""
+    pos = start
+    bounds = [(sep.start(), sep.end()) for sep in _BLANK_LINE.finditer(text, start, end)] + [(end, end)]
+    for sep_start, sep_end in bounds:
+        while sep_start - pos > max_chars:
+            # Oversized paragraph: cut at the last whitespace before the limit
+            cut = max(text.rfind(' ', pos, pos + max_chars), text.rfind('\n', pos, pos + max_chars))
+            cut = cut if cut > pos else pos + max_chars
+            yield pos, cut
+            pos = cut
+        if sep_start > pos:
+            yield pos, sep_start
+        pos = sep_end
+
+
+def _chunks(text: str, start: int, end: int, max_chars: int):
+    """(start, end) of content-defined chunks of text[start:end]"""
+    chunk_start = chunk_end = None
+    for para_start, para_end in _paragraphs(text, start, end, max_chars):
+        if chunk_start is not None and para_end - chunk_start > max_chars:
+            yield chunk_start, chunk_end
+            chunk_start = None
+        if chunk_start is None:
+            chunk_start = para_start
+        chunk_end = para_end
+
+        digest = hashlib.blake2b(text[para_start:para_end].encode('utf-8'), digest_size=2).digest()
+        if chunk_end - chunk_start >= max_chars // 4 and int.from_bytes(digest, 'little') % _BOUNDARY_EVERY == 0:
+            yield chunk_start, chunk_end
+            chunk_start = None
+    if chunk_start is not None:
+        yield chunk_start, chunk_end
+
+
+def fingerprint_spans(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> List[Dict]:
+    """
+    Cut a law into fingerprinted spans: one per article, articles longer
+    than `max_chars` in chunks, and the text before the first article (or
+    a text without article headings) in chunks
+
+    An article's key is its number ('article:12'), so an amended article
+    shows up as changed. Chunks are keyed by their fingerprint, so an
+    edit replaces only the chunks it touches and the rest keep their keys.
+
+    Returns:
+        Span records with key, kind, article_number, text, start, end and
+        fingerprint, in text order
+    """
+    spans = []
+    seen = {}
+
+    def add(key, kind, article_number, start, end):
+        body = text[start:end].strip()
+        if not body:
+            return
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}~{seen[key]}"
+        spans.append({'key': key, 'kind': kind, 'article_number': article_number, 'text': body,
+                      'start': start, 'end': end, 'fingerprint': fingerprint(body)})
+
+    def add_chunks(prefix, kind, article_number, start, end):
+        for chunk_start, chunk_end in _chunks(text, start, end, max_chars):
+            add(f"{prefix}#{fingerprint(text[chunk_start:chunk_end])[:12]}", kind, article_number,
+                chunk_start, chunk_end)
+
+    articles = segment_articles(text)
+    add_chunks('preamble' if articles else 'chunk', 'chunk', None, 0, articles[0]['start'] if articles else len(text))
+    for article in articles:
+        key = f"article:{article['number'] or article['article_number']}"
+        if article['end'] - article['start'] <= max_chars:
+            add(key, 'article', article['article_number'], article['start'], article['end'])
+        else:
+            add_chunks(key, 'article', article['article_number'], article['start'], article['end'])
+    return spans
+
+
+class SpanFingerprintStore:
+    """
+    Fingerprints of the spans last stored for each document, plus a cache
+    of span embeddings by fingerprint
+
+    `diff` compares a document's current spans with the stored ones; only
+    added and changed spans need an embedding and an upsert, and removed
+    keys a delete. Embeddings are cached by fingerprint (and model), so a
+    span that moves - a renumbered article, the same annex in two laws -
+    is never embedded twice. `commit` records the new spans once the
+    document is stored, so a failed upsert is retried in full next run.
+
+    Usage:
+        store = SpanFingerprintStore()
+        spans = fingerprint_spans(full_text)
+        diff = store.diff(doc_id, spans)
+        for span in diff['added'] + diff['changed']:
+            ...embed and upsert...
+        store.commit(doc_id, content_hash, spans)
+    """
+
+    def __init__(self, db_path: str = DEFAULT_FINGERPRINT_DB):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fingerprint_document (
+                doc_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fingerprint_span (
+                doc_id TEXT NOT NULL,
+                span_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (doc_id, span_key)
+            );
+            CREATE TABLE IF NOT EXISTS span_embedding (
+                fingerprint TEXT NOT NULL,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (fingerprint, model)
+            );
+        """)
+        self._conn.commit()
+
+        self.stats = {'documents': 0, 'unchanged_documents': 0, 'added': 0, 'changed': 0,
+                      'unchanged': 0, 'removed': 0, 'embeddings_cached': 0, 'embeddings_stored': 0}
+
+    def content_hash(self, doc_id: str) -> Optional[str]:
+        """Content hash the document had when it was last committed, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM fingerprint_document WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def diff(self, doc_id: str, spans: Sequence[Dict]) -> Dict:
+        """
+        Compare a document's spans with the ones last committed
+
+        Returns:
+            {'added': [span], 'changed': [span], 'unchanged': [span],
+             'removed': [span key]}
+        """
+        with self._lock:
+            stored = dict(self._conn.execute(
+                "SELECT span_key, fingerprint FROM fingerprint_span WHERE doc_id = ?", (doc_id,)
+            ).fetchall())
+
+        result = {'added': [], 'changed': [], 'unchanged': [], 'removed': []}
+        for span in spans:
+            previous = stored.pop(span['key'], None)
+            if previous is None:
+                result['added'].append(span)
+            elif previous != span['fingerprint']:
+                result['changed'].append(span)
+            else:
+                result['unchanged'].append(span)
+        result['removed'] = sorted(stored)
+
+        with self._lock:
+            self.stats['documents'] += 1
+            for outcome in ('added', 'changed', 'unchanged', 'removed'):
+                self.stats[outcome] += len(result[outcome])
+        return result
+
+    def commit(self, doc_id: str, content_hash: str, spans: Sequence[Dict]):
+        """Record the spans of a document that has been stored"""
+        with self._lock:
+            self._conn.execute("DELETE FROM fingerprint_span WHERE doc_id = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT INTO fingerprint_span (doc_id, span_key, fingerprint) VALUES (?, ?, ?)",
+                [(doc_id, span['key'], span['fingerprint']) for span in spans]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprint_document (doc_id, content_hash, updated) VALUES (?, ?, ?)",
+                (doc_id, content_hash, time.time())
+            )
+            self._conn.commit()
+
+    def count_unchanged(self):
+        """Count a document skipped because its content hash did not change"""
+        with self._lock:
+            self.stats['unchanged_documents'] += 1
+
+    def get_embedding(self, span_fingerprint: str, model: str) -> Optional[List[float]]:
+        """Cached embedding of a fingerprint, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM span_embedding WHERE fingerprint = ? AND model = ?",
+                (span_fingerprint, model)
+            ).fetchone()
+            if row is None:
+                return None
+            self.stats['embeddings_cached'] += 1
+        vector = array('f')
+        vector.frombytes(row[0])
+        return vector.tolist()
+
+    def put_embedding(self, span_fingerprint: str, model: str, embedding: Sequence[float]):
+        """Cache the embedding of a fingerprint"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO span_embedding (fingerprint, model, vector, created) VALUES (?, ?, ?, ?)",
+                (span_fingerprint, model, array('f', embedding).tobytes(), time.time())
+            )
+            self._conn.commit()
+            self.stats['embeddings_stored'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"Span fingerprints: {stats['documents']} documents diffed "
+            f"({stats['unchanged_documents']} unchanged skipped) - {stats['added']} spans added, "
+            f"{stats['changed']} changed, {stats['removed']} removed, {stats['unchanged']} unchanged; "
+            f"{stats['embeddings_stored']} embeddings generated, {stats['embeddings_cached']} from cache"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
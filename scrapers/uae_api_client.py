@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+UAE Legislation Platform JSON API Client
+Records the XHR/fetch JSON calls the JavaScript front end makes (from the
+Chrome performance log) into a replayable endpoint spec, then serves listing
+and detail data from those endpoints with plain HTTP requests
+"""
+
+import os
+import re
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+
+from html_parsing import parse_html
+from http_cache import install_http_cache
+from rate_controller import install_rate_controller
+from resilience import install_resilience
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPEC_PATH = os.getenv(
+    'UAE_API_SPEC_PATH',
+    "/home/ubuntu/paris_group_legal_ai/data/uae_api_spec.json"
+)
+
+# Query parameters that look like pagination on a captured listing call
+PAGE_PARAMS = ('page', 'pageNumber', 'pageIndex', 'PageNumber', 'PageIndex', 'p')
+PAGE_SIZE_PARAMS = ('pageSize', 'PageSize', 'size', 'limit', 'perPage', 'take')
+
+# Detail keys mapped to the metadata produced by the browser scraper
+METADATA_KEYS = {
+    'issued_date': ('issuedate', 'issueddate', 'issuedon', 'issuedat'),
+    'effective_date': ('effectivedate', 'effectivefrom', 'effectiveon'),
+    'state': ('state', 'status', 'legislationstate'),
+}
+
+
+class SpecStaleError(Exception):
+    """The recorded endpoint no longer answers the way it did at capture time"""
+
+
+# ----------------------------------------------------------------------
+# JSON helpers
+# ----------------------------------------------------------------------
+
+def _get_path(data: Any, path: List) -> Any:
+    for key in path:
+        data = data[key]
+    return data
+
+
+def _find_lists(data: Any, path: Optional[List] = None):
+    """Yield (path, list) for every list of objects inside a JSON document"""
+    path = path or []
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data):
+            yield path, data
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield from _find_lists(value, path + [key])
+
+
+def _find_strings(data: Any, path: Optional[List] = None):
+    """Yield (path, value) for every string inside a JSON document"""
+    path = path or []
+    if isinstance(data, str):
+        yield path, data
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield from _find_strings(value, path + [key])
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            yield from _find_strings(value, path + [index])
+
+
+def _html_to_text(value: str) -> str:
+    if '<' in value and '>' in value:
+        return parse_html(value).get_text(separator='\n', strip=True)
+    return value.strip()
+
+
+def _normalize_key(key: str) -> str:
+    return re.sub(r'[^a-z]', '', key.lower())
+
+
+# ----------------------------------------------------------------------
+# Discovery
+# ----------------------------------------------------------------------
+
+def read_json_calls(driver) -> List[Dict]:
+    """
+    Drain the Chrome performance log and return the JSON XHR/fetch calls
+
+    The driver must have been started with the 'goog:loggingPrefs'
+    capability set to {'performance': 'ALL'}.
+
+    Returns:
+        List of dicts with method, url, headers, post_data and parsed body
+    """
+    requests_by_id: Dict[str, Dict] = {}
+    json_ids: List[str] = []
+
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            request = params.get('request', {})
+            requests_by_id[params.get('requestId')] = {
+                'method': request.get('method', 'GET'),
+                'url': request.get('url', ''),
+                'headers': request.get('headers', {}),
+                'post_data': request.get('postData'),
+            }
+        elif message.get('method') == 'Network.responseReceived':
+            response = params.get('response', {})
+            if params.get('type') in ('XHR', 'Fetch') and 'json' in response.get('mimeType', ''):
+                json_ids.append(params.get('requestId'))
+
+    calls = []
+    for request_id in json_ids:
+        call = requests_by_id.get(request_id)
+        if not call:
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            call['body'] = json.loads(body.get('body', ''))
+        except Exception as e:
+            logger.debug(f"No body for {call['url']}: {e}")
+            continue
+        calls.append(call)
+    return calls
+
+
+def _replay_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Request headers worth replaying (no cookies or browser-managed headers)"""
+    skip = ('cookie', 'host', 'content-length', 'accept-encoding', 'connection')
+    return {k: v for k, v in headers.items() if k.lower() not in skip and not k.startswith(':')}
+
+
+def build_listing_spec(calls: List[Dict], links: List[Tuple[str, str]]) -> Optional[Dict]:
+    """
+    Pick the call that returned the legislation list shown on the page
+
+    The listing endpoint is the one whose items contain the ids and titles of
+    the links the browser rendered, which also tells us which item fields
+    hold the id and the title.
+    """
+    page_ids = {href.rstrip('/').split('/')[-1] for href, _ in links}
+    page_titles = {title for _, title in links}
+    best = None
+
+    for call in calls:
+        for items_path, items in _find_lists(call['body']):
+            id_field = title_field = None
+            best_id_hits = best_title_hits = 0
+            for key in items[0].keys():
+                values = [str(item.get(key, '')).strip() for item in items]
+                id_hits = sum(value in page_ids for value in values)
+                title_hits = sum(value in page_titles for value in values)
+                if id_hits > best_id_hits:
+                    id_field, best_id_hits = key, id_hits
+                if title_hits > best_title_hits:
+                    title_field, best_title_hits = key, title_hits
+
+            if id_field and title_field and (best is None or best_id_hits > best['score']):
+                best = {
+                    'score': best_id_hits,
+                    'method': call['method'],
+                    'url': call['url'],
+                    'headers': _replay_headers(call['headers']),
+                    'post_data': call['post_data'],
+                    'items_path': items_path,
+                    'id_field': id_field,
+                    'title_field': title_field,
+                }
+
+    if best is None:
+        return None
+
+    query = dict(parse_qsl(urlparse(best['url']).query))
+    best['page_param'] = next((p for p in PAGE_PARAMS if p in query), None)
+    best['page_size_param'] = next((p for p in PAGE_SIZE_PARAMS if p in query), None)
+    del best['score']
+    return best
+
+
+def build_detail_spec(calls: List[Dict], legislation_id: str) -> Optional[Dict]:
+    """
+    Pick the call that returned the legislation's text
+
+    Only calls whose URL or payload mentions the legislation id are
+    considered; the id is replaced by `{id}` to make a reusable template.
+    """
+    best = None
+
+    for call in calls:
+        in_url = legislation_id in call['url']
+        in_post = bool(call['post_data']) and legislation_id in call['post_data']
+        if not (in_url or in_post):
+            continue
+
+        strings = list(_find_strings(call['body']))
+        if not strings:
+            continue
+        text_path, text = max(strings, key=lambda s: len(s[1]))
+
+        if best is None or len(text) > best['text_length']:
+            metadata_paths = {}
+            for path, _ in strings:
+                if not path or not isinstance(path[-1], str):
+                    continue
+                key = _normalize_key(path[-1])
+                for name, candidates in METADATA_KEYS.items():
+                    if key in candidates and name not in metadata_paths:
+                        metadata_paths[name] = path
+
+            best = {
+                'text_length': len(text),
+                'method': call['method'],
+                'url_template': call['url'].replace(legislation_id, '{id}'),
+                'headers': _replay_headers(call['headers']),
+                'post_template': call['post_data'].replace(legislation_id, '{id}') if in_post else None,
+                'text_path': text_path,
+                'metadata_paths': metadata_paths,
+            }
+
+    if best is None:
+        return None
+    del best['text_length']
+    return best
+
+
+def save_spec(spec: Dict, spec_path: str = DEFAULT_SPEC_PATH):
+    os.makedirs(os.path.dirname(spec_path) or '.', exist_ok=True)
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, indent=2)
+    logger.info(f"Saved endpoint spec to {spec_path}")
+
+
+def load_spec(spec_path: str = DEFAULT_SPEC_PATH) -> Optional[Dict]:
+    try:
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# Replay client
+# ----------------------------------------------------------------------
+
+class UAELegislationApiClient:
+    """
+    Plain-HTTP client for the endpoints recorded in an endpoint spec
+
+    Any sign that the spec no longer matches the site (HTTP errors, non-JSON
+    responses, missing fields) raises SpecStaleError so callers can fall back
+    to the browser and re-run discovery.
+    """
+
+    def __init__(self, spec: Dict, base_url: str = "https://uaelegislation.gov.ae",
+                 session: Optional[requests.Session] = None):
+        self.spec = spec
+        self.base_url = base_url
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            self.rate_controllers = install_rate_controller(session)
+            self.resilience = install_resilience(session)
+            self.http_cache = install_http_cache(session)
+        self.session = session
+
+    @classmethod
+    def from_file(cls, spec_path: str = DEFAULT_SPEC_PATH, **kwargs) -> Optional['UAELegislationApiClient']:
+        """Client for a saved spec, or None if no usable spec exists"""
+        spec = load_spec(spec_path)
+        if not spec or not spec.get('listing'):
+            return None
+        return cls(spec, **kwargs)
+
+    def _call(self, method: str, url: str, headers: Dict, data: Optional[str]) -> Any:
+        try:
+            response = self.session.request(method, url, headers=headers, data=data, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise SpecStaleError(f"{method} {url}: {e}") from e
+
+    def _listing_url(self, page: Optional[int], page_size: Optional[int]) -> str:
+        listing = self.spec['listing']
+        parts = urlparse(listing['url'])
+        query = dict(parse_qsl(parts.query))
+        if page is not None and listing.get('page_param'):
+            query[listing['page_param']] = str(page)
+        if page_size and listing.get('page_size_param'):
+            query[listing['page_size_param']] = str(page_size)
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    def list_legislations(self, limit: int = 50, page_size: Optional[int] = None) -> List[Dict]:
+        """
+        Legislation metadata from the listing endpoint, following pagination
+        when the captured call had a page parameter
+
+        Returns:
+            Dicts shaped like UAESeleniumScraper.scrape_legislation_list output
+        """
+        listing = self.spec['listing']
+        page_param = listing.get('page_param')
+        page = int(dict(parse_qsl(urlparse(listing['url']).query)).get(page_param, 1)) if page_param else None
+
+        legislations = []
+        seen = set()
+        while len(legislations) < limit:
+            data = self._call(listing['method'], self._listing_url(page, page_size),
+                              listing.get('headers', {}), listing.get('post_data'))
+            try:
+                items = _get_path(data, listing['items_path'])
+            except (KeyError, IndexError, TypeError) as e:
+                raise SpecStaleError(f"Listing items not found at {listing['items_path']}") from e
+
+            new = 0
+            for item in items:
+                legislation_id = str(item.get(listing['id_field'], '')).strip()
+                title = str(item.get(listing['title_field'], '')).strip()
+                if not legislation_id or not title or legislation_id in seen:
+                    continue
+                seen.add(legislation_id)
+                new += 1
+                legislations.append({
+                    'id': legislation_id,
+                    'title': title,
+                    'url': f"{self.base_url}/en/legislations/{legislation_id}",
+                    'scraped_at': datetime.now().isoformat(),
+                    'source': 'UAE Legislation Platform'
+                })
+                if len(legislations) >= limit:
+                    break
+
+            if not new or page is None:
+                break
+            page += 1
+
+        if not legislations:
+            raise SpecStaleError("Listing endpoint returned no legislations")
+        return legislations
+
+    def get_detail(self, legislation_id: str) -> Dict:
+        """
+        Legislation text and metadata from the detail endpoint
+
+        Returns:
+            Dict shaped like UAESeleniumScraper.scrape_legislation_detail output
+        """
+        detail = self.spec.get('detail')
+        if not detail:
+            raise SpecStaleError("No detail endpoint recorded")
+
+        post_data = detail['post_template'].replace('{id}', legislation_id) if detail.get('post_template') else None
+        data = self._call(detail['method'], detail['url_template'].replace('{id}', legislation_id),
+                          detail.get('headers', {}), post_data)
+        try:
+            full_text = _html_to_text(str(_get_path(data, detail['text_path'])))
+        except (KeyError, IndexError, TypeError) as e:
+            raise SpecStaleError(f"Detail text not found at {detail['text_path']}") from e
+
+        metadata = {}
+        for name, path in detail.get('metadata_paths', {}).items():
+            try:
+                metadata[name] = str(_get_path(data, path)).strip()
+            except (KeyError, IndexError, TypeError):
+                pass
+
+        return {
+            'full_text': full_text,
+            'metadata': metadata,
+            'articles': [],
+            'word_count': len(full_text.split()),
+            'scraped_at': datetime.now().isoformat()
+        }
@@ -12,6 +12,8 @@ from typing import List, Dict
 import logging
 import os
 
+from article_segmenter import MARKDOWN_ARTICLE_PATTERN, segment_articles
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,32 +54,8 @@ class UAEBrowserScraper:
                     title = line.replace('# ', '').strip()
                     break
             
-            # Extract articles
-            articles = []
-            current_article = None
-            article_text = []
-            
-            for line in lines:
-                if 'Article' in line and line.startswith('##'):
-                    # Save previous article
-                    if current_article:
-                        articles.append({
-                            'article_number': current_article,
-                            'text': '\n'.join(article_text).strip()
-                        })
-                    
-                    # Start new article
-                    current_article = line.replace('##', '').strip()
-                    article_text = []
-                elif current_article:
-                    article_text.append(line)
-            
-            # Save last article
-            if current_article:
-                articles.append({
-                    'article_number': current_article,
-                    'text': '\n'.join(article_text).strip()
-                })
+            # Extract articles: each "## ... Article ..." heading starts one
+            articles = segment_articles(content, pattern=MARKDOWN_ARTICLE_PATTERN, min_length=None)
             
             return {
                 'title': title,
@@ -6,11 +6,18 @@ Processes scraped UAE legal content and stores it in Supabase with embeddings
 
 import os
 import json
+import math
 import hashlib
 from datetime import datetime
 from typing import List, Dict, Optional
 import logging
 from openai import OpenAI
+import psycopg2
+from psycopg2.extras import execute_values
+
+from document_identity import ensure_document_id
+from near_duplicates import NearDuplicateIndex
+from span_fingerprints import SpanFingerprintStore, fingerprint, fingerprint_spans
 
 # Set up logging
 logging.basicConfig(
@@ -19,6 +26,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 768
+
+# Longest text sent to the embedding API
+DOCUMENT_EMBEDDING_CHARS = 30000
+
 
 class UAELegalDataProcessor:
     """
@@ -35,6 +48,14 @@ class UAELegalDataProcessor:
         
         if not self.db_url:
             raise ValueError("DATABASE_URL environment variable not set")
+        
+        # Shared MinHash/LSH index: a law already stored from another source
+        # (or republished with another header) is not embedded again
+        self.near_duplicates = NearDuplicateIndex()
+        
+        # Article / chunk fingerprints of what was last stored: an amended
+        # law only re-embeds and re-upserts the spans that changed
+        self.fingerprints = SpanFingerprintStore()
     
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -48,14 +69,14 @@ class UAELegalDataProcessor:
         """
         try:
             # Truncate text if too long (OpenAI has token limits)
-            max_chars = 30000
+            max_chars = DOCUMENT_EMBEDDING_CHARS
             if len(text) > max_chars:
                 text = text[:max_chars]
             
             response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small",  # Use OpenAI embedding model
+                model=EMBEDDING_MODEL,  # Use OpenAI embedding model
                 input=text,
-                dimensions=768  # Match the existing embedding dimensions
+                dimensions=EMBEDDING_DIMENSIONS  # Match the existing embedding dimensions
             )
             
             embedding = response.data[0].embedding
@@ -70,6 +91,34 @@ class UAELegalDataProcessor:
         """Calculate MD5 hash of content for change detection"""
         return hashlib.md5(text.encode('utf-8')).hexdigest()
     
+    def embed_cached(self, text: str) -> List[float]:
+        """
+        Embedding of a text, generated only if no text with the same
+        fingerprint has been embedded before
+        """
+        text = text[:DOCUMENT_EMBEDDING_CHARS]
+        key = fingerprint(text)
+        model = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}"
+        embedding = self.fingerprints.get_embedding(key, model)
+        if embedding is None:
+            embedding = self.generate_embedding(text)
+            self.fingerprints.put_embedding(key, model, embedding)
+        return embedding
+    
+    def document_embedding(self, spans: List[Dict]) -> List[float]:
+        """
+        Document vector as the length-weighted mean of its span embeddings
+        (normalized), so it is rebuilt from the cache without an API call
+        """
+        total = [0.0] * EMBEDDING_DIMENSIONS
+        for span in spans:
+            embedding = span.get('embedding') or self.embed_cached(span['text'])
+            weight = len(span['text'])
+            for i, value in enumerate(embedding):
+                total[i] += weight * value
+        norm = math.sqrt(sum(value * value for value in total)) or 1.0
+        return [value / norm for value in total]
+    
     def process_legislation(self, legislation: Dict) -> Dict:
         """
         Process a single legislation and prepare it for database insertion
@@ -89,13 +138,29 @@ class UAELegalDataProcessor:
                 logger.warning("No full text found for legislation")
                 return None
             
-            embedding = self.generate_embedding(full_text)
-            
             # Calculate content hash
+            doc_id = ensure_document_id(legislation, 'uae_legislation')
             content_hash = self.calculate_content_hash(full_text)
+            if self.fingerprints.content_hash(doc_id) == content_hash:
+                logger.info("Unchanged since last stored - skipping")
+                self.fingerprints.count_unchanged()
+                return {'doc_id': doc_id, 'title': legislation.get('title', 'Untitled'), 'unchanged': True}
+            
+            # Diff the article / chunk fingerprints against the stored ones;
+            # only added and changed spans are embedded
+            spans = fingerprint_spans(full_text)
+            span_diff = self.fingerprints.diff(doc_id, spans)
+            for span in span_diff['added'] + span_diff['changed']:
+                span['embedding'] = self.embed_cached(span['text'])
+            logger.info(f"Spans: {len(span_diff['added'])} added, {len(span_diff['changed'])} changed, "
+                        f"{len(span_diff['removed'])} removed, {len(span_diff['unchanged'])} unchanged")
+            
+            # Built from the span embeddings - unchanged spans come from the cache
+            embedding = self.document_embedding(spans) if spans else self.embed_cached(full_text)
             
             # Prepare processed data
             processed = {
+                'doc_id': doc_id,
                 'title': legislation.get('title', 'Untitled'),
                 'content': full_text,
                 'category': legislation.get('category', 'UAE Federal Law'),
@@ -107,9 +172,12 @@ class UAELegalDataProcessor:
                     'effective_date': legislation.get('metadata', {}).get('effective_date'),
                     'state': legislation.get('metadata', {}).get('state'),
                     'word_count': legislation.get('word_count', 0),
-                    'article_count': len(legislation.get('articles', []))
+                    'article_count': len(legislation.get('articles', [])),
+                    'span_count': len(spans)
                 },
-                'scraped_at': legislation.get('scraped_at', datetime.now().isoformat())
+                'scraped_at': legislation.get('scraped_at', datetime.now().isoformat()),
+                'spans': spans,
+                'span_diff': span_diff
             }
             
             return processed
@@ -118,9 +186,50 @@ class UAELegalDataProcessor:
             logger.error(f"Error processing legislation: {e}")
             return None
     
+    def store_spans(self, cur, doc_id: str, span_diff: Dict):
+        """
+        Bring a document's rows in legal_article_spans up to date: upserts
+        for added and changed spans, one delete for removed ones
+        """
+        execute_values(cur, """
+            INSERT INTO legal_article_spans
+            (doc_id, span_key, fingerprint, kind, article_number, content, embedding, start_offset, end_offset)
+            VALUES %s
+            ON CONFLICT (doc_id, span_key) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                kind = EXCLUDED.kind,
+                article_number = EXCLUDED.article_number,
+                content = EXCLUDED.content,
+                embedding = EXCLUDED.embedding,
+                start_offset = EXCLUDED.start_offset,
+                end_offset = EXCLUDED.end_offset,
+                updated_at = NOW()
+        """, [
+            (doc_id, span['key'], span['fingerprint'], span['kind'], span['article_number'], span['text'],
+             str(span['embedding']), span['start'], span['end'])
+            for span in span_diff['added'] + span_diff['changed']
+        ], template="(%s, %s, %s, %s, %s, %s, %s::vector, %s, %s)", page_size=20)
+        
+        if span_diff['removed']:
+            cur.execute(
+                "DELETE FROM legal_article_spans WHERE doc_id = %s AND span_key = ANY(%s)",
+                (doc_id, span_diff['removed'])
+            )
+        
+        # Unchanged spans only move when text before them was edited
+        cur.executemany("""
+            UPDATE legal_article_spans SET start_offset = %s, end_offset = %s
+            WHERE doc_id = %s AND span_key = %s
+              AND (start_offset, end_offset) IS DISTINCT FROM (%s, %s)
+        """, [
+            (span['start'], span['end'], doc_id, span['key'], span['start'], span['end'])
+            for span in span_diff['unchanged']
+        ])
+    
     def store_in_supabase(self, processed_legislation: Dict) -> bool:
         """
-        Store processed legislation in Supabase using MCP
+        Store processed legislation and its changed spans in Supabase, in
+        one transaction
         
         Args:
             processed_legislation: Processed legislation dictionary
@@ -128,52 +237,46 @@ class UAELegalDataProcessor:
         Returns:
             True if successful, False otherwise
         """
+        conn = None
         try:
-            import subprocess
+            conn = psycopg2.connect(self.db_url)
+            with conn, conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO legal_articles
+                    (doc_id, title, content, category, embedding, source_url, content_hash, metadata, scraped_at)
+                    VALUES (%s, %s, %s, %s, %s::vector, %s, %s, %s::jsonb, %s)
+                    ON CONFLICT (doc_id) DO UPDATE SET
+                        title = EXCLUDED.title,
+                        content = EXCLUDED.content,
+                        embedding = EXCLUDED.embedding,
+                        content_hash = EXCLUDED.content_hash,
+                        metadata = EXCLUDED.metadata,
+                        updated_at = NOW()
+                    WHERE legal_articles.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                """, (
+                    processed_legislation['doc_id'],
+                    processed_legislation['title'],
+                    processed_legislation['content'],
+                    processed_legislation['category'],
+                    str(processed_legislation['embedding']),
+                    processed_legislation['source_url'],
+                    processed_legislation['content_hash'],
+                    json.dumps(processed_legislation['metadata']),
+                    processed_legislation['scraped_at']
+                ))
+                self.store_spans(cur, processed_legislation['doc_id'], processed_legislation['span_diff'])
             
-            # Prepare SQL INSERT statement
-            sql = f"""
-            INSERT INTO legal_articles 
-            (title, content, category, embedding, source_url, content_hash, metadata, scraped_at)
-            VALUES (
-                $${processed_legislation['title']}$$,
-                $${processed_legislation['content']}$$,
-                '{processed_legislation['category']}',
-                '{processed_legislation['embedding']}'::vector,
-                '{processed_legislation['source_url']}',
-                '{processed_legislation['content_hash']}',
-                '{json.dumps(processed_legislation['metadata'])}'::jsonb,
-                '{processed_legislation['scraped_at']}'
-            )
-            ON CONFLICT (content_hash) DO UPDATE SET
-                title = EXCLUDED.title,
-                content = EXCLUDED.content,
-                embedding = EXCLUDED.embedding,
-                updated_at = NOW();
-            """
-            
-            # Save SQL to temporary file
-            sql_file = f"/tmp/uae_leg_{int(datetime.now().timestamp())}.sql"
-            with open(sql_file, 'w', encoding='utf-8') as f:
-                f.write(sql)
-            
-            # Execute via Supabase MCP
-            result = subprocess.run(
-                ['manus-mcp-cli', 'tool', 'call', 'execute_sql', '--server', 'supabase', '--input', f'{{"query": "{sql}"}}'],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                logger.info(f"Successfully stored legislation: {processed_legislation['title']}")
-                return True
-            else:
-                logger.error(f"Error storing legislation: {result.stderr}")
-                return False
+            self.fingerprints.commit(processed_legislation['doc_id'], processed_legislation['content_hash'],
+                                     processed_legislation['spans'])
+            logger.info(f"Successfully stored legislation: {processed_legislation['title']}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error storing in Supabase: {e}")
             return False
+        finally:
+            if conn is not None:
+                conn.close()
     
     def process_and_store_batch(self, legislations: List[Dict]) -> Dict:
         """
@@ -189,20 +292,41 @@ class UAELegalDataProcessor:
             'total': len(legislations),
             'processed': 0,
             'stored': 0,
+            'unchanged': 0,
             'failed': 0,
+            'duplicates': [],
             'errors': []
         }
         
         for legislation in legislations:
             try:
+                # Skip near-duplicates of documents stored under another URL
+                # before paying for an embedding
+                signature = self.near_duplicates.signature(legislation.get('full_text', ''))
+                match = self.near_duplicates.find_duplicate(signature, exclude=legislation.get('url'))
+                if match:
+                    logger.info(f"Near-duplicate: {legislation.get('title')} (matches: {match['title']}, "
+                                f"similarity {match['similarity']})")
+                    summary['duplicates'].append({
+                        'title': legislation.get('title'),
+                        'url': legislation.get('url'),
+                        'duplicate_of': match
+                    })
+                    continue
+                
                 # Process
                 processed = self.process_legislation(legislation)
-                if processed:
+                if processed and processed.get('unchanged'):
+                    summary['unchanged'] += 1
+                elif processed:
                     summary['processed'] += 1
                     
                     # Store
                     if self.store_in_supabase(processed):
                         summary['stored'] += 1
+                        if legislation.get('url'):
+                            self.near_duplicates.add(legislation['url'], signature,
+                                                     title=processed['title'], source=processed['category'])
                     else:
                         summary['failed'] += 1
                 else:
@@ -213,6 +337,8 @@ class UAELegalDataProcessor:
                 summary['errors'].append(str(e))
                 logger.error(f"Error processing legislation: {e}")
         
+        self.near_duplicates.log_stats()
+        self.fingerprints.log_stats()
         return summary
     
     def load_from_json(self, json_file: str) -> List[Dict]:
@@ -260,7 +386,12 @@ def main():
         print(f"Total legislations: {summary['total']}")
         print(f"Successfully processed: {summary['processed']}")
         print(f"Successfully stored: {summary['stored']}")
+        print(f"Unchanged (skipped): {summary['unchanged']}")
         print(f"Failed: {summary['failed']}")
+        print(f"Near-duplicates skipped: {len(summary['duplicates'])}")
+        for duplicate in summary['duplicates'][:5]:
+            print(f"  - {duplicate['title']} ~ {duplicate['duplicate_of']['title']} "
+                  f"({duplicate['duplicate_of']['similarity']:.0%})")
         if summary['errors']:
             print(f"\nErrors:")
             for error in summary['errors'][:5]:  # Show first 5 errors
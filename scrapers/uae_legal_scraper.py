@@ -6,11 +6,20 @@ Scrapes federal laws and regulations from the UAE Legislation Platform
 
 import requests
 from bs4 import BeautifulSoup
+import asyncio
 import json
-import time
+import re
 from datetime import datetime
 from typing import List, Dict, Optional
 import logging
+from urllib.parse import urlencode, urljoin, urlparse, parse_qsl, urlunparse
+
+from async_fetcher import AsyncFetchEngine, async_fetch_available
+from html_parsing import parse_html
+from http_cache import install_http_cache
+from listing_snapshot import ListingSnapshotStore
+from rate_controller import install_rate_controller
+from resilience import install_resilience
 
 # Set up logging
 logging.basicConfig(
@@ -23,13 +32,30 @@ logger = logging.getLogger(__name__)
 class UAELegalScraper:
     """Scraper for UAE Legislation Platform"""
     
-    def __init__(self):
+    def __init__(self, concurrency: int = 4, max_pages: int = 100):
         self.base_url = "https://uaelegislation.gov.ae"
+        
+        # Sectors are crawled concurrently with up to `concurrency` requests
+        # in flight; the shared per-host rate controller sets the pace.
+        # Each sector listing is followed for at most `max_pages` pages.
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max(1, max_pages)
+        self.sector_progress: Dict[str, Dict] = {}
+        
+        # Previous listing, for incremental runs (its own snapshot: IDs are 'uae_leg_<slug>',
+        # so sharing one with the other UAE scraper would flag every law)
+        self.snapshots = ListingSnapshotStore('uae_legislation_platform:http')
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
+        # Adaptive per-domain pacing, retries with a per-host circuit breaker,
+        # then the conditional-GET cache on top
+        self.rate_controllers = install_rate_controller(self.session)
+        self.resilience = install_resilience(self.session)
+        self.http_cache = install_http_cache(self.session)
+        
         # Legal sectors from the UAE platform
         self.sectors = {
             'education': 14,
@@ -55,6 +81,10 @@ class UAELegalScraper:
         """
         Scrape the list of legislations from a specific sector or all sectors
         
+        All result pages are followed (next / "load more" links, or the page
+        parameter when the listing has no explicit link) until `limit`
+        legislations were collected or a page adds nothing new.
+        
         Args:
             sector_name: Name of the sector (e.g., 'justice', 'healthcare')
             limit: Maximum number of legislations to scrape
@@ -62,64 +92,30 @@ class UAELegalScraper:
         Returns:
             List of legislation metadata dictionaries
         """
-        legislations = []
+        legislations: Dict[str, Dict] = {}
+        
+        if sector_name:
+            sector_id = self.sectors.get(sector_name.lower())
+            if not sector_id:
+                logger.error(f"Unknown sector: {sector_name}")
+                return []
+            logger.info(f"Scraping sector: {sector_name} (ID: {sector_id})")
+        else:
+            sector_id = None
+            logger.info("Scraping all legislations")
+        
+        label = sector_name or 'all'
+        url = self._listing_url(sector_id)
+        page = 1
         
         try:
-            if sector_name:
-                sector_id = self.sectors.get(sector_name.lower())
-                if not sector_id:
-                    logger.error(f"Unknown sector: {sector_name}")
-                    return []
+            while url and page <= self.max_pages and len(legislations) < limit:
+                response = self.session.get(url, timeout=30)
+                response.raise_for_status()
                 
-                url = f"{self.base_url}/en/legislations?sector={sector_id}"
-                logger.info(f"Scraping sector: {sector_name} (ID: {sector_id})")
-            else:
-                url = f"{self.base_url}/en/legislations"
-                logger.info("Scraping all legislations")
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find legislation items (structure may vary, this is a template)
-            # The actual selectors need to be adjusted based on the real website structure
-            legislation_items = soup.find_all('div', class_='legislation-item', limit=limit)
-            
-            if not legislation_items:
-                # Try alternative selectors
-                legislation_items = soup.find_all('article', limit=limit)
-            
-            logger.info(f"Found {len(legislation_items)} legislation items")
-            
-            for idx, item in enumerate(legislation_items):
-                try:
-                    # Extract basic information
-                    title_elem = item.find(['h2', 'h3', 'h4', 'a'])
-                    link_elem = item.find('a', href=True)
-                    
-                    if not title_elem or not link_elem:
-                        continue
-                    
-                    legislation = {
-                        'id': f"uae_leg_{idx}_{int(time.time())}",
-                        'title': title_elem.get_text(strip=True),
-                        'url': self._make_absolute_url(link_elem['href']),
-                        'category': sector_name or 'general',
-                        'scraped_at': datetime.now().isoformat(),
-                        'source': 'UAE Legislation Platform'
-                    }
-                    
-                    # Try to extract additional metadata
-                    date_elem = item.find(['span', 'time'], class_=['date', 'published'])
-                    if date_elem:
-                        legislation['date'] = date_elem.get_text(strip=True)
-                    
-                    legislations.append(legislation)
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing legislation item {idx}: {e}")
-                    continue
+                url = self._add_listing_page(response.content, url, page, label, sector_name,
+                                             legislations, limit)
+                page += 1
             
             logger.info(f"Successfully scraped {len(legislations)} legislations")
             
@@ -128,8 +124,113 @@ class UAELegalScraper:
         except Exception as e:
             logger.error(f"Unexpected error while scraping legislation list: {e}")
         
+        return list(legislations.values())
+    
+    def _listing_url(self, sector_id: Optional[int] = None, page: int = 1) -> str:
+        params = {}
+        if sector_id:
+            params['sector'] = sector_id
+        if page > 1:
+            params['page'] = page
+        url = f"{self.base_url}/en/legislations"
+        return f"{url}?{urlencode(params)}" if params else url
+    
+    def _add_listing_page(self, content: bytes, url: str, page: int, label: str,
+                          sector_name: Optional[str], legislations: Dict[str, Dict],
+                          limit: int) -> Optional[str]:
+        """
+        Parse one listing page into `legislations` (keyed by ID)
+        
+        Returns:
+            URL of the next page, or None when the listing is exhausted
+        """
+        soup = parse_html(content)
+        items = self.parse_listing_items(soup, sector_name)
+        
+        new = 0
+        for legislation in items:
+            if legislation['id'] not in legislations and len(legislations) < limit:
+                legislations[legislation['id']] = legislation
+                new += 1
+        
+        self._report_progress(label, page, new, len(legislations))
+        if not new:
+            return None
+        return self._next_page_url(soup, url, page)
+    
+    def _report_progress(self, label: str, page: int, new: int, total: int):
+        progress = self.sector_progress.setdefault(label, {'pages': 0, 'legislations': 0})
+        progress['pages'] = page
+        progress['legislations'] = total
+        logger.info(f"[{label}] page {page}: {new} new legislations ({total} total)")
+    
+    def parse_listing_items(self, soup: BeautifulSoup, sector_name: Optional[str] = None) -> List[Dict]:
+        """Legislation entries on one listing page"""
+        legislations = []
+        
+        # Find legislation items (structure may vary, this is a template)
+        # The actual selectors need to be adjusted based on the real website structure
+        legislation_items = soup.find_all('div', class_='legislation-item')
+        
+        if not legislation_items:
+            # Try alternative selectors
+            legislation_items = soup.find_all('article')
+        
+        for idx, item in enumerate(legislation_items):
+            try:
+                # Extract basic information
+                title_elem = item.find(['h2', 'h3', 'h4', 'a'])
+                link_elem = item.find('a', href=True)
+                
+                if not title_elem or not link_elem:
+                    continue
+                
+                url = self._make_absolute_url(link_elem['href'])
+                legislation = {
+                    'id': self._legislation_id(url),
+                    'title': title_elem.get_text(strip=True),
+                    'url': url,
+                    'category': sector_name or 'general',
+                    'scraped_at': datetime.now().isoformat(),
+                    'source': 'UAE Legislation Platform'
+                }
+                
+                # Try to extract additional metadata
+                date_elem = item.find(['span', 'time'], class_=['date', 'published'])
+                if date_elem:
+                    legislation['date'] = date_elem.get_text(strip=True)
+                
+                legislations.append(legislation)
+                
+            except Exception as e:
+                logger.warning(f"Error parsing legislation item {idx}: {e}")
+                continue
+        
         return legislations
     
+    @staticmethod
+    def _legislation_id(url: str) -> str:
+        """Stable ID from the legislation URL (the same law listed in two sectors gets one ID)"""
+        return f"uae_leg_{urlparse(url).path.rstrip('/').split('/')[-1]}"
+    
+    def _next_page_url(self, soup: BeautifulSoup, url: str, page: int) -> Optional[str]:
+        """
+        Next listing page: an explicit rel=next / "Next" / "Load more" link if
+        the page has one, otherwise the same URL with page=page+1
+        """
+        link = soup.find(['a', 'link'], rel='next')
+        if not link:
+            link = soup.find(['a', 'button'], string=re.compile(r'^\s*(next|load more|show more|›|»)\s*$', re.I))
+        if link:
+            href = link.get('href') or link.get('data-url') or link.get('data-href')
+            if href and not href.startswith('javascript:'):
+                return urljoin(url, href)
+        
+        parts = urlparse(url)
+        query = dict(parse_qsl(parts.query))
+        query['page'] = str(page + 1)
+        return urlunparse(parts._replace(query=urlencode(query)))
+    
     def scrape_legislation_detail(self, legislation_url: str) -> Dict:
         """
         Scrape the full text and details of a specific legislation
@@ -146,7 +247,7 @@ class UAELegalScraper:
             response = self.session.get(legislation_url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content)
             
             # Extract the main content
             content_div = soup.find(['div', 'article'], class_=['content', 'legislation-content', 'main-content'])
@@ -228,24 +329,92 @@ class UAELegalScraper:
         """
         Scrape legislations from all sectors
         
+        Sectors are crawled concurrently (all pages of each) when httpx is
+        available, under the shared per-host rate limit. Sectors that share an
+        ID are fetched once, and a legislation listed in several sectors
+        appears once with all of its sectors in `sectors`.
+        
         Args:
             max_per_sector: Maximum number of legislations to scrape per sector
             
         Returns:
             List of all scraped legislations
         """
-        all_legislations = []
+        # labour and healthcare share an ID - fetch each listing once
+        groups: Dict[int, List[str]] = {}
+        for sector_name, sector_id in self.sectors.items():
+            groups.setdefault(sector_id, []).append(sector_name)
         
-        for sector_name in self.sectors.keys():
-            logger.info(f"Scraping sector: {sector_name}")
-            legislations = self.scrape_legislation_list(sector_name, limit=max_per_sector)
-            all_legislations.extend(legislations)
+        self.sector_progress = {}
+        if self.concurrency > 1 and async_fetch_available():
+            results = asyncio.run(self._crawl_sectors_async(groups, max_per_sector))
+        else:
+            if self.concurrency > 1:
+                logger.warning("httpx not installed - falling back to sequential crawling")
+            results = [self.scrape_legislation_list(names[0], limit=max_per_sector) for names in groups.values()]
+        
+        # De-duplicate across sectors by legislation ID
+        all_legislations: Dict[str, Dict] = {}
+        for names, legislations in zip(groups.values(), results):
+            for legislation in legislations:
+                merged = all_legislations.setdefault(legislation['id'], dict(legislation, sectors=[]))
+                merged['sectors'].extend(name for name in names if name not in merged['sectors'])
+        
+        for label, progress in self.sector_progress.items():
+            logger.info(f"Sector {label}: {progress['legislations']} legislations from {progress['pages']} pages")
+        logger.info(f"Total legislations scraped: {len(all_legislations)} unique")
+        self.http_cache.log_stats()
+        self.rate_controllers.log_stats()
+        self.resilience.log_stats()
+        return list(all_legislations.values())
+    
+    async def _crawl_sectors_async(self, groups: Dict[int, List[str]], limit: int) -> List[List[Dict]]:
+        """Crawl every sector listing concurrently; pages of one sector are followed in order"""
+        async with AsyncFetchEngine(headers=dict(self.session.headers),
+                                    max_per_host=self.concurrency,
+                                    cache=self.http_cache,
+                                    rate_controllers=self.rate_controllers,
+                                    resilience=self.resilience) as engine:
             
-            # Be respectful to the server
-            time.sleep(2)
+            async def crawl_sector(item) -> List[Dict]:
+                sector_id, names = item
+                label = '+'.join(names)
+                legislations: Dict[str, Dict] = {}
+                url = self._listing_url(sector_id)
+                page = 1
+                
+                try:
+                    while url and page <= self.max_pages and len(legislations) < limit:
+                        response = await engine.fetch(url)
+                        url = self._add_listing_page(response.content, url, page, label, names[0],
+                                                     legislations, limit)
+                        page += 1
+                except Exception as e:
+                    logger.error(f"[{label}] stopped at page {page}: {e}")
+                    self.sector_progress.setdefault(label, {'pages': 0, 'legislations': 0})['error'] = str(e)
+                
+                return list(legislations.values())
+            
+            return await engine.map(groups.items(), crawl_sector)
+    
+    def scrape_updates(self, max_per_sector: int = 50, sample: int = 5) -> List[Dict]:
+        """
+        Incremental refresh: crawl the listings, then scrape details only for
+        legislations that are new or changed since the last run, plus
+        `sample` unchanged ones (oldest first)
+        
+        Returns:
+            The legislations whose details were scraped
+        """
+        listing = self.scrape_all_sectors(max_per_sector=max_per_sector)
+        to_scrape = self.snapshots.diff(listing, sample=sample).to_scrape
+        
+        for idx, legislation in enumerate(to_scrape, 1):
+            logger.info(f"Detail {idx}/{len(to_scrape)}: {legislation['title'][:60]}")
+            legislation.update(self.scrape_legislation_detail(legislation['url']))
         
-        logger.info(f"Total legislations scraped: {len(all_legislations)}")
-        return all_legislations
+        self.snapshots.commit(listing, [l['id'] for l in to_scrape if not l.get('error')])
+        return to_scrape
     
     def save_to_json(self, legislations: List[Dict], filename: str):
         """Save scraped legislations to a JSON file"""
@@ -287,6 +456,8 @@ def main():
             if 'word_count' in leg:
                 print(f"Word Count: {leg['word_count']}")
         print("="*60)
+        scraper.http_cache.log_stats()
+        scraper.resilience.log_stats()
     else:
         logger.warning("No legislations scraped")
 
@@ -10,13 +10,24 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 import json
+import sys
 import time
+import threading
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 
+from listing_snapshot import ListingSnapshotStore
+from rate_controller import get_rate_controller
+from uae_api_client import (
+    DEFAULT_SPEC_PATH, SpecStaleError, UAELegislationApiClient,
+    build_detail_spec, build_listing_spec, read_json_calls, save_spec
+)
+from webdriver_pool import WebDriverPool
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,41 +35,195 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+LEGISLATION_LINK_SELECTOR = "a[href*='/legislations/']"
+CONTENT_SELECTOR = "article, .content, .legislation-content"
+
+# Metadata label on the detail page -> key in the metadata dict
+METADATA_LABELS = {
+    'Issued Date': 'issued_date',
+    'Effective Date': 'effective_date',
+    'Legislation State': 'state',
+}
+
+# Each script runs in the page and returns everything in one WebDriver call,
+# instead of one HTTP round trip per element and attribute
+
+# -> [link count, scroll height]
+LIST_SIZE_JS = """
+return [document.querySelectorAll(arguments[0]).length, document.body.scrollHeight];
+"""
+
+# Scroll to the bottom -> [link count, scroll height] before scrolling
+SCROLL_JS = """
+const size = [document.querySelectorAll(arguments[0]).length, document.body.scrollHeight];
+window.scrollTo(0, document.body.scrollHeight);
+return size;
+"""
+
+# -> [[href, title], ...] for links with non-empty text, in document order
+EXTRACT_LINKS_JS = """
+const links = [];
+for (const a of document.querySelectorAll(arguments[0])) {
+    const title = (a.innerText || '').trim();
+    if (a.href && title) links.push([a.href, title]);
+}
+return links;
+"""
+
+# Counts fetch / XHR requests still in flight in window.__pendingRequests.
+# Installed before any page script runs, so every request is seen from the
+# start (resource timing entries only appear once a request completes)
+TRACK_REQUESTS_JS = """
+(() => {
+    if (window.__pendingRequests !== undefined) return;
+    window.__pendingRequests = 0;
+    const done = () => { window.__pendingRequests = Math.max(0, window.__pendingRequests - 1); };
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function () {
+            window.__pendingRequests++;
+            return fetch.apply(this, arguments).finally(done);
+        };
+    }
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__pendingRequests++;
+        this.addEventListener('loadend', done, {once: true});
+        try {
+            return send.apply(this, arguments);
+        } catch (e) {
+            done();
+            throw e;
+        }
+    };
+})();
+"""
+
+# -> number of fetch / XHR requests in flight, or null if not tracked
+PENDING_REQUESTS_JS = """
+return window.__pendingRequests === undefined ? null : window.__pendingRequests;
+"""
+
+# -> {metadata: {key: value}, full_text: str, articles: [{href, title}]}
+EXTRACT_DETAIL_JS = """
+const contentSelector = arguments[0], labels = arguments[1];
+const metadata = {};
+for (const div of document.querySelectorAll('div')) {
+    for (const [label, key] of Object.entries(labels)) {
+        if (key in metadata) continue;
+        const own = Array.from(div.childNodes)
+            .filter(n => n.nodeType === Node.TEXT_NODE)
+            .map(n => n.textContent).join('');
+        if (own.includes(label) && div.nextElementSibling) {
+            metadata[key] = div.nextElementSibling.innerText.trim();
+        }
+    }
+}
+const content = document.querySelector(contentSelector) || document.body;
+const articles = [];
+for (const a of document.querySelectorAll("a[href*='#article'], a[href*='Article']")) {
+    const title = (a.innerText || '').trim();
+    if (title) articles.push({href: a.href, title: title});
+}
+return {metadata: metadata, full_text: content ? content.innerText : '', articles: articles};
+"""
+
 
 class UAESeleniumScraper:
     """Selenium-based scraper for UAE Legislation Platform"""
     
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, workers=4, max_pages_per_driver=50,
+                 spec_path: Optional[str] = DEFAULT_SPEC_PATH):
         self.base_url = "https://uaelegislation.gov.ae"
         self.driver = None
         self.headless = headless
-        self._init_driver()
+        
+        # Detail pages are spread over a pool of `workers` drivers, each
+        # replaced after `max_pages_per_driver` pages
+        self.workers = max(1, workers)
+        self.max_pages_per_driver = max_pages_per_driver
+        
+        # Endpoint spec recorded by discover_api(); when it exists, data is
+        # fetched from the site's JSON API and the browser is only started
+        # if that fails (spec_path=None always uses the browser)
+        self.spec_path = spec_path
+        
+        # Previous listing, for incremental runs (its own snapshot: IDs are bare slugs,
+        # so sharing one with the other UAE scraper would flag every law)
+        self.snapshots = ListingSnapshotStore('uae_legislation_platform:browser')
+        
+        self._driver_path = None
+        self._driver_path_lock = threading.Lock()
+    
+    def _get_driver(self):
+        """The scraper's own driver, started on first use"""
+        if self.driver is None:
+            self._init_driver()
+        return self.driver
+    
+    def _build_chrome_options(self, capture_network: bool = False) -> Options:
+        """Chrome options tuned for fast, lightweight headless page loads"""
+        chrome_options = Options()
+        if capture_network:
+            # Record network events so discover_api() can read the XHR calls
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        if self.headless:
+            chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        
+        # Skip work the scraper never needs
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--no-first-run')
+        chrome_options.add_argument('--no-default-browser-check')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--disable-sync')
+        chrome_options.add_argument('--disable-notifications')
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.fonts': 2,
+        })
+        
+        # Return control once the DOM is ready instead of waiting for every
+        # subresource; callers wait explicitly for the content they need
+        chrome_options.page_load_strategy = 'eager'
+        return chrome_options
+    
+    def _create_driver(self, capture_network: bool = False):
+        """Start a new Chrome WebDriver (used for the main driver and the pool)"""
+        # Resolve the chromedriver binary once instead of per driver; pool
+        # threads start drivers concurrently, and only one may install it
+        with self._driver_path_lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+        
+        service = Service(self._driver_path)
+        driver = webdriver.Chrome(service=service, options=self._build_chrome_options(capture_network))
+        # Track in-flight fetch / XHR on every page this driver loads
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': TRACK_REQUESTS_JS})
+        return driver
     
     def _init_driver(self):
         """Initialize the Selenium WebDriver"""
         try:
-            chrome_options = Options()
-            if self.headless:
-                chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            self.driver = self._create_driver()
             logger.info("Selenium WebDriver initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize WebDriver: {e}")
             raise
     
-    def scrape_legislation_list(self, limit=50) -> List[Dict]:
+    def scrape_legislation_list(self, limit=50, max_scrolls=50, scroll_timeout=5) -> List[Dict]:
         """
         Scrape the list of legislations from the main page
         
         Args:
             limit: Maximum number of legislations to scrape
+            max_scrolls: Maximum number of scroll rounds
+            scroll_timeout: Seconds to wait for new items after each scroll
             
         Returns:
             List of legislation metadata dictionaries
@@ -69,56 +234,47 @@ class UAESeleniumScraper:
             url = f"{self.base_url}/en/legislations"
             logger.info(f"Loading legislations page: {url}")
             
-            self.driver.get(url)
+            driver = self._get_driver()
+            get_rate_controller(url).wait()
+            driver.get(url)
             
-            # Wait for the page to load
-            wait = WebDriverWait(self.driver, 20)
-            time.sleep(5)  # Additional wait for dynamic content
+            # Wait for the first legislation links to render
+            first_links = EC.presence_of_element_located((By.CSS_SELECTOR, LEGISLATION_LINK_SELECTOR))
+            if not self._wait_for(driver, first_links, 20):
+                logger.warning("No legislation links rendered")
             
-            # Scroll to load more content
+            # Scroll to load more content, collecting links as we go so items
+            # dropped by a virtualized list are not lost
             logger.info("Scrolling to load content...")
-            last_height = self.driver.execute_script("return document.body.scrollHeight")
-            scroll_attempts = 0
-            max_scrolls = 5
+            collected = {}
+            self._collect_links(driver, collected)
             
-            while scroll_attempts < max_scrolls:
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(3)
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
+            for _ in range(max_scrolls):
+                if len(collected) >= limit:
+                    break
+                
+                # Scroll and read the list size in one call, then wait until
+                # the list grows (more links or a taller page)
+                link_count, height = driver.execute_script(SCROLL_JS, LEGISLATION_LINK_SELECTOR)
+                grew = self._wait_for(
+                    driver,
+                    lambda d: self._list_grew(d, link_count, height),
+                    scroll_timeout
+                )
+                self._collect_links(driver, collected)
+                if not grew:
                     break
-                last_height = new_height
-                scroll_attempts += 1
-            
-            # Find legislation links
-            legislation_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='/legislations/']")
             
-            logger.info(f"Found {len(legislation_links)} legislation links")
+            logger.info(f"Found {len(collected)} legislation links")
             
-            # Extract unique legislation URLs
-            seen_urls = set()
-            for link in legislation_links[:limit]:
-                try:
-                    href = link.get_attribute('href')
-                    title = link.text.strip()
-                    
-                    if href and '/legislations/' in href and href not in seen_urls and title:
-                        seen_urls.add(href)
-                        
-                        legislations.append({
-                            'id': href.split('/')[-1],
-                            'title': title,
-                            'url': href,
-                            'scraped_at': datetime.now().isoformat(),
-                            'source': 'UAE Legislation Platform'
-                        })
-                        
-                        if len(legislations) >= limit:
-                            break
-                            
-                except Exception as e:
-                    logger.warning(f"Error extracting legislation link: {e}")
-                    continue
+            for href, title in list(collected.items())[:limit]:
+                legislations.append({
+                    'id': href.rstrip('/').split('/')[-1],
+                    'title': title,
+                    'url': href,
+                    'scraped_at': datetime.now().isoformat(),
+                    'source': 'UAE Legislation Platform'
+                })
             
             logger.info(f"Successfully extracted {len(legislations)} unique legislations")
             
@@ -127,76 +283,99 @@ class UAESeleniumScraper:
         
         return legislations
     
-    def scrape_legislation_detail(self, legislation_url: str) -> Dict:
+    @staticmethod
+    def _wait_for(driver, condition, timeout: float) -> bool:
+        """Wait for a condition; return False instead of raising on timeout"""
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=0.2).until(condition)
+            return True
+        except TimeoutException:
+            return False
+    
+    def _wait_for_network_idle(self, driver, idle_time: float = 0.5, timeout: float = 10) -> bool:
+        """
+        Wait until no fetch / XHR request has been in flight for `idle_time`
+        seconds
+        
+        Requests are counted by TRACK_REQUESTS_JS, which every driver
+        installs before page scripts run. On a page loaded without it, it
+        is injected now and only requests started from then on are seen.
+        """
+        state = {'since': None}
+        
+        def idle(d):
+            pending = d.execute_script(PENDING_REQUESTS_JS)
+            if pending is None:
+                d.execute_script(TRACK_REQUESTS_JS)
+                pending = 0
+            now = time.monotonic()
+            if pending:
+                state['since'] = None
+                return False
+            if state['since'] is None:
+                state['since'] = now
+            return now - state['since'] >= idle_time
+        
+        return self._wait_for(driver, idle, timeout)
+    
+    @staticmethod
+    def _list_grew(driver, link_count: int, height: int) -> bool:
+        count, new_height = driver.execute_script(LIST_SIZE_JS, LEGISLATION_LINK_SELECTOR)
+        return count > link_count or new_height > height
+    
+    @staticmethod
+    def _collect_links(driver, collected: Dict[str, str]):
+        """Add the currently rendered legislation links to `collected` (href -> title)"""
+        try:
+            links = driver.execute_script(EXTRACT_LINKS_JS, LEGISLATION_LINK_SELECTOR)
+        except Exception as e:
+            logger.warning(f"Error extracting legislation links: {e}")
+            return
+        
+        for href, title in links:
+            if '/legislations/' in href and href not in collected:
+                collected[href] = title
+    
+    def scrape_legislation_detail(self, legislation_url: str, driver=None) -> Dict:
         """
         Scrape the full text and details of a specific legislation
         
         Args:
             legislation_url: URL of the legislation detail page
+            driver: WebDriver to use (defaults to the scraper's own driver)
             
         Returns:
             Dictionary with full text and structured content
         """
+        driver = driver or self._get_driver()
         try:
             logger.info(f"Scraping detail from: {legislation_url}")
             
-            self.driver.get(legislation_url)
+            get_rate_controller(legislation_url).wait()
+            driver.get(legislation_url)
             
-            # Wait for content to load
-            wait = WebDriverWait(self.driver, 20)
-            time.sleep(3)
+            # Wait for the content container (or the metadata block) to
+            # render, then for the page's own data requests to settle
+            self._wait_for(driver, EC.any_of(
+                EC.presence_of_element_located((By.CSS_SELECTOR, CONTENT_SELECTOR)),
+                EC.presence_of_element_located((By.XPATH, "//div[contains(text(), 'Issued Date')]"))
+            ), 20)
+            self._wait_for_network_idle(driver)
             
-            # Extract metadata
-            metadata = {}
+            # Metadata, text and article anchors in a single round trip
+            page = driver.execute_script(EXTRACT_DETAIL_JS, CONTENT_SELECTOR, METADATA_LABELS) or {}
             
-            try:
-                # Extract issued date
-                issued_date_elem = self.driver.find_element(By.XPATH, "//div[contains(text(), 'Issued Date')]/following-sibling::*")
-                metadata['issued_date'] = issued_date_elem.text.strip()
-            except:
-                pass
-            
-            try:
-                # Extract effective date
-                effective_date_elem = self.driver.find_element(By.XPATH, "//div[contains(text(), 'Effective Date')]/following-sibling::*")
-                metadata['effective_date'] = effective_date_elem.text.strip()
-            except:
-                pass
-            
-            try:
-                # Extract legislation state
-                state_elem = self.driver.find_element(By.XPATH, "//div[contains(text(), 'Legislation State')]/following-sibling::*")
-                metadata['state'] = state_elem.text.strip()
-            except:
-                pass
-            
-            # Extract full text content
-            full_text = ""
-            articles = []
-            
-            try:
-                # Find the main content area
-                content_elements = self.driver.find_elements(By.CSS_SELECTOR, "article, .content, .legislation-content")
-                
-                if content_elements:
-                    full_text = content_elements[0].text
-                else:
-                    # Fallback: get all text from body
-                    full_text = self.driver.find_element(By.TAG_NAME, "body").text
-                
-                # Extract individual articles
-                article_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='#article'], a[href*='Article']")
-                
-                for article_link in article_links:
-                    article_title = article_link.text.strip()
-                    if article_title and 'Article' in article_title:
-                        articles.append({
-                            'article_number': article_title,
-                            'text': ''  # Would need to extract article content separately
-                        })
-                
-            except Exception as e:
-                logger.warning(f"Error extracting content: {e}")
+            metadata = page.get('metadata') or {}
+            full_text = page.get('full_text') or ''
+            articles = [
+                {
+                    'article_number': anchor['title'],
+                    'anchor': anchor['href'],
+                    'text': ''  # Would need to extract article content separately
+                }
+                for anchor in page.get('articles') or []
+                if 'Article' in anchor['title']
+            ]
             
             return {
                 'full_text': full_text,
@@ -210,38 +389,160 @@ class UAESeleniumScraper:
             logger.error(f"Error scraping legislation detail: {e}")
             return {'full_text': '', 'metadata': {}, 'articles': [], 'error': str(e)}
     
-    def scrape_all_legislations(self, limit=50, include_details=True) -> List[Dict]:
+    def scrape_all_legislations(self, limit=50, include_details=True, incremental=False,
+                                sample=5) -> List[Dict]:
         """
         Scrape all legislations with their details
         
         Args:
             limit: Maximum number of legislations to scrape
             include_details: Whether to scrape full details for each legislation
+            incremental: Only scrape details of legislations that are new or
+                changed since the last incremental run (plus `sample`
+                unchanged ones); only those are returned
+            sample: Unchanged legislations to re-check per incremental run
             
         Returns:
             List of complete legislation dictionaries
         """
         all_legislations = []
+        legislations = None
         
-        # First, get the list of legislations
-        legislations = self.scrape_legislation_list(limit=limit)
+        # Replay the recorded JSON endpoints when possible
+        api_client = UAELegislationApiClient.from_file(self.spec_path) if self.spec_path else None
+        if api_client:
+            try:
+                legislations = api_client.list_legislations(limit=limit)
+                logger.info(f"Listed {len(legislations)} legislations via the JSON API")
+            except SpecStaleError as e:
+                logger.warning(f"Endpoint spec no longer works ({e}), falling back to the browser; "
+                               f"re-run discovery to refresh it")
+                api_client = None
+        
+        # Otherwise get the list of legislations from the page
+        if legislations is None:
+            legislations = self.scrape_legislation_list(limit=limit)
         
         if not include_details:
             return legislations
         
-        # Then scrape details for each
+        listing = legislations
+        if incremental:
+            legislations = self.snapshots.diff(listing, sample=sample).to_scrape
+        
+        if api_client:
+            self._scrape_details_via_api(api_client, legislations)
+            all_legislations = legislations
+        else:
+            all_legislations = self._scrape_details_in_browser(legislations)
+        
+        if incremental:
+            self.snapshots.commit(listing, [l['id'] for l in all_legislations if not l.get('error')])
+        
+        return all_legislations
+    
+    def _scrape_details_in_browser(self, legislations: List[Dict]) -> List[Dict]:
+        """Scrape details, spread over the driver pool"""
+        all_legislations = []
+        total = len(legislations)
+        
+        def scrape_detail(driver, indexed):
+            idx, legislation = indexed
+            logger.info(f"Scraping details for legislation {idx+1}/{total}: {legislation['title']}")
+            detail = self.scrape_legislation_detail(legislation['url'], driver=driver)
+            if 'error' in detail:
+                # Raising makes the pool replace a driver that may be broken
+                raise RuntimeError(detail['error'])
+            return detail
+        
+        def detail_failed(indexed, error):
+            return {'full_text': '', 'metadata': {}, 'articles': [], 'error': str(error)}
+        
+        if self.workers > 1 and total > 1:
+            pool = WebDriverPool(self._create_driver, size=self.workers,
+                                 max_pages_per_driver=self.max_pages_per_driver)
+            details = pool.map(scrape_detail, enumerate(legislations), on_error=detail_failed)
+            logger.info(f"Driver pool finished: {pool.drivers_started} drivers used")
+        else:
+            details = [self.scrape_legislation_detail(legislation['url']) for legislation in legislations]
+        
+        for indexed, detail in zip(enumerate(legislations), details):
+            legislation = indexed[1]
+            legislation.update(detail or detail_failed(indexed, 'no detail returned'))
+            all_legislations.append(legislation)
+        
+        return all_legislations
+    
+    def _scrape_details_via_api(self, api_client: UAELegislationApiClient, legislations: List[Dict]):
+        """
+        Details over plain HTTP from the recorded detail endpoint
+        
+        If the endpoint stops working, the remaining details are scraped in
+        the browser.
+        """
         for idx, legislation in enumerate(legislations):
-            logger.info(f"Scraping details for legislation {idx+1}/{len(legislations)}: {legislation['title']}")
+            try:
+                legislation.update(api_client.get_detail(legislation['id']))
+            except SpecStaleError as e:
+                logger.warning(f"Detail endpoint no longer works ({e}), "
+                               f"scraping {len(legislations) - idx} remaining details in the browser")
+                self._scrape_details_in_browser(legislations[idx:])
+                break
+    
+    def discover_api(self, spec_path: Optional[str] = None) -> Optional[Dict]:
+        """
+        Record the JSON calls behind the listing and a detail page
+        
+        Loads both pages in a browser with network logging enabled, matches
+        the captured XHR/fetch responses against what the pages render, and
+        saves a replayable endpoint spec for UAELegislationApiClient.
+        
+        Args:
+            spec_path: Where to write the spec (defaults to self.spec_path)
             
-            detail = self.scrape_legislation_detail(legislation['url'])
-            legislation.update(detail)
+        Returns:
+            The spec, or None if no listing endpoint could be identified
+        """
+        spec_path = spec_path or self.spec_path or DEFAULT_SPEC_PATH
+        driver = self._create_driver(capture_network=True)
+        
+        try:
+            url = f"{self.base_url}/en/legislations"
+            logger.info(f"Discovering endpoints from: {url}")
+            driver.get(url)
+            self._wait_for(driver, EC.presence_of_element_located((By.CSS_SELECTOR, LEGISLATION_LINK_SELECTOR)), 20)
+            self._wait_for_network_idle(driver)
             
-            all_legislations.append(legislation)
+            links = driver.execute_script(EXTRACT_LINKS_JS, LEGISLATION_LINK_SELECTOR)
+            listing = build_listing_spec(read_json_calls(driver), links)
+            if not listing:
+                logger.warning("No JSON call matched the rendered legislation list")
+                return None
+            
+            detail = None
+            if links:
+                detail_url = links[0][0]
+                legislation_id = detail_url.rstrip('/').split('/')[-1]
+                driver.get(detail_url)
+                self._wait_for(driver, EC.presence_of_element_located((By.CSS_SELECTOR, CONTENT_SELECTOR)), 20)
+                self._wait_for_network_idle(driver)
+                detail = build_detail_spec(read_json_calls(driver), legislation_id)
+            if not detail:
+                logger.warning("No JSON call matched the legislation detail page")
             
-            # Be respectful to the server
-            time.sleep(2)
+            spec = {
+                'captured_at': datetime.now().isoformat(),
+                'listing': listing,
+                'detail': detail
+            }
+            save_spec(spec, spec_path)
+            logger.info(f"Listing endpoint: {listing['method']} {listing['url']}")
+            if detail:
+                logger.info(f"Detail endpoint: {detail['method']} {detail['url_template']}")
+            return spec
         
-        return all_legislations
+        finally:
+            driver.quit()
     
     def save_to_json(self, legislations: List[Dict], filename: str):
         """Save scraped legislations to a JSON file"""
@@ -267,8 +568,14 @@ def main():
         logger.info("Starting UAE Legal Selenium Scraper...")
         scraper = UAESeleniumScraper(headless=True)
         
+        if '--discover' in sys.argv[1:]:
+            # Record the site's JSON endpoints for later runs
+            scraper.discover_api()
+            return
+        
         # Scrape a limited number of legislations for testing
-        legislations = scraper.scrape_all_legislations(limit=5, include_details=True)
+        legislations = scraper.scrape_all_legislations(limit=5, include_details=True,
+                                                       incremental='--incremental' in sys.argv[1:])
         
         if legislations:
             logger.info(f"Successfully scraped {len(legislations)} legislations")
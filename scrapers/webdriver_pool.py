@@ -0,0 +1,132 @@
+"""
+WebDriver Pool
+Runs browser work on N reusable WebDriver instances fed from a work queue,
+recycling each driver after a fixed number of pages to contain memory growth
+"""
+
+import queue
+import logging
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WebDriverPool:
+    """
+    Pool of reusable WebDriver instances
+
+    Each worker thread owns one driver (WebDriver is not thread-safe), pulls
+    items from a shared queue and calls `task(driver, item)`. Results are
+    returned in input order. A driver is quit and replaced after
+    `max_pages_per_driver` tasks, or immediately if a task raises, since a
+    failed page often leaves the browser in a bad state.
+
+    Usage:
+        pool = WebDriverPool(scraper._create_driver, size=4)
+        results = pool.map(lambda driver, url: scrape(url, driver), urls)
+    """
+
+    def __init__(self, driver_factory: Callable[[], Any], size: int = 4,
+                 max_pages_per_driver: int = 50):
+        self.driver_factory = driver_factory
+        self.size = max(1, size)
+        self.max_pages_per_driver = max(1, max_pages_per_driver)
+        self.drivers_started = 0
+        self._lock = threading.Lock()
+
+    def _start_driver(self):
+        driver = self.driver_factory()
+        with self._lock:
+            self.drivers_started += 1
+        return driver
+
+    @staticmethod
+    def _quit_driver(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing WebDriver: {e}")
+
+    def map(self, task: Callable[[Any, Any], Any], items: Iterable[Any],
+            on_error: Optional[Callable[[Any, Exception], Any]] = None) -> List[Any]:
+        """
+        Run `task(driver, item)` for every item across the pool
+
+        Args:
+            task: Function taking (driver, item)
+            items: Work items
+            on_error: Called as on_error(item, exception) to produce the
+                result for a failed item (default: None)
+
+        Returns:
+            Results in the same order as `items`. If no driver could be
+            started for them, the items left over get on_error(item, the
+            start error) too.
+        """
+        items = list(items)
+        results: List[Any] = [None] * len(items)
+        work: "queue.Queue" = queue.Queue()
+        for index, item in enumerate(items):
+            work.put((index, item))
+        start_errors: List[Exception] = []
+
+        def worker(worker_id: int):
+            driver = None
+            pages = 0
+            try:
+                while True:
+                    try:
+                        index, item = work.get_nowait()
+                    except queue.Empty:
+                        return
+
+                    if driver is None or pages >= self.max_pages_per_driver:
+                        if driver is not None:
+                            logger.info(f"Recycling WebDriver {worker_id} after {pages} pages")
+                            self._quit_driver(driver)
+                        driver = None
+                        try:
+                            driver = self._start_driver()
+                        except Exception as e:
+                            # Leave the remaining work to the other workers
+                            logger.error(f"WebDriver {worker_id} failed to start: {e}")
+                            start_errors.append(e)
+                            results[index] = on_error(item, e) if on_error else None
+                            return
+                        pages = 0
+
+                    try:
+                        results[index] = task(driver, item)
+                        pages += 1
+                    except Exception as e:
+                        logger.error(f"WebDriver {worker_id} failed on item {index}: {e}")
+                        results[index] = on_error(item, e) if on_error else None
+                        self._quit_driver(driver)
+                        driver = None
+            finally:
+                if driver is not None:
+                    self._quit_driver(driver)
+
+        threads = [
+            threading.Thread(target=worker, args=(worker_id,), daemon=True)
+            for worker_id in range(min(self.size, len(items)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Every worker gave up on starting a driver before the queue ran dry
+        leftover = 0
+        while True:
+            try:
+                index, item = work.get_nowait()
+            except queue.Empty:
+                break
+            results[index] = on_error(item, start_errors[-1]) if on_error else None
+            leftover += 1
+        if leftover:
+            logger.error(f"No WebDriver could be started - {leftover} items not attempted")
+
+        return results